@@ -54,6 +54,9 @@ def Automator(classifier,
               metric='minkowski',
               random_state=0):
 
+    # X_combined stacks the test rows after the training rows
+    test_idx = np.arange(len(X_combined) - len(X_test), len(X_combined))
+
     if (classifier == "ClfPerceptron"):
         # Fit with Perceptron
         ppn = AutoClfPerceptron(X_train=X_train,
@@ -67,7 +70,7 @@ def Automator(classifier,
         if (g.decision_regions is True):
             # Plot Perceptron decision regions
             plot_decision_regions(X=X_combined, y=y_combined,
-                                  classifier=ppn, test_idx=range(105, 150))
+                                  classifier=ppn, test_idx=test_idx)
             plt.xlabel('petal length [standardized]')
             plt.ylabel('petal width [standardized]')
             plt.title('Perceptron')
@@ -87,7 +90,7 @@ def Automator(classifier,
         if (g.decision_regions is True):
             # Plot AdalineGD decision regions
             plot_decision_regions(X=X_combined, y=y_combined,
-                                  classifier=adagd, test_idx=range(105, 150))
+                                  classifier=adagd, test_idx=test_idx)
             plt.xlabel('petal length [standardized]')
             plt.ylabel('petal width [standardized]')
             plt.title('AdalineGD')
@@ -108,7 +111,7 @@ def Automator(classifier,
         if (g.decision_regions is True):
             # Plot AdalineGD decision regions
             plot_decision_regions(X=X_combined, y=y_combined,
-                                  classifier=adasgd, test_idx=range(105, 150))
+                                  classifier=adasgd, test_idx=test_idx)
             plt.xlabel('petal length [standardized]')
             plt.ylabel('petal width [standardized]')
             plt.title('AdalineSGD')
@@ -129,7 +132,7 @@ def Automator(classifier,
         if (g.decision_regions is True):
             # Plot Logistic Regression decision regions
             plot_decision_regions(X=X_combined, y=y_combined,
-                                  classifier=lr, test_idx=range(105, 150))
+                                  classifier=lr, test_idx=test_idx)
             plt.xlabel('petal length [standardized]')
             plt.ylabel('petal width [standardized]')
             plt.title('Logistic Regression')
@@ -150,7 +153,7 @@ def Automator(classifier,
         if (g.decision_regions is True):
             # Plot Linear Support Vector Machines decision regions
             plot_decision_regions(X=X_combined, y=y_combined,
-                                  classifier=lsvm, test_idx=range(105, 150))
+                                  classifier=lsvm, test_idx=test_idx)
             plt.xlabel('petal length [standardized]')
             plt.ylabel('petal width [standardized]')
             plt.title('Linear Support Vector Machines')
@@ -172,7 +175,7 @@ def Automator(classifier,
         if (g.decision_regions is True):
             # Plot Kernel Support Vector Machines decision regions
             plot_decision_regions(X=X_combined, y=y_combined,
-                                  classifier=ksvm, test_idx=range(105, 150))
+                                  classifier=ksvm, test_idx=test_idx)
             plt.xlabel('petal length [standardized]')
             plt.ylabel('petal width [standardized]')
             plt.title('Kernel Support Vector Machines')
@@ -193,7 +196,7 @@ def Automator(classifier,
         if (g.decision_regions is True):
             # Plot Decision Tree decision regions
             plot_decision_regions(X=X_combined, y=y_combined,
-                                  classifier=tree, test_idx=range(105, 150))
+                                  classifier=tree, test_idx=test_idx)
             plt.xlabel('petal length [cm]')
             plt.ylabel('petal width [cm]')
             plt.title('Decision Tree')
@@ -214,7 +217,7 @@ def Automator(classifier,
         if (g.decision_regions is True):
             # Plot Random Forest decision regions
             plot_decision_regions(X=X_combined, y=y_combined,
-                                  classifier=tree, test_idx=range(105, 150))
+                                  classifier=tree, test_idx=test_idx)
             plt.xlabel('petal length [cm]')
             plt.ylabel('petal width [cm]')
             plt.title('Random Forest')
@@ -235,7 +238,7 @@ def Automator(classifier,
         if (g.decision_regions is True):
             # Plot K-nearest Neighbors decision regions
             plot_decision_regions(X=X_combined, y=y_combined,
-                                  classifier=knn, test_idx=range(105, 150))
+                                  classifier=knn, test_idx=test_idx)
             plt.xlabel('petal length [standardized]')
             plt.ylabel('petal width [standardized]')
             plt.title('K-nearest Neighbors')
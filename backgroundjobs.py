@@ -0,0 +1,180 @@
+"""
+    Warchest: Data management and automation GUI for Machine Learning projects
+    Created September 2017
+    Copyright (C) Nelson R Gonzalez
+
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+import queue
+import threading
+import traceback
+from database import close_thread_connections
+
+# how often the Tk event loop drains a job's message queue
+POLL_MS = 50
+
+
+class JobCancelled(Exception):
+
+    pass
+
+
+class BackgroundJob():
+    """ Run func on a worker thread without blocking the Tk event loop
+
+    func is called as func(job, *args, **kwargs). It reports progress
+    with job.report(done, total, message) and should call
+    job.check_cancelled() between steps, which raises JobCancelled once
+    cancel() has been called.
+
+    The worker thread never touches a widget: progress, the return
+    value and errors are put on a queue that the Tk thread drains every
+    POLL_MS through widget.after(), and the callbacks run there:
+
+        on_progress(done, total, message)
+        on_done(result)
+        on_error(exception)
+        on_cancel()
+    """
+
+    def __init__(self, widget, func, args=(), kwargs=None,
+                 on_progress=None, on_done=None, on_error=None,
+                 on_cancel=None, name=None):
+
+        self.widget = widget
+        self.func = func
+        self.args = args
+        self.kwargs = kwargs or {}
+        self.on_progress = on_progress
+        self.on_done = on_done
+        self.on_error = on_error
+        self.on_cancel = on_cancel
+        self.name = name or getattr(func, '__name__', 'job')
+
+        self._queue = queue.Queue()
+        self._cancel_event = threading.Event()
+        self._thread = None
+        self.finished = False
+
+    def start(self):
+
+        self._thread = threading.Thread(target=self._run,
+                                        name=self.name,
+                                        daemon=True)
+        self._thread.start()
+        self.widget.after(POLL_MS, self._poll)
+        return self
+
+    def cancel(self):
+
+        self._cancel_event.set()
+
+    def is_cancelled(self):
+
+        return self._cancel_event.is_set()
+
+    def check_cancelled(self):
+
+        if self._cancel_event.is_set():
+            raise JobCancelled()
+
+    def report(self, done, total=None, message=''):
+
+        self._queue.put(('progress', (done, total, message)))
+
+    def _run(self):
+
+        try:
+            result = self.func(self, *self.args, **self.kwargs)
+        except JobCancelled:
+            self._queue.put(('cancelled', None))
+        except Exception as e:
+            traceback.print_exc()
+            self._queue.put(('error', e))
+        else:
+            if self._cancel_event.is_set():
+                self._queue.put(('cancelled', None))
+            else:
+                self._queue.put(('done', result))
+        finally:
+            # the thread ends here, its SQLite connections with it
+            close_thread_connections()
+
+    def _poll(self):
+
+        try:
+            exists = self.widget.winfo_exists()
+        except Exception:
+            exists = False
+        if not exists:
+            # widget destroyed while the job was running
+            self.cancel()
+            return
+
+        try:
+            while True:
+                kind, payload = self._queue.get_nowait()
+                if kind == 'progress':
+                    # a cancelled job's late progress is not shown
+                    if self.on_progress and not self.is_cancelled():
+                        self.on_progress(*payload)
+                    continue
+                self.finished = True
+                # cancelled after its result was queued, by a newer job
+                if kind == 'done' and self.is_cancelled():
+                    kind = 'cancelled'
+                if kind == 'done' and self.on_done:
+                    self.on_done(payload)
+                elif kind == 'error' and self.on_error:
+                    self.on_error(payload)
+                elif kind == 'cancelled' and self.on_cancel:
+                    self.on_cancel()
+                return
+        except queue.Empty:
+            pass
+
+        try:
+            self.widget.after(POLL_MS, self._poll)
+        except Exception:
+            # widget destroyed while the job was running
+            self.cancel()
+
+
+class JobSlot():
+    """ Holds at most one running job
+
+    Starting a job through the slot cancels the one still running, so
+    clicking through columns only finishes the work for the last click.
+    """
+
+    def __init__(self):
+
+        self.job = None
+
+    def start(self, job):
+
+        self.cancel()
+        self.job = job
+        return job.start()
+
+    def cancel(self):
+
+        if self.job is not None and not self.job.finished:
+            self.job.cancel()
+        self.job = None
+
+    def is_running(self):
+
+        return self.job is not None and not self.job.finished
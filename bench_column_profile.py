@@ -0,0 +1,98 @@
+"""
+    Warchest: Data management and automation GUI for Machine Learning projects
+    Created September 2017
+    Copyright (C) Nelson R Gonzalez
+
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+""" Time to fill the Column tab: one pandas reduction per widget against
+    a single profile_column() call.
+
+        python bench_column_profile.py [number_of_rows]
+"""
+
+import sys
+import time
+import numpy as np
+import pandas as pd
+from columnprofile import profile_column, get_feature_type
+
+
+def per_widget(col):
+    """ The reductions the Column tab widgets used to run one by one """
+
+    numerical = get_feature_type(col) == "numerical"
+    col.count()
+    col[col.notnull()].duplicated(False).sum()
+    col[col.notnull()].duplicated(False).sum()
+    col.nunique()
+    col.nunique()
+    col.isnull().sum()
+    col.isnull().sum()
+    col.memory_usage(index=False, deep=False)
+    col.memory_usage(index=True, deep=False)
+    col.memory_usage(index=True, deep=True)
+    sys.getsizeof(col)
+    col.mode()
+    if numerical:
+        col.mean()
+        col.median()
+        col.std()
+        (col - col.mean()).abs().mean()  # Series.mad()
+        col.sem()
+        col.skew()
+        col.kurt()
+        col.var()
+        col.sum()
+        col.min()
+        col.argmin()
+        col.max()
+        col.argmax()
+        col.max() - col.min()
+        for q in (.05, .25, .5, .75, .95):
+            col.quantile(q)
+
+
+def run(func, col):
+
+    start = time.perf_counter()
+    func(col)
+    return time.perf_counter() - start
+
+
+def main(n=10000000):
+
+    rng = np.random.default_rng(0)
+
+    floats = pd.Series(rng.normal(size=n))
+    floats[rng.integers(0, n, n // 100)] = np.nan
+
+    words = np.array(['w%d' % i for i in range(1000)], dtype=object)
+    objects = pd.Series(words[rng.integers(0, len(words), n)])
+    objects[rng.integers(0, n, n // 100)] = None
+
+    print('%d rows\n' % n)
+    for name, col in (('float64', floats), ('object', objects)):
+        old = run(per_widget, col)
+        new = run(profile_column, col)
+        print('%-8s per widget %8.2fs   profile %8.2fs   %5.1fx' %
+              (name, old, new, old / new))
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1:
+        main(int(sys.argv[1]))
+    else:
+        main()
@@ -0,0 +1,106 @@
+"""
+    Warchest: Data management and automation GUI for Machine Learning projects
+    Created September 2017
+    Copyright (C) Nelson R Gonzalez
+
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+""" Statements/sec of the pooled ConnectionManager against the old
+    connect-per-call path.
+
+    Runs on a temporary copy of warchest.db so the real database is
+    never written to:
+
+        python bench_database.py [number_of_statements]
+"""
+
+import os
+import sys
+import shutil
+import sqlite3
+import tempfile
+import time
+from datetime import datetime
+from database import DB_FILENAME, ConnectionManager
+
+SELECT_QRY = 'SELECT AlgorithmInternalName FROM Algorithms WHERE AlgorithmID=?'
+INSERT_QRY = 'INSERT INTO Insights (ColumnIndex, ColumnName, InsightText, ' \
+    'InsightPriority, DateCreated, LanguageID) VALUES (?, ?, ?, ?, ?, ?)'
+
+
+def connect_per_call(db_filename, qry, parameters=()):
+    """ The way toolbox.exec_qry used to work """
+
+    with sqlite3.connect(db_filename) as conn:
+        cursor = conn.cursor()
+        qry_result = cursor.execute(qry, parameters)
+        conn.commit()
+    qry_result.fetchall()
+    conn.close()
+
+
+def insight_parameters(i):
+
+    return (i, 'col_' + str(i), 'benchmark insight', 'Low', datetime.now(), 1)
+
+
+def run(label, func, n):
+
+    start = time.perf_counter()
+    for i in range(n):
+        func(i)
+    elapsed = time.perf_counter() - start
+    print('%-40s %10.0f statements/sec' % (label, n / elapsed))
+
+
+def main(n=2000):
+
+    tmp_dir = tempfile.mkdtemp()
+    try:
+        db_filename = os.path.join(tmp_dir, 'warchest.db')
+        shutil.copyfile(DB_FILENAME, db_filename)
+
+        print('%d statements per run\n' % n)
+
+        run('SELECT, connect per call',
+            lambda i: connect_per_call(db_filename, SELECT_QRY, (i % 9 + 1,)),
+            n)
+        run('INSERT, connect per call',
+            lambda i: connect_per_call(db_filename, INSERT_QRY,
+                                       insight_parameters(i)),
+            n)
+
+        for synchronous in ('FULL', 'NORMAL', 'OFF'):
+            manager = ConnectionManager(db_filename,
+                                        journal_mode='WAL',
+                                        synchronous=synchronous)
+            run('SELECT, pooled (WAL, synchronous=%s)' % synchronous,
+                lambda i: manager.execute(SELECT_QRY,
+                                          (i % 9 + 1,)).fetchall(),
+                n)
+            run('INSERT, pooled (WAL, synchronous=%s)' % synchronous,
+                lambda i: manager.execute_insert(INSERT_QRY,
+                                                 insight_parameters(i)),
+                n)
+            manager.close_all()
+    finally:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1:
+        main(int(sys.argv[1]))
+    else:
+        main()
@@ -0,0 +1,98 @@
+"""
+    Warchest: Data management and automation GUI for Machine Learning projects
+    Created September 2017
+    Copyright (C) Nelson R Gonzalez
+
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+""" Load time of pd.read_csv against the dataset cache, first load
+    (parse and write the cache) and later loads (from the cache), for
+    the bundled datasets and a synthetic CSV of the given size.
+
+    The cache and the synthetic file go to a temporary directory:
+
+        python bench_dataset_cache.py [synthetic_megabytes]
+"""
+
+import os
+import sys
+import shutil
+import tempfile
+import time
+import numpy as np
+import pandas as pd
+from load_datasets import DatasetCache
+
+DATASETS = ('iris', 'wine', 'eda')
+
+
+def write_synthetic(file_name, megabytes):
+    """ Mixed numeric and text columns until the file has the size """
+
+    rng = np.random.default_rng(0)
+    words = np.array(['alpha', 'bravo', 'charlie', 'delta', 'echo'],
+                     dtype=object)
+    rows = 100000
+    header = True
+    with open(file_name, 'w', newline='') as f:
+        while f.tell() < megabytes * 1024 * 1024:
+            pd.DataFrame({
+                'id': np.arange(rows),
+                'count': rng.integers(0, 1000, rows),
+                'x': rng.normal(size=rows),
+                'y': rng.normal(size=rows),
+                'label': words[rng.integers(0, len(words), rows)],
+            }).to_csv(f, header=header, index=False)
+            header = False
+
+
+def timed(func, *args):
+
+    start = time.perf_counter()
+    func(*args)
+    return time.perf_counter() - start
+
+
+def bench(name, file_name, cache):
+
+    size = os.path.getsize(file_name) / 1024 / 1024
+    csv = timed(pd.read_csv, file_name)
+    first = timed(cache.read_csv, file_name)
+    later = min(timed(cache.read_csv, file_name) for i in range(3))
+    print('%-10s %9.1f MB  read_csv %8.3fs  first %8.3fs  cached %8.3fs'
+          '  %6.1fx' % (name, size, csv, first, later, csv / later))
+
+
+def main(megabytes=5120):
+
+    tmp_dir = tempfile.mkdtemp()
+    try:
+        cache = DatasetCache(os.path.join(tmp_dir, 'cache'),
+                             budget=float('inf'), min_size=0)
+        for name in DATASETS:
+            bench(name, './datasets/%s.csv' % name, cache)
+
+        synthetic = os.path.join(tmp_dir, 'synthetic.csv')
+        write_synthetic(synthetic, megabytes)
+        bench('synthetic', synthetic, cache)
+    finally:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1:
+        main(float(sys.argv[1]))
+    else:
+        main()
@@ -0,0 +1,106 @@
+"""
+    Warchest: Data management and automation GUI for Machine Learning projects
+    Created September 2017
+    Copyright (C) Nelson R Gonzalez
+
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+""" Frames per second scrolling the table a row and a page at a time,
+    with the canvas items pooled and with every item created again on
+    each redraw as before. Needs a display:
+
+        python bench_table_scroll.py [rows] [columns] [frames]
+"""
+
+import os
+import sys
+import time
+import tkinter as tk
+import numpy as np
+import pandas as pd
+from wcpandastable import Table
+
+
+class UnpooledTable(Table):
+    """ Creates every item again on each redraw """
+
+    def redrawVisible(self, event=None, callback=None):
+
+        for canvas in (self, self.tablecolheader, self.rowheader):
+            for name in ('linepool', 'textpool', 'rectpool'):
+                if hasattr(canvas, name):
+                    getattr(canvas, name).clear()
+        Table.redrawVisible(self, event, callback)
+
+
+def make_frame(rows, columns):
+
+    rng = np.random.default_rng(0)
+    words = np.array(['alpha', 'bravo', 'charlie', 'delta'], dtype=object)
+    data = {}
+    for i in range(columns):
+        if i % 3 == 2:
+            data['text%d' % i] = words[rng.integers(0, len(words), rows)]
+        else:
+            data['x%d' % i] = rng.normal(size=rows) * 1000
+    return pd.DataFrame(data)
+
+
+def get_last_item(table):
+
+    # item ids only grow, the last one counts the items ever created
+    items = [canvas.find_all() for canvas in
+             (table, table.tablecolheader, table.rowheader)]
+    return sum(max(found) if found else 0 for found in items)
+
+
+def scroll(root, table, frames, rows_per_frame):
+
+    rows = table.rows
+    created = get_last_item(table)
+    start = time.perf_counter()
+    for i in range(frames):
+        row = (i * rows_per_frame) % max(rows - rows_per_frame, 1)
+        table.set_yviews('moveto', row / rows)
+        root.update_idletasks()
+    elapsed = time.perf_counter() - start
+    return frames / elapsed, (get_last_item(table) - created) / frames
+
+
+def main(rows=100000, columns=30, frames=300):
+
+    root = tk.Tk()
+    root.geometry('1400x900')
+    df = make_frame(rows, columns)
+    here = os.path.dirname(os.path.abspath(__file__))
+
+    print('%d rows x %d columns, %d frames\n' % (rows, columns, frames))
+    for name, cls in (('created', UnpooledTable), ('pooled', Table)):
+        frame = tk.Frame(root)
+        frame.pack(fill=tk.BOTH, expand=1)
+        table = cls(frame, dataframe=df, absolute_path=here)
+        table.show()
+        root.update()
+        page = max(len(table.visiblerows), 1)
+        for label, step in (('row', 1), ('page', page)):
+            fps, items = scroll(root, table, frames, step)
+            print('%-8s by %-5s %8.1f fps  %8.1f items created per frame' %
+                  (name, label, fps, items))
+        frame.destroy()
+    root.destroy()
+
+
+if __name__ == "__main__":
+    main(*[int(arg) for arg in sys.argv[1:4]])
@@ -0,0 +1,147 @@
+"""
+    Warchest: Data management and automation GUI for Machine Learning projects
+    Created September 2017
+    Copyright (C) Nelson R Gonzalez
+
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+import itertools
+from collections import deque
+
+_pool_ids = itertools.count(1)
+
+
+class ItemPool():
+    """ Canvas items of one type reused from one redraw to the next
+
+    A redraw calls begin(), draw() once per item it wants and end().
+    draw() moves and reconfigures an item of the last redraw, creating
+    items only when there are more than ever before, and end() hides
+    the ones left over. Only what differs from the last redraw is sent
+    to Tk.
+
+    Items drawn with a key (a cell's row and column) get the item drawn
+    with that key last time, so scrolling leaves the cells that stay in
+    view alone and only redraws those scrolling in, in the items of
+    those that scrolled out; begin() is given the keys of the redraw.
+
+    Items keep the tags they are drawn with, so code that finds, lifts
+    or deletes them by tag still works; deleted items are noticed on the
+    next begin() and replaced.
+    """
+
+    def __init__(self, canvas, item_type, **options):
+
+        self.canvas = canvas
+        self.create = getattr(canvas, 'create_' + item_type)
+        self.options = options
+        self.pool_tag = 'pool%d' % next(_pool_ids)
+        self.items = []
+        # item -> [coords, options, tags, hidden] as last sent to Tk
+        self.state = {}
+        self.keyed = {}
+        self.previous = {}
+        self.free = deque()
+        self.used = []
+
+    def begin(self, *tags, keys=None):
+        """ Start a redraw of the items with keys, deleting the items
+        tagged with any of tags that are not from this pool, as redrawing
+        from scratch would """
+
+        canvas = self.canvas
+        for tag in tags:
+            canvas.delete('%s&&!%s' % (tag, self.pool_tag))
+        alive = canvas.find_withtag(self.pool_tag)
+        if len(alive) != len(self.items):
+            alive = set(alive)
+            self.items = [item for item in self.items if item in alive]
+            self.state = {item: self.state[item] for item in self.items}
+            self.keyed = {key: item for key, item in self.keyed.items()
+                          if item in alive}
+
+        if keys is None:
+            self.previous = {}
+            self.free = deque(self.items)
+        else:
+            self.previous = {key: item for key, item in self.keyed.items()
+                             if key in keys}
+            reserved = set(self.previous.values())
+            self.free = deque(item for item in self.items
+                              if item not in reserved)
+        self.keyed = {}
+        self.used = []
+
+    def draw(self, coords, tags=(), key=None, **options):
+
+        coords = tuple(coords)
+        tags = tuple(tags) + (self.pool_tag,)
+        item = self.previous.pop(key, None) if key is not None else None
+        if item is None and self.free:
+            item = self.free.popleft()
+
+        if item is None:
+            settings = dict(self.options)
+            settings.update(options)
+            item = self.create(*coords, tags=tags, **settings)
+            self.items.append(item)
+            self.state[item] = [coords, settings, tags, False]
+        else:
+            state = self.state[item]
+            if state[0] != coords:
+                self.canvas.coords(item, *coords)
+                state[0] = coords
+            changes = {name: value for name, value in options.items()
+                       if state[1].get(name) != value}
+            if state[2] != tags:
+                changes['tags'] = tags
+                state[2] = tags
+            if state[3]:
+                changes['state'] = 'normal'
+                state[3] = False
+            if changes:
+                self.canvas.itemconfigure(item, **changes)
+                state[1].update((name, value) for name, value in
+                                changes.items()
+                                if name not in ('tags', 'state'))
+        self.used.append(item)
+        if key is not None:
+            self.keyed[key] = item
+        return item
+
+    def end(self):
+        """ Hide the items this redraw did not use and raise the others,
+        where newly created items would be """
+
+        used = set(self.used)
+        for item in self.items:
+            state = self.state[item]
+            if item not in used and not state[3]:
+                self.canvas.itemconfigure(item, state='hidden')
+                state[3] = True
+        self.previous = {}
+        self.free = deque()
+        if used:
+            self.canvas.tag_raise(self.pool_tag)
+
+    def clear(self):
+
+        self.canvas.delete(self.pool_tag)
+        self.items = []
+        self.state = {}
+        self.keyed = {}
+        self.previous = {}
+        self.free = deque()
+        self.used = []
@@ -0,0 +1,156 @@
+"""
+    Warchest: Data management and automation GUI for Machine Learning projects
+    Created September 2017
+    Copyright (C) Nelson R Gonzalez
+
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+import threading
+from collections import OrderedDict
+import numpy as np
+import pandas as pd
+from global_config import g
+
+# rows formatted together, windows are built from these aligned blocks
+# so scrolling by a few rows reuses the blocks already formatted
+BLOCK_ROWS = 128
+
+
+def format_cells(col_values, precision=0):
+    """ The text of every cell of col_values, a list of str
+
+    float64 columns get precision digits, in fixed notation from 1 up
+    and significant digits below it; missing values are empty.
+    """
+
+    values = col_values.to_numpy(dtype=object)
+    missing = pd.isna(values)
+    if precision and col_values.dtype == 'float64':
+        x = col_values.to_numpy()
+        small_fmt = '%%.%dg' % precision
+        fmt = '%%.%df' % precision
+        with np.errstate(invalid='ignore'):
+            small = (x < 1).tolist()
+        texts = [(small_fmt if s else fmt) % v
+                 for s, v in zip(small, x.tolist())]
+    else:
+        texts = [str(v) for v in values]
+    if missing.any():
+        for i in np.flatnonzero(missing).tolist():
+            texts[i] = ''
+    return texts
+
+
+class CharWidths():
+    """ Pixel widths of the characters of a font, each measured once
+
+    measure is the font's own measure function (tkinter.font.Font), so
+    a text's width is a sum of cached widths instead of a canvas item
+    created and measured for every cell.
+    """
+
+    def __init__(self, measure):
+
+        self.measure = measure
+        self.widths = {}
+        self.widest = 0
+
+    def get_width(self, char):
+
+        width = self.widths.get(char)
+        if width is None:
+            width = self.widths[char] = self.measure(char)
+            self.widest = max(self.widest, width)
+        return width
+
+    def get_text_width(self, text):
+
+        return sum(map(self.get_width, text))
+
+    def truncate(self, text, width):
+        """ The longest start of text no wider than width """
+
+        total = 0
+        for i, char in enumerate(text):
+            total += self.get_width(char)
+            if total > width:
+                return text[:i]
+        return text
+
+    def truncate_all(self, texts, width):
+
+        # texts short enough in the widest character seen fit as they are
+        for char in set(''.join(texts)) - set(self.widths):
+            self.get_width(char)
+        fits = int(width // self.widest) if self.widest else 0
+        return [text if len(text) <= fits else self.truncate(text, width)
+                for text in texts]
+
+
+class CellFormatter():
+    """ Formatted, truncated text of the visible cells of a table
+
+    Columns are formatted BLOCK_ROWS rows at a time and every block is
+    kept, least recently used going first past max_blocks, keyed on the
+    column, its data version, the block, the precision and the width
+    the text was cut to. A redraw only formats blocks that scrolled in
+    or whose column changed since.
+    """
+
+    def __init__(self, max_blocks=None):
+
+        if max_blocks is None:
+            max_blocks = g.cell_format_cache_blocks
+        self.max_blocks = max_blocks
+        self._blocks = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_texts(self, model, col, start, stop, precision=0, width=None,
+                  char_widths=None):
+        """ Text of the cells of column col in rows [start, stop) """
+
+        df = model.frame
+        name = df.columns[col]
+        version = model.getColumnVersion(name)
+        rows = len(df.index)
+        texts = []
+        first = start // BLOCK_ROWS
+        last = (stop - 1) // BLOCK_ROWS
+        for block in range(first, last + 1):
+            key = (col, name, version, block, precision, width)
+            with self._lock:
+                block_texts = self._blocks.get(key)
+                if block_texts is not None:
+                    self._blocks.move_to_end(key)
+            if block_texts is None:
+                block_start = block * BLOCK_ROWS
+                block_stop = min(block_start + BLOCK_ROWS, rows)
+                col_values = df.iloc[range(block_start, block_stop), col]
+                block_texts = format_cells(col_values, precision)
+                if width is not None and char_widths is not None:
+                    block_texts = char_widths.truncate_all(block_texts,
+                                                           width)
+                with self._lock:
+                    self._blocks[key] = block_texts
+                    while len(self._blocks) > self.max_blocks:
+                        self._blocks.popitem(last=False)
+            texts.extend(block_texts)
+        offset = start - first * BLOCK_ROWS
+        return texts[offset:offset + stop - start]
+
+    def clear(self):
+
+        with self._lock:
+            self._blocks.clear()
@@ -18,6 +18,7 @@
 """
 
 import numpy as np
+from sklearn.base import BaseEstimator
 from sklearn.linear_model import Perceptron
 from sklearn.linear_model import LogisticRegression
 from sklearn.svm import SVC, LinearSVC
@@ -29,7 +30,7 @@ from modeltasks import ModelTask
 import json
 
 
-def process_clf(clf, x_train, x_test, y_train, y_test, session_id, simple_set_id, algorithm_id, **kwargs):
+def score_clf(clf, x_train, x_test, y_train, y_test):
 
     clf.fit(x_train, y_train)
     y_pred = clf.predict(x_test)
@@ -44,80 +45,125 @@ def process_clf(clf, x_train, x_test, y_train, y_test, session_id, simple_set_id
     else:
         overfitting = ""
 
+    return {'misclassified_samples': misc_samples,
+            'misclassified_error': misc_error,
+            'skl_accuracy_score': accuracy,
+            'training_accuracy': training_accuracy,
+            'test_accuracy': test_accuracy,
+            'overfitting': overfitting}
+
+
+def save_clf_results(results, session_id, simple_set_id, algorithm_id,
+                     batch=None, **kwargs):
+
     model_task = ModelTask()
-    model_task.add_simple_set_entry(session=session_id,
-                                    simple_set_id=simple_set_id,
-                                    algorithm_id=algorithm_id,
-                                    parameters=json.dumps(kwargs),
-                                    misclassified_samples=misc_samples,
-                                    misclassified_error=misc_error,
-                                    skl_accuracy_score=accuracy,
-                                    training_accuracy=training_accuracy,
-                                    test_accuracy=test_accuracy,
-                                    overfitting=overfitting)
+    return model_task.add_simple_set_entry(session=session_id,
+                                           simple_set_id=simple_set_id,
+                                           algorithm_id=algorithm_id,
+                                           parameters=json.dumps(kwargs),
+                                           batch=batch,
+                                           **results)
+
+
+def print_clf_results(results, algorithm_id):
 
     print("\nResults:")
     print("-----------------------------------------")
     print('Algorithm: %d' % algorithm_id)
-    print('Misclassified samples: %d' % misc_samples)
-    print('Misclassified error: %.2f' % misc_error)
-    print('Accuracy: %.5f' % accuracy)
-    print('\nTraining accuracy: %.5f' % training_accuracy)
-    print('Test accuracy: %.5f' % test_accuracy)
-    if (training_accuracy > test_accuracy):
+    print('Misclassified samples: %d' % results['misclassified_samples'])
+    print('Misclassified error: %.2f' % results['misclassified_error'])
+    print('Accuracy: %.5f' % results['skl_accuracy_score'])
+    print('\nTraining accuracy: %.5f' % results['training_accuracy'])
+    print('Test accuracy: %.5f' % results['test_accuracy'])
+    if results['overfitting'] == "Possible":
         print("Possible overfitting.")
 
 
+def process_clf(clf, x_train, x_test, y_train, y_test, session_id, simple_set_id, algorithm_id, batch=None, **kwargs):
+
+    results = score_clf(clf, x_train, x_test, y_train, y_test)
+    save_clf_results(results, session_id, simple_set_id, algorithm_id,
+                     batch=batch, **kwargs)
+    print_clf_results(results, algorithm_id)
+
+
 def clf_sklearn_perceptron(x_train, x_test, y_train, y_test, session_id,
-                           simple_set_id, algorithm_id, **kwargs):
+                           simple_set_id, algorithm_id, batch=None, **kwargs):
 
     clf = Perceptron(**kwargs)
-    process_clf(clf, x_train, x_test, y_train, y_test, session_id, simple_set_id, algorithm_id, **kwargs)
+    process_clf(clf, x_train, x_test, y_train, y_test, session_id, simple_set_id, algorithm_id, batch=batch, **kwargs)
     return clf
 
 def clf_sklearn_logistic_regression(x_train, x_test, y_train, y_test,
-                                    session_id, simple_set_id, algorithm_id, **kwargs):
+                                    session_id, simple_set_id, algorithm_id, batch=None, **kwargs):
 
     clf = LogisticRegression(**kwargs)
-    process_clf(clf, x_train, x_test, y_train, y_test, session_id, simple_set_id, algorithm_id, **kwargs)
+    process_clf(clf, x_train, x_test, y_train, y_test, session_id, simple_set_id, algorithm_id, batch=batch, **kwargs)
     return clf
 
 
 def clf_sklearn_linear_svm(x_train, x_test, y_train, y_test, session_id,
-                           simple_set_id, algorithm_id, **kwargs):
+                           simple_set_id, algorithm_id, batch=None, **kwargs):
 
     clf = LinearSVC(**kwargs)
-    process_clf(clf, x_train, x_test, y_train, y_test, session_id, simple_set_id, algorithm_id, **kwargs)
+    process_clf(clf, x_train, x_test, y_train, y_test, session_id, simple_set_id, algorithm_id, batch=batch, **kwargs)
     return clf
 
 
 def clf_sklearn_kernel_svm(x_train, x_test, y_train, y_test, session_id,
-                           simple_set_id, algorithm_id, **kwargs):
+                           simple_set_id, algorithm_id, batch=None, **kwargs):
 
     clf = SVC(**kwargs)
-    process_clf(clf, x_train, x_test, y_train, y_test, session_id, simple_set_id, algorithm_id, **kwargs)
+    process_clf(clf, x_train, x_test, y_train, y_test, session_id, simple_set_id, algorithm_id, batch=batch, **kwargs)
     return clf
 
 
 def clf_sklearn_decision_tree(x_train, x_test, y_train, y_test, session_id,
-                              simple_set_id, algorithm_id, **kwargs):
+                              simple_set_id, algorithm_id, batch=None, **kwargs):
 
     clf = DecisionTreeClassifier(**kwargs)
-    process_clf(clf, x_train, x_test, y_train, y_test, session_id, simple_set_id, algorithm_id, **kwargs)
+    process_clf(clf, x_train, x_test, y_train, y_test, session_id, simple_set_id, algorithm_id, batch=batch, **kwargs)
     return clf
 
 
 def clf_sklearn_random_forest(x_train, x_test, y_train, y_test, session_id,
-                              simple_set_id, algorithm_id, **kwargs):
+                              simple_set_id, algorithm_id, batch=None, **kwargs):
 
     clf = RandomForestClassifier(**kwargs)
-    process_clf(clf, x_train, x_test, y_train, y_test, session_id, simple_set_id, algorithm_id, **kwargs)
+    process_clf(clf, x_train, x_test, y_train, y_test, session_id, simple_set_id, algorithm_id, batch=batch, **kwargs)
     return clf
 
 
 def clf_sklearn_k_neighbors(x_train, x_test, y_train, y_test, session_id,
-                            simple_set_id, algorithm_id, **kwargs):
+                            simple_set_id, algorithm_id, batch=None, **kwargs):
 
     clf = KNeighborsClassifier(**kwargs)
-    process_clf(clf, x_train, x_test, y_train, y_test, session_id, simple_set_id, algorithm_id, **kwargs)
+    process_clf(clf, x_train, x_test, y_train, y_test, session_id, simple_set_id, algorithm_id, batch=batch, **kwargs)
     return clf
+
+
+# Algorithms.AlgorithmInternalName -> estimator, used by modelrunner to
+# build classifiers in worker processes
+CLASSIFIERS = {
+    'clf_sklearn_perceptron': Perceptron,
+    'clf_sklearn_logistic_regression': LogisticRegression,
+    'clf_sklearn_linear_svm': LinearSVC,
+    'clf_sklearn_kernel_svm': SVC,
+    'clf_sklearn_decision_tree': DecisionTreeClassifier,
+    'clf_sklearn_random_forest': RandomForestClassifier,
+    'clf_sklearn_k_neighbors': KNeighborsClassifier,
+}
+
+
+def get_classifier(internal_name):
+    """ The estimator class of an Algorithms internal name, from
+    CLASSIFIERS or else an estimator class of that name in this module,
+    None if neither """
+
+    if internal_name in CLASSIFIERS:
+        return CLASSIFIERS[internal_name]
+    obj = globals().get(internal_name)
+    # functions and modules of the same name cannot be built from params
+    if isinstance(obj, type) and issubclass(obj, BaseEstimator):
+        return obj
+    return None
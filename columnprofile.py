@@ -0,0 +1,256 @@
+"""
+    Warchest: Data management and automation GUI for Machine Learning projects
+    Created September 2017
+    Copyright (C) Nelson R Gonzalez
+
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+import sys
+import threading
+from collections import namedtuple
+import numpy as np
+import pandas as pd
+
+# quantiles shown in the Column tab
+QUANTILES = (.05, .25, .5, .75, .95)
+
+# bytes sys.getsizeof adds on top of Series.__sizeof__ (gc header)
+_empty = pd.Series([], dtype='float64')
+GC_OVERHEAD = sys.getsizeof(_empty) - _empty.__sizeof__()
+del _empty
+
+NUMERICAL_DTYPES = ('float16', 'float32', 'float64',
+                    'int8', 'int16', 'int32', 'int64',
+                    'uint8', 'uint16', 'uint32', 'uint64')
+
+
+def get_feature_type(col_values):
+
+    if col_values.dtype.name == "category":
+        return "categorical/factor"
+    elif col_values.dtype == "object":
+        return "nominal or ordinal"
+    elif col_values.dtype == "bool":
+        return "boolean"
+    elif col_values.dtype.name in NUMERICAL_DTYPES:
+        return "numerical"
+    elif col_values.dtype.name in ('complex64', 'complex128'):
+        return "complex (numerical)"
+    elif col_values.dtype == "datetime64[ns]":
+        return "datetime"
+    else:
+        return "unknown"
+
+
+_ColumnProfile = namedtuple('ColumnProfile', [
+    # general information
+    'name', 'index', 'dtype', 'feature_type', 'dense_sparse',
+    'length', 'count', 'missing', 'duplicates', 'unique', 'mode',
+    # memory usage
+    'nbytes', 'index_nbytes', 'memusage', 'memusage_with_index',
+    'deep_memusage_with_index', 'getsizeof',
+    # statistics, None unless the column is numerical
+    'mean', 'median', 'std', 'mad', 'sem', 'skew', 'kurt', 'var', 'sum',
+    'min', 'argmin', 'max', 'argmax', 'ptp', 'quantiles'])
+
+
+class ColumnProfile(_ColumnProfile):
+    """ Everything the Column tab shows about one column
+
+    Built once by profile_column() and never changed afterwards, the
+    widgets only format its fields.
+    """
+
+    __slots__ = ()
+
+    def is_numerical(self):
+
+        return self.feature_type == "numerical"
+
+    def quantile(self, q):
+
+        return self.quantiles[QUANTILES.index(q)]
+
+
+def profile_column(col_values, index=None):
+    """ Profile a column (a Series) in one go
+
+    The values are copied out of pandas once. Null mask, distinct
+    values, duplicates and mode all come from a single hash
+    factorization, the moments from one set of deviations, and the
+    quantiles (and median) from one partition.
+    """
+
+    length = len(col_values)
+    feature_type = get_feature_type(col_values)
+
+    missing_mask = pd.isna(col_values).to_numpy()
+    missing = int(missing_mask.sum())
+    non_null = col_values[~missing_mask] if missing else col_values
+
+    # distinct values, duplicates and mode
+    codes, uniques = pd.factorize(non_null, sort=False)
+    counts = np.bincount(codes, minlength=len(uniques))
+    if len(counts):
+        duplicates = int(counts[counts > 1].sum())
+        modes = uniques[counts == counts.max()]
+        try:
+            modes = np.sort(np.asarray(modes))
+        except TypeError:
+            # mixed types in an object column cannot be ordered
+            modes = np.asarray(modes)
+        mode = tuple(modes)
+    else:
+        duplicates = 0
+        mode = ()
+
+    # memory usage, deep usage is only computed once since it walks
+    # every python object of an object column
+    memusage = int(col_values.memory_usage(index=False, deep=False))
+    index_memusage = int(col_values.index.memory_usage(deep=False))
+    deep_memusage_with_index = int(col_values.memory_usage(index=True,
+                                                           deep=True))
+
+    stats = dict.fromkeys(['mean', 'median', 'std', 'mad', 'sem', 'skew',
+                           'kurt', 'var', 'sum', 'min', 'argmin', 'max',
+                           'argmax', 'ptp', 'quantiles'])
+    if feature_type == "numerical":
+        stats = _numerical_stats(col_values.to_numpy(), missing_mask)
+
+    return ColumnProfile(
+        name=col_values.name,
+        index=index,
+        dtype=str(col_values.dtype),
+        feature_type=feature_type,
+        dense_sparse='sparse' if isinstance(col_values.dtype,
+                                            pd.SparseDtype) else 'dense',
+        length=length,
+        count=length - missing,
+        missing=missing,
+        duplicates=duplicates,
+        unique=len(uniques),
+        mode=mode,
+        nbytes=int(col_values.nbytes),
+        index_nbytes=int(col_values.index.nbytes),
+        memusage=memusage,
+        memusage_with_index=memusage + index_memusage,
+        deep_memusage_with_index=deep_memusage_with_index,
+        getsizeof=deep_memusage_with_index + GC_OVERHEAD,
+        **stats)
+
+
+def _numerical_stats(values, missing_mask):
+    """ Moments, extremes and quantiles of a numerical array
+
+    Same definitions as the pandas reductions they replace: sample
+    variance (ddof=1), bias corrected skewness and excess kurtosis.
+    """
+
+    nan = float('nan')
+    positions = np.flatnonzero(~missing_mask)
+    valid = values[positions] if len(positions) < len(values) else values
+    n = len(valid)
+
+    if n == 0:
+        return dict(mean=nan, median=nan, std=nan, mad=nan, sem=nan,
+                    skew=nan, kurt=nan, var=nan, sum=0, min=nan,
+                    argmin=nan, max=nan, argmax=nan, ptp=nan,
+                    quantiles=(nan,) * len(QUANTILES))
+
+    x = valid.astype(np.float64, copy=False)
+    total = x.sum()
+    mean = total / n
+    d = x - mean
+    d2 = d * d
+    m2 = d2.sum()
+    m3 = (d2 * d).sum()
+    m4 = (d2 * d2).sum()
+
+    var = m2 / (n - 1) if n > 1 else nan
+    std = np.sqrt(var)
+
+    if n < 3:
+        skew = nan
+    elif m2 == 0:
+        skew = 0.0
+    else:
+        skew = n * (n - 1) ** 0.5 / (n - 2) * m3 / m2 ** 1.5
+
+    if n < 4:
+        kurt = nan
+    elif m2 == 0:
+        kurt = 0.0
+    else:
+        kurt = (n * (n + 1) * (n - 1) * m4 /
+                ((n - 2) * (n - 3) * m2 ** 2) -
+                3 * (n - 1) ** 2 / ((n - 2) * (n - 3)))
+
+    argmin = int(valid.argmin())
+    argmax = int(valid.argmax())
+    quantiles = tuple(float(q) for q in np.quantile(x, QUANTILES))
+
+    return dict(mean=mean,
+                median=quantiles[QUANTILES.index(.5)],
+                std=std,
+                mad=np.abs(d).sum() / n,
+                sem=std / np.sqrt(n),
+                skew=skew,
+                kurt=kurt,
+                var=var,
+                # integer columns keep their exact sum
+                sum=valid.sum() if valid.dtype.kind in 'iu' else total,
+                min=valid[argmin],
+                argmin=int(positions[argmin]),
+                max=valid[argmax],
+                argmax=int(positions[argmax]),
+                ptp=float(valid[argmax]) - float(valid[argmin]),
+                quantiles=quantiles)
+
+
+class ProfileCache():
+    """ Column profiles keyed on (column, data version)
+
+    The TableModel bumps a column's version whenever its data changes,
+    so going back to a column that did not change returns the profile
+    computed the last time instead of scanning the column again.
+    """
+
+    def __init__(self):
+
+        self._profiles = {}
+        self._lock = threading.Lock()
+
+    def get_profile(self, model, index):
+
+        df = model.frame
+        name = df.columns[index]
+        # read before profiling, a change made meanwhile gets a newer
+        # version and is picked up on the next call
+        version = model.getColumnVersion(name)
+
+        with self._lock:
+            cached = self._profiles.get((index, name))
+        if cached is not None and cached[0] == version:
+            return cached[1]
+
+        profile = profile_column(df.iloc[:, index], index)
+        with self._lock:
+            self._profiles[(index, name)] = (version, profile)
+        return profile
+
+    def clear(self):
+
+        with self._lock:
+            self._profiles.clear()
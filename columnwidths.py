@@ -0,0 +1,146 @@
+"""
+    Warchest: Data management and automation GUI for Machine Learning projects
+    Created September 2017
+    Copyright (C) Nelson R Gonzalez
+
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+import threading
+import numpy as np
+import pandas as pd
+from global_config import g
+
+
+def get_text_length(value):
+    """ Length of a cell value as the table sizes it, floats to 3 places """
+
+    if isinstance(value, (float, np.floating)):
+        if np.isnan(value):
+            return 0
+        value = round(float(value), 3)
+    return len(str(value))
+
+
+def get_longest(col_values):
+    """ Length of the longest value of col_values as text, every value
+    converted (the exact mode) """
+
+    if col_values.dtype == 'float64':
+        col_values = col_values.round(3)
+    longest = col_values.astype('object').astype('str').str.len().max()
+    if pd.isnull(longest):
+        return 0
+    return int(longest)
+
+
+def get_sample_positions(rows, sample_size, strata):
+    """ Rows of a stratified sample: a run of rows from a random start in
+    each of strata equal parts, the same for every column of a table so
+    a paged table reads the same few pages for all of them """
+
+    if rows <= sample_size:
+        return np.arange(rows)
+    strata = max(1, min(strata, sample_size))
+    run = sample_size // strata
+    bounds = np.linspace(0, rows, strata + 1).astype(np.int64)
+    rng = np.random.default_rng(rows)
+    positions = []
+    for start, stop in zip(bounds[:-1], bounds[1:]):
+        first = start + rng.integers(0, max(1, stop - start - run + 1))
+        positions.append(np.arange(first, min(first + run, stop)))
+    # the first rows are the ones shown when the table opens
+    positions.append(np.arange(min(run, rows)))
+    return np.unique(np.concatenate(positions))
+
+
+class ColumnWidthEstimator():
+    """ Longest text of each column, for sizing the table's columns
+
+    Integer and category columns are measured exactly from their range or
+    categories. Other columns are measured on a stratified sample of
+    sample_size rows unless exact is set. Results are kept per column
+    version, and an edited cell only grows the kept length (update), so
+    editing does not measure the column again.
+    """
+
+    def __init__(self, sample_size=None, strata=None, exact=None):
+
+        if sample_size is None:
+            sample_size = g.column_width_sample_size
+        if strata is None:
+            strata = g.column_width_strata
+        if exact is None:
+            exact = g.column_width_exact
+        self.sample_size = sample_size
+        self.strata = strata
+        self.exact = exact
+        self._longest = {}
+        self._lock = threading.Lock()
+
+    def get_longest(self, model, index):
+
+        df = model.frame
+        name = df.columns[index]
+        version = model.getColumnVersion(name)
+        with self._lock:
+            cached = self._longest.get((index, name))
+        if cached is not None and cached[0] == version:
+            return cached[1]
+
+        longest = self.estimate(df, index)
+        with self._lock:
+            self._longest[(index, name)] = (version, longest)
+        return longest
+
+    def estimate(self, df, index):
+
+        dtype = df.dtypes.iloc[index]
+        if isinstance(dtype, pd.CategoricalDtype):
+            categories = dtype.categories
+            return get_longest(pd.Series(categories)) if len(categories) \
+                else 0
+        if isinstance(dtype, np.dtype) and dtype.kind == 'b':
+            return len('False')
+
+        is_int = isinstance(dtype, np.dtype) and dtype.kind in 'iu'
+        is_paged = hasattr(df, 'get_page')
+        if self.exact or (is_int and not is_paged) or \
+                len(df.index) <= self.sample_size:
+            col_values = df.iloc[:, index]
+            if is_int and len(col_values):
+                # the widest integer is the smallest or the largest
+                return max(len(str(col_values.min())),
+                           len(str(col_values.max())))
+            return get_longest(col_values)
+
+        positions = get_sample_positions(len(df.index), self.sample_size,
+                                         self.strata)
+        return get_longest(df.iloc[positions, index])
+
+    def update(self, index, name, old_version, new_version, value):
+        """ Grow the kept length of a column after a cell edit that moved
+        it from old_version to new_version """
+
+        with self._lock:
+            cached = self._longest.get((index, name))
+            if cached is None or cached[0] != old_version:
+                return
+            self._longest[(index, name)] = (
+                new_version, max(cached[1], get_text_length(value)))
+
+    def clear(self):
+
+        with self._lock:
+            self._longest.clear()
@@ -0,0 +1,332 @@
+"""
+    Warchest: Data management and automation GUI for Machine Learning projects
+    Created September 2017
+    Copyright (C) Nelson R Gonzalez
+
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+import io
+import os
+import multiprocessing as mp
+import pandas as pd
+from pandas.api.types import (is_object_dtype, is_string_dtype,
+                              union_categoricals)
+from global_config import g
+
+# options that only apply at the start of the file
+HEADER_OPTIONS = ('header', 'skiprows', 'names')
+
+
+def is_text_dtype(dtype):
+    """ object, or the str dtype pandas 3 reads text as, not category """
+
+    if isinstance(dtype, pd.CategoricalDtype):
+        return False
+    return is_object_dtype(dtype) or is_string_dtype(dtype)
+
+
+def get_import_workers():
+
+    if g.import_workers:
+        return g.import_workers
+    return os.cpu_count() or 1
+
+
+def read_preview(file_name, encoding=None, size_kb=None):
+    """ The first size_kb KB of a text file, cut at the last full line """
+
+    if size_kb is None:
+        size_kb = g.import_preview_kb
+    with open(file_name, 'rb') as f:
+        data = f.read(size_kb * 1024)
+        more = f.read(1) != b''
+    if more and b'\n' in data:
+        data = data[:data.rindex(b'\n') + 1]
+    return data.decode(encoding or 'utf-8', errors='replace')
+
+
+def _read_range(file_name, start, end, options):
+    """ Parse the bytes [start, end) of file_name, in a worker process """
+
+    with open(file_name, 'rb') as f:
+        f.seek(start)
+        data = f.read(end - start)
+    return pd.read_csv(io.BytesIO(data), **options)
+
+
+class CSVIngest():
+    """ Read a CSV file in chunks, in parallel when it is large
+
+    The file is split at line boundaries into chunks of about
+    rows_per_chunk rows (estimated from a sample of the first rows) and
+    each chunk is parsed by a process of a pool, reading its own byte
+    range. The first chunk is parsed with the header options, the
+    others with the column names it found.
+
+    Text columns of the sample with few distinct values are read as
+    category, the chunks' categories being merged at the end. A column
+    that is text in some chunk only is parsed again as text in the
+    others, so the result matches a single read_csv of the file.
+
+    Files with quotes (a quoted field may hold a newline), an index
+    column or an encoding where a newline is not the byte '\\n' are
+    read one chunk after another with read_csv's own chunksize.
+    """
+
+    def __init__(self, file_name, options=None, rows_per_chunk=None,
+                 workers=None, compact=True):
+
+        if rows_per_chunk is None:
+            rows_per_chunk = g.load_chunk_rows
+        if workers is None:
+            workers = get_import_workers()
+        self.file_name = file_name
+        self.options = {key: value for key, value in (options or {}).items()
+                        if value is not None}
+        self.rows_per_chunk = max(1, int(rows_per_chunk))
+        self.workers = max(1, workers)
+        self.compact = compact
+        self.size = os.path.getsize(file_name)
+        self.hints = {}
+        self.pool = None
+
+    def read(self, on_progress=None, check_cancelled=None):
+        """ The whole file as a DataFrame
+
+        on_progress(done, total) gets the bytes parsed so far,
+        check_cancelled() is called between chunks.
+        """
+
+        sample, sample_bytes = self.read_sample()
+        if self.compact:
+            self.hints = self.get_dtype_hints(sample)
+
+        if not self.can_split(sample_bytes):
+            return self.read_sequential(on_progress, check_cancelled)
+
+        rows = max(1, len(sample))
+        chunk_bytes = max(len(sample_bytes),
+                          len(sample_bytes) * self.rows_per_chunk // rows)
+        ranges = self.split(chunk_bytes)
+        return self.read_ranges(ranges, on_progress, check_cancelled)
+
+    def read_sample(self):
+
+        nrows = g.import_sample_rows
+        with open(self.file_name, 'rb') as f:
+            sample_bytes = b''
+            # grow the sample until it holds nrows lines past the header
+            size = 64 * 1024
+            while True:
+                f.seek(0)
+                sample_bytes = f.read(size)
+                if len(sample_bytes) < size or \
+                        sample_bytes.count(b'\n') > nrows + 10:
+                    break
+                size *= 2
+        if len(sample_bytes) == self.size:
+            complete = sample_bytes
+        else:
+            complete = sample_bytes[:sample_bytes.rindex(b'\n') + 1] \
+                if b'\n' in sample_bytes else sample_bytes
+        options = dict(self.options)
+        options['nrows'] = nrows
+        sample = pd.read_csv(io.BytesIO(complete), **options)
+        return sample, complete
+
+    def get_dtype_hints(self, sample):
+
+        hints = {}
+        if len(sample) == 0:
+            return hints
+        for name in sample.columns:
+            col_values = sample[name]
+            if not is_text_dtype(col_values.dtype):
+                continue
+            try:
+                unique = col_values.nunique()
+            except TypeError:
+                continue
+            if unique <= g.downcast_category_max_ratio * len(col_values):
+                hints[name] = 'category'
+        return hints
+
+    def can_split(self, sample_bytes):
+
+        encoding = self.options.get('encoding') or 'utf-8'
+        try:
+            ascii_newlines = 'a,\n'.encode(encoding) == b'a,\n'
+        except LookupError:
+            ascii_newlines = False
+        return (ascii_newlines and
+                self.options.get('index_col') is None and
+                b'"' not in sample_bytes and
+                self.size > len(sample_bytes))
+
+    def split(self, chunk_bytes):
+        """ (start, end) byte ranges, each ending after a newline """
+
+        ranges = []
+        start = 0
+        with open(self.file_name, 'rb') as f:
+            while start < self.size:
+                end = start + chunk_bytes
+                if end >= self.size:
+                    end = self.size
+                else:
+                    f.seek(end)
+                    rest = f.readline()
+                    end += len(rest)
+                ranges.append((start, end))
+                start = end
+        return ranges
+
+    def read_ranges(self, ranges, on_progress, check_cancelled):
+
+        first = dict(self.options)
+        first['dtype'] = self.hints or None
+        head = _read_range(self.file_name, ranges[0][0], ranges[0][1], first)
+        done = ranges[0][1]
+        if on_progress is not None:
+            on_progress(done, self.size)
+
+        rest = {key: value for key, value in self.options.items()
+                if key not in HEADER_OPTIONS}
+        rest['header'] = None
+        rest['names'] = self.get_file_columns(ranges[0])
+        rest['dtype'] = self.hints or None
+
+        parallel = self.workers > 1 and len(ranges) > 2 and \
+            self.size >= g.import_parallel_min_bytes
+        chunks = [head]
+        if parallel:
+            # spawn, so workers never inherit a forked copy of the Tk app
+            self.pool = mp.get_context('spawn').Pool(
+                processes=min(self.workers, len(ranges) - 1))
+            try:
+                results = [self.pool.apply_async(
+                    _read_range, (self.file_name, start, end, rest))
+                    for start, end in ranges[1:]]
+                for (start, end), result in zip(ranges[1:], results):
+                    while not result.ready():
+                        if check_cancelled is not None:
+                            check_cancelled()
+                        result.wait(0.1)
+                    chunks.append(result.get())
+                    done += end - start
+                    if on_progress is not None:
+                        on_progress(done, self.size)
+            finally:
+                self.close()
+        else:
+            for start, end in ranges[1:]:
+                if check_cancelled is not None:
+                    check_cancelled()
+                chunks.append(_read_range(self.file_name, start, end, rest))
+                done += end - start
+                if on_progress is not None:
+                    on_progress(done, self.size)
+
+        self.reconcile(chunks, ranges, first, rest)
+        return self.combine(chunks)
+
+    def get_file_columns(self, head_range):
+        """ Names of every column of the file, usecols or not """
+
+        options = {key: value for key, value in self.options.items()
+                   if key != 'usecols'}
+        options['nrows'] = 0
+        return list(_read_range(self.file_name, head_range[0], head_range[1],
+                                options).columns)
+
+    def read_sequential(self, on_progress, check_cancelled, dtype=None):
+
+        options = dict(self.options)
+        options['dtype'] = dtype or self.hints or None
+        chunks = []
+        with open(self.file_name, 'rb') as f:
+            for chunk in pd.read_csv(f, chunksize=self.rows_per_chunk,
+                                     **options):
+                if check_cancelled is not None:
+                    check_cancelled()
+                chunks.append(chunk)
+                if on_progress is not None:
+                    on_progress(f.tell(), self.size)
+        if not chunks:
+            return pd.read_csv(self.file_name, **options)
+
+        names = self.get_mixed_columns(chunks)
+        if names and dtype is None:
+            # chunks are not byte ranges here, read it all again
+            dtype = dict(self.hints)
+            dtype.update((name, str) for name in names)
+            return self.read_sequential(on_progress, check_cancelled, dtype)
+        return self.combine(chunks)
+
+    def get_mixed_columns(self, chunks):
+        """ Columns that are text in some chunk and not in another """
+
+        text = set()
+        for chunk in chunks:
+            text.update(name for name, dtype in chunk.dtypes.items()
+                        if is_text_dtype(dtype))
+        return set(name for chunk in chunks
+                   for name, dtype in chunk.dtypes.items()
+                   if name in text and not is_text_dtype(dtype) and
+                   not isinstance(dtype, pd.CategoricalDtype))
+
+    def reconcile(self, chunks, ranges, first, rest):
+        """ Parse again as text the chunks where a column was not text
+        while other chunks found text in it """
+
+        mixed = self.get_mixed_columns(chunks)
+        for i, chunk in enumerate(chunks):
+            names = [name for name, dtype in chunk.dtypes.items()
+                     if name in mixed and not is_text_dtype(dtype)]
+            if not names:
+                continue
+            # str is the dtype read_csv gives text, object or pandas 3 str
+            options = dict(first if i == 0 else rest)
+            options['dtype'] = dict(self.hints)
+            options['dtype'].update((name, str) for name in names)
+            chunks[i] = _read_range(self.file_name, ranges[i][0],
+                                    ranges[i][1], options)
+
+    def combine(self, chunks):
+
+        # chunks only share a column's category dtype once they all have
+        # the categories every chunk found
+        for name, dtype in chunks[0].dtypes.items():
+            if not isinstance(dtype, pd.CategoricalDtype) or \
+                    not all(isinstance(chunk[name].dtype, pd.CategoricalDtype)
+                            for chunk in chunks[1:]):
+                continue
+            categories = union_categoricals(
+                [chunk[name] for chunk in chunks]).categories
+            for chunk in chunks:
+                chunk[name] = chunk[name].cat.set_categories(categories)
+
+        if len(chunks) == 1:
+            return chunks[0]
+        if self.options.get('index_col') is None:
+            return pd.concat(chunks, ignore_index=True)
+        return pd.concat(chunks)
+
+    def close(self):
+
+        if self.pool is not None:
+            self.pool.terminate()
+            self.pool.join()
+            self.pool = None
@@ -0,0 +1,263 @@
+"""
+    Warchest: Data management and automation GUI for Machine Learning projects
+    Created September 2017
+    Copyright (C) Nelson R Gonzalez
+
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+import os
+import atexit
+import sqlite3
+import threading
+from contextlib import nullcontext
+from global_config import g
+
+# warchest.db lives next to the application py files
+DB_FILENAME = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                           'warchest.db')
+
+JOURNAL_MODES = ('DELETE', 'TRUNCATE', 'PERSIST', 'MEMORY', 'WAL', 'OFF')
+SYNCHRONOUS_LEVELS = ('OFF', 'NORMAL', 'FULL', 'EXTRA')
+
+
+class ConnectionManager():
+    """ Long-lived SQLite connections shared by the whole application
+
+    One connection is opened per thread and per database file, and kept
+    open until the thread calls close() (background jobs do when they
+    end) or close_all() is called (at the latest on interpreter exit).
+    Every connection is set up with the journal mode and synchronous
+    level given (WAL and NORMAL by default), and keeps up to
+    cached_statements compiled statements so the same query text is
+    only parsed once per connection.
+    """
+
+    def __init__(self,
+                 db_filename=DB_FILENAME,
+                 journal_mode=None,
+                 synchronous=None,
+                 cached_statements=None,
+                 timeout=None):
+
+        if journal_mode is None:
+            journal_mode = g.db_journal_mode
+        if synchronous is None:
+            synchronous = g.db_synchronous
+        if cached_statements is None:
+            cached_statements = g.db_cached_statements
+        if timeout is None:
+            timeout = g.db_timeout
+
+        if journal_mode.upper() not in JOURNAL_MODES:
+            raise ValueError('Unknown journal mode: %s' % journal_mode)
+        if synchronous.upper() not in SYNCHRONOUS_LEVELS:
+            raise ValueError('Unknown synchronous level: %s' % synchronous)
+
+        self.db_filename = os.path.abspath(db_filename)
+        self.journal_mode = journal_mode.upper()
+        self.synchronous = synchronous.upper()
+        self.cached_statements = cached_statements
+        self.timeout = timeout
+
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._connections = []
+
+    def get_connection(self):
+
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_filename,
+                                   timeout=self.timeout,
+                                   cached_statements=self.cached_statements)
+            conn.execute('PRAGMA journal_mode={mode}'.
+                         format(mode=self.journal_mode))
+            conn.execute('PRAGMA synchronous={level}'.
+                         format(level=self.synchronous))
+            self._local.conn = conn
+            with self._lock:
+                self._connections.append(conn)
+        return conn
+
+    def execute(self, qry, parameters=()):
+
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        cursor.execute(qry, parameters)
+        conn.commit()
+        return cursor
+
+    def execute_insert(self, qry, parameters=()):
+
+        return self.execute(qry, parameters).lastrowid
+
+    def close(self):
+        """ Close the connection owned by the calling thread """
+
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            return
+        self._local.conn = None
+        with self._lock:
+            if conn in self._connections:
+                self._connections.remove(conn)
+        conn.close()
+
+    def close_all(self):
+        """ Close every connection opened through this manager
+
+        Connections owned by other threads are closed as well, so this
+        should only be called once those threads are done with them.
+        """
+
+        with self._lock:
+            connections = self._connections
+            self._connections = []
+        for conn in connections:
+            try:
+                conn.close()
+            except sqlite3.ProgrammingError:
+                # created in another thread, sqlite3 refuses to close it
+                pass
+        self._local = threading.local()
+
+
+class BatchWriter():
+    """ Unit of work for metadata writes
+
+    Rows are buffered in the order they are added and written by
+    flush() in a single transaction, consecutive rows for the same
+    statement going through one executemany() call. Used as a context
+    manager the batch is flushed on a clean exit and discarded if an
+    exception is raised:
+
+        with BatchWriter() as batch:
+            for row in rows:
+                batch.add(qry, row)
+
+    Callbacks registered with on_commit() run once flush() committed the
+    rows, and are dropped with them by discard().
+    """
+
+    def __init__(self, manager=None):
+
+        if manager is None:
+            manager = get_connection_manager()
+        self.manager = manager
+        self._pending = []
+        self._on_commit = []
+
+    def __enter__(self):
+
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+
+        if exc_type is None:
+            self.flush()
+        else:
+            self.discard()
+        return False
+
+    def __len__(self):
+
+        return sum(len(rows) for qry, rows in self._pending)
+
+    def add(self, qry, parameters=()):
+
+        if self._pending and self._pending[-1][0] == qry:
+            self._pending[-1][1].append(parameters)
+        else:
+            self._pending.append((qry, [parameters]))
+
+    def add_many(self, qry, seq_of_parameters):
+
+        for parameters in seq_of_parameters:
+            self.add(qry, parameters)
+
+    def on_commit(self, callback, *args):
+
+        self._on_commit.append((callback, args))
+
+    def flush(self):
+
+        pending = self._pending
+        on_commit = self._on_commit
+        self._pending = []
+        self._on_commit = []
+        if pending:
+            conn = self.manager.get_connection()
+            with conn:  # one transaction, rolled back if any statement fails
+                for qry, rows in pending:
+                    conn.executemany(qry, rows)
+        for callback, args in on_commit:
+            callback(*args)
+
+    def discard(self):
+
+        self._pending = []
+        self._on_commit = []
+
+
+def join_batch(batch=None):
+    """ Join the caller's batch, or write through a batch of our own
+
+        with join_batch(batch) as batch:
+            batch.add(qry, parameters)
+
+    A batch passed in is left for its owner to flush.
+    """
+
+    if batch is not None:
+        return nullcontext(batch)
+    return BatchWriter()
+
+
+_managers = {}
+_managers_lock = threading.Lock()
+
+
+def get_connection_manager(db_filename=DB_FILENAME):
+    """ Return the shared ConnectionManager for db_filename """
+
+    key = os.path.abspath(db_filename)
+    with _managers_lock:
+        manager = _managers.get(key)
+        if manager is None:
+            manager = ConnectionManager(key)
+            _managers[key] = manager
+    return manager
+
+
+def close_thread_connections():
+    """ Close the connections of the calling thread, for threads that end
+    before the application does """
+
+    with _managers_lock:
+        managers = list(_managers.values())
+    for manager in managers:
+        manager.close()
+
+
+def close_all_connections():
+
+    with _managers_lock:
+        managers = list(_managers.values())
+        _managers.clear()
+    for manager in managers:
+        manager.close_all()
+
+
+atexit.register(close_all_connections)
@@ -0,0 +1,276 @@
+"""
+    Warchest: Data management and automation GUI for Machine Learning projects
+    Created September 2017
+    Copyright (C) Nelson R Gonzalez
+
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+from collections import OrderedDict
+import numpy as np
+from global_config import g
+
+
+def minmax_indices(x, y, bins):
+    """ Positions of the points of a line, x sorted, that draw the same at
+    bins pixels wide: the first, last, lowest and highest point of each
+    pixel column """
+
+    n = len(x)
+    if n <= 4 * bins:
+        return np.arange(n)
+    keep = np.isfinite(y) & np.isfinite(x)
+    if not keep.all():
+        kept = np.flatnonzero(keep)
+        return kept[minmax_indices(x[kept], y[kept], bins)]
+
+    edges = np.linspace(x[0], x[-1], bins + 1)
+    starts = np.unique(np.searchsorted(x, edges[:-1], 'left'))
+    starts = starts[starts < n]
+    counts = np.diff(np.append(starts, n))
+    segment = np.repeat(np.arange(len(starts)), counts)
+
+    def first_of_segments(positions):
+        first = np.ones(len(positions), dtype=bool)
+        first[1:] = segment[positions[1:]] != segment[positions[:-1]]
+        return positions[first]
+
+    lows = np.repeat(np.minimum.reduceat(y, starts), counts)
+    highs = np.repeat(np.maximum.reduceat(y, starts), counts)
+    return np.unique(np.concatenate([
+        starts, starts + counts - 1,
+        first_of_segments(np.flatnonzero(y == lows)),
+        first_of_segments(np.flatnonzero(y == highs))]))
+
+
+def lttb_indices(x, y, points):
+    """ Positions of points points of a line, x sorted, picked by Largest
+    Triangle Three Buckets: the point of each bucket making the largest
+    triangle with the point kept before it and the mean of the next
+    bucket """
+
+    n = len(x)
+    if n <= points or points < 3:
+        return np.arange(n)
+    keep = np.isfinite(y) & np.isfinite(x)
+    if not keep.all():
+        kept = np.flatnonzero(keep)
+        return kept[lttb_indices(x[kept], y[kept], points)]
+
+    x = x.astype(np.float64)
+    y = y.astype(np.float64)
+    bounds = np.linspace(1, n - 1, points - 1).astype(np.int64)
+    indices = np.empty(points, dtype=np.int64)
+    indices[0] = 0
+    indices[-1] = n - 1
+    a = 0
+    for i in range(points - 2):
+        start, stop = bounds[i], bounds[i + 1]
+        if i + 2 < len(bounds):
+            next_start, next_stop = bounds[i + 1], bounds[i + 2]
+        else:
+            next_start, next_stop = n - 1, n
+        mean_x = x[next_start:next_stop].mean()
+        mean_y = y[next_start:next_stop].mean()
+        area = np.abs((x[a] - mean_x) * (y[start:stop] - y[a]) -
+                      (x[a] - x[start:stop]) * (mean_y - y[a]))
+        a = start + int(np.argmax(area))
+        indices[i + 1] = a
+    return indices
+
+
+def decimate_indices(x, y, pixels, method=None):
+    """ Positions of the points of a line to draw it pixels wide, with
+    g.plot_decimation unless method is given """
+
+    if method is None:
+        method = g.plot_decimation
+    pixels = max(int(pixels), 1)
+    if method == 'lttb':
+        return lttb_indices(x, y, 2 * pixels)
+    return minmax_indices(x, y, pixels)
+
+
+def get_axes_pixels(ax):
+    """ Width and height of ax on the canvas, in pixels """
+
+    extent = ax.get_window_extent()
+    return max(int(extent.width), 1), max(int(extent.height), 1)
+
+
+class DecimatedLines():
+    """ Lines of an axes drawn from a decimated copy of their data
+
+    Every line keeps its whole data, x sorted, and draws the points
+    decimate_indices picks for the x range in view and the width of the
+    axes in pixels. Zooming and panning decimate the new range again;
+    the last max_views ranges are kept so going back is immediate.
+    """
+
+    def __init__(self, ax, method=None, max_views=None):
+
+        if max_views is None:
+            max_views = g.plot_decimation_views
+        self.ax = ax
+        self.method = method
+        self.max_views = max_views
+        self.lines = []
+        self._views = OrderedDict()
+        self._cid = ax.callbacks.connect('xlim_changed', self.update)
+
+    def add(self, line, x, y):
+
+        self.lines.append((line, np.asarray(x, dtype=np.float64),
+                           np.asarray(y, dtype=np.float64)))
+
+    def update(self, ax=None):
+
+        lo, hi = self.ax.get_xlim()
+        if lo > hi:
+            lo, hi = hi, lo
+        pixels = get_axes_pixels(self.ax)[0]
+        key = (lo, hi, pixels)
+        view = self._views.get(key)
+        if view is None:
+            view = []
+            for line, x, y in self.lines:
+                # one point either side so lines run to the edges
+                start = max(np.searchsorted(x, lo, 'left') - 1, 0)
+                stop = min(np.searchsorted(x, hi, 'right') + 1, len(x))
+                kept = start + decimate_indices(x[start:stop], y[start:stop],
+                                                pixels, self.method)
+                view.append((x[kept], y[kept]))
+            self._views[key] = view
+            while len(self._views) > self.max_views:
+                self._views.popitem(last=False)
+        else:
+            self._views.move_to_end(key)
+        for (line, x, y), (xd, yd) in zip(self.lines, view):
+            line.set_data(xd, yd)
+
+    def disconnect(self):
+
+        self.ax.callbacks.disconnect(self._cid)
+
+
+class DecimatedHexbin():
+    """ A scatter of too many points to draw one by one, drawn as hexagon
+    counts (or means of c) of the points in view, hexagons about
+    g.plot_hexbin_pixels wide
+
+    Zooming and panning bin the points in the new view again, once the
+    view has settled: a change of limits only marks the bins stale and
+    the next draw of the canvas bins them. The last max_views views are
+    kept.
+    """
+
+    def __init__(self, ax, x, y, c=None, max_views=None, **options):
+
+        if max_views is None:
+            max_views = g.plot_decimation_views
+        self.ax = ax
+        x = np.asarray(x, dtype=np.float64)
+        y = np.asarray(y, dtype=np.float64)
+        keep = np.isfinite(x) & np.isfinite(y)
+        self.x = x[keep]
+        self.y = y[keep]
+        self.c = None if c is None else \
+            np.asarray(c, dtype=np.float64)[keep]
+        self.options = options
+        self.max_views = max_views
+        self._views = OrderedDict()
+        self._drawing = False
+        self._stale = False
+        self.collection = self.draw()
+        self._cids = [ax.callbacks.connect('xlim_changed', self.invalidate),
+                      ax.callbacks.connect('ylim_changed', self.invalidate)]
+        self._draw_cid = ax.figure.canvas.mpl_connect('draw_event',
+                                                      self.on_draw)
+
+    def get_gridsize(self):
+
+        width, height = get_axes_pixels(self.ax)
+        size = max(g.plot_hexbin_pixels, 1)
+        return max(width // size, 1), max(height // size, 1)
+
+    def draw(self, extent=None):
+
+        x, y, c = self.x, self.y, self.c
+        if extent is not None:
+            x0, x1, y0, y1 = extent
+            inside = (x >= x0) & (x <= x1) & (y >= y0) & (y <= y1)
+            x, y = x[inside], y[inside]
+            if c is not None:
+                c = c[inside]
+        options = dict(self.options)
+        if c is not None:
+            options['C'] = c
+            options['reduce_C_function'] = np.mean
+        if extent is not None:
+            # hexbin takes the extent of log axes as powers of ten
+            x0, x1, y0, y1 = extent
+            if options.get('xscale') == 'log':
+                x0, x1 = np.log10(max(x0, 1e-300)), np.log10(max(x1, 1e-300))
+            if options.get('yscale') == 'log':
+                y0, y1 = np.log10(max(y0, 1e-300)), np.log10(max(y1, 1e-300))
+            options['extent'] = (x0, x1, y0, y1)
+        self._drawing = True
+        try:
+            collection = self.ax.hexbin(x, y, gridsize=self.get_gridsize(),
+                                        mincnt=1, **options)
+            if extent is not None:
+                # hexbin sets the limits to the data, keep the view
+                self.ax.set_xlim(extent[0], extent[1])
+                self.ax.set_ylim(extent[2], extent[3])
+        finally:
+            self._drawing = False
+        return collection
+
+    def invalidate(self, ax=None):
+
+        # one zoom changes both limits, the bins follow on the next draw
+        if not self._drawing:
+            self._stale = True
+
+    def on_draw(self, event):
+
+        if not self._stale:
+            return
+        self.update()
+        self.ax.figure.canvas.draw_idle()
+
+    def update(self):
+
+        self._stale = False
+        x0, x1 = sorted(self.ax.get_xlim())
+        y0, y1 = sorted(self.ax.get_ylim())
+        extent = (x0, x1, y0, y1)
+        key = extent + self.get_gridsize()
+        if self.collection is not None:
+            self.collection.remove()
+        collection = self._views.get(key)
+        if collection is None:
+            collection = self._views[key] = self.draw(extent)
+            while len(self._views) > self.max_views:
+                self._views.popitem(last=False)
+        else:
+            self._views.move_to_end(key)
+            self.ax.add_collection(collection, autolim=False)
+        self.collection = collection
+
+    def disconnect(self):
+
+        for cid in self._cids:
+            self.ax.callbacks.disconnect(cid)
+        self.ax.figure.canvas.mpl_disconnect(self._draw_cid)
@@ -0,0 +1,200 @@
+"""
+    Warchest: Data management and automation GUI for Machine Learning projects
+    Created September 2017
+    Copyright (C) Nelson R Gonzalez
+
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+from collections import namedtuple
+import numpy as np
+import pandas as pd
+from toolbox import is_range_castable
+from insights import SIGNED_INTS, UNSIGNED_INTS, FLOATS
+from transformations import Transformation
+from global_config import g
+
+Downcast = namedtuple('Downcast', [
+    'index', 'name', 'from_dtype', 'to_dtype',
+    'current_bytes', 'projected_bytes'])
+
+
+class DtypeOptimizer():
+    """ Smallest safe dtype for every column of a DataFrame
+
+    Integer columns, and float columns holding only whole numbers, go to
+    the smallest int (uint when nothing is negative) whose range holds
+    them. Other float columns go to float32 or float16 when no value
+    moves by more than float_tolerance (relative). Object columns with
+    at most category_max_ratio distinct values per row become category.
+
+    plan() only looks at the data, apply() casts every planned column in
+    one astype() call and log() logs each cast as a setColumnType
+    transformation so replicating the session replays it.
+    """
+
+    def __init__(self, float_tolerance=None, category_max_ratio=None):
+
+        if float_tolerance is None:
+            float_tolerance = g.downcast_float_tolerance
+        if category_max_ratio is None:
+            category_max_ratio = g.downcast_category_max_ratio
+        self.float_tolerance = float_tolerance
+        self.category_max_ratio = category_max_ratio
+
+    def plan(self, df, job=None):
+
+        downcasts = []
+        for index, name in enumerate(df.columns):
+            if job is not None:
+                job.check_cancelled()
+                job.report(index, len(df.columns))
+            col_values = df.iloc[:, index]
+            to_dtype = self.get_smallest_dtype(col_values)
+            if to_dtype is None or to_dtype == str(col_values.dtype):
+                continue
+            current_bytes = int(col_values.memory_usage(index=False,
+                                                        deep=True))
+            projected_bytes = self.get_projected_bytes(col_values, to_dtype)
+            if projected_bytes >= current_bytes:
+                continue
+            downcasts.append(Downcast(index, name, str(col_values.dtype),
+                                      to_dtype, current_bytes,
+                                      projected_bytes))
+        return downcasts
+
+    def get_smallest_dtype(self, col_values):
+
+        dtype = col_values.dtype
+        if dtype == object:
+            return self.get_object_dtype(col_values)
+        if not isinstance(dtype, np.dtype) or dtype.kind not in 'iuf':
+            return None
+        if len(col_values) == 0 or col_values.isnull().any():
+            # casting would need a float (or nullable) column anyway
+            return self.get_float_dtype(col_values) \
+                if dtype.kind == 'f' else None
+
+        values = col_values.to_numpy()
+        if dtype.kind == 'f':
+            with np.errstate(invalid='ignore'):
+                is_integer = bool(np.all(np.mod(values, 1) == 0))
+            if not is_integer:
+                return self.get_float_dtype(col_values)
+
+        min_value = values.min()
+        max_value = values.max()
+        candidates = UNSIGNED_INTS if min_value >= 0 else SIGNED_INTS
+        for candidate in candidates:
+            if is_range_castable(min_value, max_value, candidate) is True:
+                return candidate
+
+    def get_float_dtype(self, col_values):
+
+        values = col_values.to_numpy()
+        finite = np.isfinite(values)
+        # candidates are tried smallest first
+        for candidate in FLOATS:
+            if np.dtype(candidate).itemsize >= values.dtype.itemsize:
+                return None
+            with np.errstate(over='ignore', invalid='ignore'):
+                cast = values.astype(candidate).astype(values.dtype)
+            # overflow to inf, or any value moving too much, rules it out
+            if not np.array_equal(np.isfinite(cast), finite):
+                continue
+            error = np.abs(cast[finite] - values[finite])
+            if np.all(error <= self.float_tolerance *
+                      np.abs(values[finite])):
+                return candidate
+
+    def get_object_dtype(self, col_values):
+
+        if len(col_values) == 0:
+            return None
+        try:
+            unique = col_values.nunique()
+        except TypeError:
+            # unhashable values
+            return None
+        if unique <= self.category_max_ratio * len(col_values):
+            return 'category'
+
+    def get_projected_bytes(self, col_values, to_dtype):
+
+        if to_dtype == 'category':
+            categories = pd.Series(col_values.dropna().unique())
+            codes = np.dtype('int8') if len(categories) < 128 else \
+                np.dtype('int16') if len(categories) < 32768 else \
+                np.dtype('int32')
+            return len(col_values) * codes.itemsize + \
+                int(categories.memory_usage(index=False, deep=True))
+        return len(col_values) * np.dtype(to_dtype).itemsize
+
+    def apply(self, df, downcasts, session=None, batch=None):
+        """ Return df with every downcast applied
+
+        With a session each cast is logged as a setColumnType
+        transformation, see log().
+        """
+
+        if not downcasts:
+            return df
+
+        new_df = df.astype({downcast.name: downcast.to_dtype
+                            for downcast in downcasts})
+
+        if session is not None:
+            self.log(downcasts, session, batch)
+        return new_df
+
+    def log(self, downcasts, session, batch=None):
+        """ Log each downcast as a setColumnType transformation
+
+        Without a batch the rows are inserted one by one and their
+        TransformationsLog IDs returned, with one they are left in the
+        batch for its owner to flush and no IDs are returned.
+        """
+
+        trans = Transformation()
+        log_ids = []
+        for downcast in downcasts:
+            log_id = trans.add_transformation(session=session,
+                                              index=downcast.index,
+                                              name=downcast.name,
+                                              transformation='setColumnType',
+                                              batch=batch,
+                                              option1=downcast.to_dtype)
+            if log_id is not None:
+                log_ids.append(log_id)
+        return log_ids
+
+def get_savings_report(downcasts, new_df=None):
+    """ Text summary of a plan, and of the actual result once applied """
+
+    lines = []
+    for downcast in downcasts:
+        lines.append('%s: %s -> %s (%d -> %d bytes)' %
+                     (downcast.name, downcast.from_dtype, downcast.to_dtype,
+                      downcast.current_bytes, downcast.projected_bytes))
+    current = sum(downcast.current_bytes for downcast in downcasts)
+    projected = sum(downcast.projected_bytes for downcast in downcasts)
+    lines.append('')
+    lines.append('Projected: %d -> %d bytes (%d saved)' %
+                 (current, projected, current - projected))
+    if new_df is not None:
+        actual = sum(int(new_df.iloc[:, downcast.index].memory_usage(
+            index=False, deep=True)) for downcast in downcasts)
+        lines.append('Actual: %d -> %d bytes (%d saved)' %
+                     (current, actual, current - actual))
+    return '\n'.join(lines)
@@ -1,8 +1,47 @@
+import hashlib
+import os
+import pickle
+import multiprocessing as mp
+from collections import OrderedDict
 from sklearn.base import clone
 from itertools import combinations
 import numpy as np
-from sklearn.model_selection import train_test_split
-from sklearn.metrics import accuracy_score
+from sklearn.model_selection import train_test_split, cross_val_score
+from sklearn.metrics import accuracy_score, make_scorer
+from modelrunner import _share_array, _init_worker, _worker_arrays
+from global_config import g
+
+# subset scores by (data and estimator fingerprint, subset)
+_scores = OrderedDict()
+
+
+def get_selection_workers():
+
+    if g.feature_selection_workers:
+        return g.feature_selection_workers
+    return os.cpu_count() or 1
+
+
+def _calc_score(estimator, scoring, cv, arrays, indices):
+    """ Score of estimator on the columns indices of arrays, on the test
+    split or cross validated over cv folds """
+
+    indices = list(indices)
+    if cv:
+        X, y = arrays['X'], arrays['y']
+        return float(cross_val_score(clone(estimator), X[:, indices], y,
+                                     cv=cv,
+                                     scoring=make_scorer(scoring)).mean())
+    estimator = clone(estimator)
+    estimator.fit(arrays['X_train'][:, indices], arrays['y_train'])
+    y_pred = estimator.predict(arrays['X_test'][:, indices])
+    return float(scoring(arrays['y_test'], y_pred))
+
+
+def _score_subsets(estimator, scoring, cv, subsets):
+
+    return [_calc_score(estimator, scoring, cv, _worker_arrays, p)
+            for p in subsets]
 
 
 class SBS():
@@ -10,54 +49,216 @@ class SBS():
         Dimensionality Reduction via Feature Selection
         for unregularized models
 
+    forward=True adds features one at a time from none instead (SFS),
+    floating=True tries taking out (or putting back) features after
+    every step while that beats the best subset of that size found so
+    far (SFFS, SBFS). cv scores subsets by cross validation over cv
+    folds of X instead of a single test split.
+
+    Subset scores are kept across runs, keyed on the data, the
+    estimator and the scoring, so subsets already scored are not
+    fitted again. Steps with at least g.feature_selection_min_subsets
+    subsets to score are scored in a pool of n_jobs worker processes
+    (g.feature_selection_workers by default), which map the arrays
+    from shared memory.
     """
 
     def __init__(self, estimator, k_features, scoring=accuracy_score,
-                 test_size=0.25, random_state=1):
+                 test_size=0.25, random_state=1, cv=None, forward=False,
+                 floating=False, n_jobs=None):
         self.scoring = scoring
         self.estimator = clone(estimator)
         self.k_features = k_features
         self.test_size = test_size
         self.random_state = random_state
+        self.cv = cv
+        self.forward = forward
+        self.floating = floating
+        self.n_jobs = n_jobs
 
     def fit(self, X, y):
 
-        X_train, X_test, y_train, y_test = \
-                train_test_split(X, y, test_size=self.test_size,
-                                 random_state=self.random_state)
+        if self.cv:
+            self._arrays = {'X': np.asarray(X), 'y': np.asarray(y)}
+        else:
+            X_train, X_test, y_train, y_test = \
+                    train_test_split(X, y, test_size=self.test_size,
+                                     random_state=self.random_state)
+            self._arrays = {'X_train': np.asarray(X_train),
+                            'X_test': np.asarray(X_test),
+                            'y_train': np.asarray(y_train),
+                            'y_test': np.asarray(y_test)}
+        self._fingerprint = self._get_fingerprint()
+        self._pool = None
+        self._shms = []
+
+        dim = np.shape(X)[1]
+        k_features = min(max(self.k_features, 1), dim)
+        try:
+            if self.forward:
+                best = self._fit_forward(dim, k_features)
+            else:
+                best = self._fit_backward(dim, k_features)
+        finally:
+            self._close()
+            del self._arrays
+        # floating may have found a better subset of k_features earlier on
+        self.k_score_, self.indices_ = best[k_features]
+
+        return self
+
+    def _fit_backward(self, dim, k_features):
 
-        dim = X_train.shape[1]
         self.indices_ = tuple(range(dim))
         self.subsets_ = [self.indices_]
-        score = self._calc_score(X_train, y_train,
-                                 X_test, y_test, self.indices_)
-        self.scores_ = [score]
-
-        while dim > self.k_features:
-            scores = []
-            subsets = []
-
-            for p in combinations(self.indices_, r=dim-1):
-                score = self._calc_score(X_train, y_train,
-                                         X_test, y_test, p)
-                scores.append(score)
-                subsets.append(p)
-
-            best = np.argmax(scores)
-            self.indices_ = subsets[best]
-            self.subsets_.append(self.indices_)
+        self.scores_ = self._score([self.indices_])
+        best = {dim: (self.scores_[0], self.indices_)}
+
+        while dim > k_features:
+            self.indices_, score = self._step(
+                combinations(self.indices_, r=dim-1))
             dim -= 1
+            self._keep(best, self.indices_, score)
 
-            self.scores_.append(scores[best])
-        self.k_score_ = self.scores_[-1]
+            if self.floating:
+                # put back features while that beats the best subset found
+                while dim + 1 < len(self.subsets_[0]):
+                    others = [i for i in range(len(self.subsets_[0]))
+                              if i not in self.indices_]
+                    subset, score = self._step(
+                        tuple(sorted(self.indices_ + (i,))) for i in others)
+                    if score <= best[dim + 1][0]:
+                        break
+                    self.indices_ = subset
+                    dim += 1
+                    self._keep(best, subset, score)
+        return best
 
-        return self
+    def _fit_forward(self, dim, k_features):
+
+        self.indices_ = ()
+        self.subsets_ = []
+        self.scores_ = []
+        best = {}
+
+        while len(self.indices_) < k_features:
+            self.indices_, score = self._step(
+                tuple(sorted(self.indices_ + (i,))) for i in range(dim)
+                if i not in self.indices_)
+            self._keep(best, self.indices_, score)
+
+            if self.floating:
+                # take out features while that beats the best subset found
+                while len(self.indices_) > 2:
+                    size = len(self.indices_) - 1
+                    subset, score = self._step(
+                        combinations(self.indices_, r=size))
+                    if score <= best[size][0]:
+                        break
+                    self.indices_ = subset
+                    self._keep(best, subset, score)
+        return best
+
+    def _step(self, subsets):
+        """ The best of subsets and its score, the first one on ties """
+
+        subsets = list(subsets)
+        scores = self._score(subsets)
+        best = np.argmax(scores)
+        return subsets[best], scores[best]
+
+    def _keep(self, best, subset, score):
+
+        size = len(subset)
+        if size not in best or score > best[size][0]:
+            best[size] = (score, subset)
+        self.subsets_.append(subset)
+        self.scores_.append(score)
 
     def transform(self, X):
         return X[:, self.indices_]
 
-    def _calc_score(self, X_train, y_train, X_test, y_test, indices):
-        self.estimator.fit(X_train[:, indices], y_train)
-        y_pred = self.estimator.predict(X_test[:, indices])
-        score = self.scoring(y_test, y_pred)
-        return score
+    def _get_fingerprint(self):
+
+        digest = hashlib.blake2b(digest_size=16)
+        try:
+            digest.update(pickle.dumps((self.estimator, self.scoring,
+                                        self.cv), protocol=4))
+        except Exception:
+            return None
+        for name in sorted(self._arrays):
+            arr = np.ascontiguousarray(self._arrays[name])
+            if arr.dtype.hasobject:
+                digest.update(pickle.dumps(arr, protocol=4))
+            else:
+                digest.update(arr.tobytes())
+            digest.update(repr((name, arr.shape, arr.dtype.str)).encode())
+        return digest.hexdigest()
+
+    def _score(self, subsets):
+        """ Scores of subsets, from the cache where it has them """
+
+        scores = [None] * len(subsets)
+        missing = []
+        if self._fingerprint is not None:
+            for i, p in enumerate(subsets):
+                score = _scores.get((self._fingerprint, p))
+                if score is None:
+                    missing.append(i)
+                else:
+                    _scores.move_to_end((self._fingerprint, p))
+                    scores[i] = score
+        else:
+            missing = list(range(len(subsets)))
+
+        todo = [subsets[i] for i in missing]
+        workers = self.n_jobs or get_selection_workers()
+        # without a fingerprint the estimator or scoring do not pickle
+        if workers > 1 and len(todo) >= g.feature_selection_min_subsets \
+                and self._fingerprint is not None:
+            pool = self._get_pool(workers)
+            # a few chunks per worker keeps them busy to the end
+            size = max(len(todo) // (workers * 4), 1)
+            chunks = [todo[i:i + size] for i in range(0, len(todo), size)]
+            results = pool.starmap(_score_subsets,
+                                   [(self.estimator, self.scoring, self.cv,
+                                     chunk) for chunk in chunks])
+            found = [score for chunk in results for score in chunk]
+        else:
+            found = [_calc_score(self.estimator, self.scoring, self.cv,
+                                 self._arrays, p) for p in todo]
+
+        for i, score in zip(missing, found):
+            scores[i] = score
+            if self._fingerprint is not None:
+                _scores[(self._fingerprint, subsets[i])] = score
+        while len(_scores) > g.feature_selection_cache_size:
+            _scores.popitem(last=False)
+        return scores
+
+    def _get_pool(self, workers):
+
+        if self._pool is None:
+            specs = {}
+            for name, arr in self._arrays.items():
+                shm, spec = _share_array(arr)
+                if shm is not None:
+                    self._shms.append(shm)
+                specs[name] = spec
+            # spawn, so workers never inherit a forked copy of the Tk app
+            ctx = mp.get_context('spawn')
+            self._pool = ctx.Pool(processes=workers,
+                                  initializer=_init_worker,
+                                  initargs=(specs,))
+        return self._pool
+
+    def _close(self):
+
+        if self._pool is not None:
+            self._pool.close()
+            self._pool.join()
+            self._pool = None
+        for shm in self._shms:
+            shm.close()
+            shm.unlink()
+        self._shms = []
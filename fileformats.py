@@ -0,0 +1,313 @@
+"""
+    Warchest: Data management and automation GUI for Machine Learning projects
+    Created September 2017
+    Copyright (C) Nelson R Gonzalez
+
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+""" Transformations (.wct) and model columns (.wcc) files
+
+Both are JSON lines: a header line giving the format, its version and
+the number of records, then one JSON object per record. Files are read
+one line at a time and every record is checked against the format's
+schema, so nothing in a file can run code, and a .wcc file can be
+rejected from its header alone.
+
+Files saved by older versions were pickled, migrate them with:
+
+    python fileformats.py [directory_or_file ...]
+"""
+
+import io
+import json
+import os
+import pickle
+import sys
+
+TRANSFORMATIONS_FORMAT = 'warchest-transformations'
+MODEL_COLUMNS_FORMAT = 'warchest-model-columns'
+VERSION = 1
+
+# record fields and the types each one accepts
+TRANSFORMATION_FIELDS = {
+    'TransformationLogID': (int, type(None)),
+    'SessionID': (int, type(None)),
+    'SessionDesc': (str, type(None)),
+    'ColumnIndex': (int,),
+    'ColumnName': (str,),
+    'TransformationID': (int, type(None)),
+    'TransformationDesc': (str,),
+    'DateCreated': (str, type(None)),
+    'TransformationLogDesc': (str, type(None)),
+    'IsReplicate': (str,),
+    'Option1': (str, type(None)),
+    'Option2': (str, type(None)),
+    'Option3': (str, type(None)),
+}
+
+MODEL_COLUMN_FIELDS = {
+    'ColumnIndex': (int,),
+    'AvailableToModel': (str,),
+    'ClassLabelStatus': (str,),
+    'NominalOrdinal': (str,),
+    'ModelColumn': (str,),
+}
+
+# the four model options, in the order they are saved and loaded
+MODEL_COLUMN_OPTIONS = ('AvailableToModel', 'ClassLabelStatus',
+                        'NominalOrdinal', 'ModelColumn')
+
+# keep a corrupted file from reading everything into one line
+MAX_LINE_LENGTH = 1 << 20
+
+
+class FileFormatError(ValueError):
+
+    pass
+
+
+def write_transformations(file_name, rows):
+
+    rows = [_names_to_str(row, ('ColumnName',)) for row in rows]
+    for row in rows:
+        check_record(row, TRANSFORMATION_FIELDS)
+    _write(file_name, TRANSFORMATIONS_FORMAT, rows)
+
+
+def iter_transformations(file_name):
+    """ Yield the transformation rows of a .wct file as they are read """
+
+    with open(file_name, 'r', encoding='utf-8') as f:
+        count = _read_header(f, TRANSFORMATIONS_FORMAT)
+        for row in _read_records(f, count, TRANSFORMATION_FIELDS):
+            yield row
+
+
+def read_transformations(file_name):
+
+    return list(iter_transformations(file_name))
+
+
+def write_model_columns(file_name, available_to_model, class_label_status,
+                        nominal_ordinal, model_columns):
+
+    options = (available_to_model, class_label_status, nominal_ordinal,
+               model_columns)
+    rows = []
+    for index in sorted(available_to_model):
+        row = {'ColumnIndex': int(index)}
+        for name, option in zip(MODEL_COLUMN_OPTIONS, options):
+            row[name] = option[index]
+        row = _names_to_str(row, ('ModelColumn',))
+        check_record(row, MODEL_COLUMN_FIELDS)
+        rows.append(row)
+    _write(file_name, MODEL_COLUMNS_FORMAT, rows)
+
+
+def read_model_columns(file_name, number_of_columns=None):
+    """ The four model option dicts saved in a .wcc file
+
+    With number_of_columns, a file for a different number of columns is
+    rejected from its header without reading the rest.
+    """
+
+    options = tuple({} for name in MODEL_COLUMN_OPTIONS)
+    with open(file_name, 'r', encoding='utf-8') as f:
+        count = _read_header(f, MODEL_COLUMNS_FORMAT)
+        if number_of_columns is not None and count != number_of_columns:
+            raise FileFormatError(
+                'Number of columns in Warchest Model Columns File and '
+                'current dataset do not match')
+        for row in _read_records(f, count, MODEL_COLUMN_FIELDS):
+            index = row['ColumnIndex']
+            if index in options[0]:
+                raise FileFormatError('Column %d saved twice' % index)
+            for name, option in zip(MODEL_COLUMN_OPTIONS, options):
+                option[index] = row[name]
+    return options
+
+
+def check_record(record, fields):
+
+    if not isinstance(record, dict):
+        raise FileFormatError('Record is not an object')
+    missing = set(fields) - set(record)
+    if missing:
+        raise FileFormatError('Record without ' + ', '.join(sorted(missing)))
+    unknown = set(record) - set(fields)
+    if unknown:
+        raise FileFormatError('Unknown fields ' +
+                              ', '.join(sorted(map(str, unknown))))
+    for name, types in fields.items():
+        value = record[name]
+        # bool is an int subclass but never a valid field value
+        if isinstance(value, bool) or not isinstance(value, types):
+            raise FileFormatError('Field %s has type %s' %
+                                  (name, type(value).__name__))
+
+
+def _names_to_str(record, names):
+    """ record with the column names of fields names as text, tables
+    read without a header have numbers for names """
+
+    if not isinstance(record, dict):
+        return record
+    record = dict(record)
+    for name in names:
+        value = record.get(name)
+        if value is not None and not isinstance(value, str):
+            record[name] = str(value)
+    return record
+
+
+def _write(file_name, file_format, rows):
+
+    # written next to the file and renamed, a failed save keeps the old one
+    tmp_name = file_name + '.tmp'
+    with open(tmp_name, 'w', encoding='utf-8', newline='\n') as f:
+        f.write(json.dumps({'format': file_format,
+                            'version': VERSION,
+                            'count': len(rows)}) + '\n')
+        for row in rows:
+            f.write(json.dumps(row, sort_keys=True) + '\n')
+    os.replace(tmp_name, file_name)
+
+
+def _read_line(f):
+
+    try:
+        line = f.readline(MAX_LINE_LENGTH + 1)
+    except UnicodeDecodeError:
+        raise FileFormatError('Not a text file')
+    if len(line) > MAX_LINE_LENGTH:
+        raise FileFormatError('Line too long')
+    if not line:
+        return None
+    try:
+        return json.loads(line)
+    except ValueError:
+        raise FileFormatError('Not a JSON line')
+
+
+def _read_header(f, file_format):
+
+    try:
+        header = _read_line(f)
+    except FileFormatError:
+        header = None
+    if not isinstance(header, dict) or header.get('format') != file_format:
+        raise FileFormatError('Not a %s file, files saved by older '
+                              'versions must be migrated with '
+                              'fileformats.py' % file_format)
+    version = header.get('version')
+    if not isinstance(version, int) or isinstance(version, bool) or \
+            not 1 <= version <= VERSION:
+        raise FileFormatError('Unsupported %s version %r' %
+                              (file_format, version))
+    count = header.get('count')
+    if not isinstance(count, int) or isinstance(count, bool) or count < 0:
+        raise FileFormatError('Invalid record count')
+    return count
+
+
+def _read_records(f, count, fields):
+
+    for i in range(count):
+        record = _read_line(f)
+        if record is None:
+            raise FileFormatError('File truncated after %d of %d records' %
+                                  (i, count))
+        check_record(record, fields)
+        yield record
+    if f.readline(1):
+        raise FileFormatError('Data after the last record')
+
+
+class _PrimitivesUnpickler(pickle.Unpickler):
+    """ Unpickles lists, tuples, dicts, strings and numbers only """
+
+    def find_class(self, module, name):
+
+        raise FileFormatError('Legacy file references %s.%s' %
+                              (module, name))
+
+
+def _load_legacy(file_name):
+
+    with open(file_name, 'rb') as f:
+        data = f.read()
+    try:
+        return _PrimitivesUnpickler(io.BytesIO(data)).load()
+    except FileFormatError:
+        raise
+    except Exception as e:
+        raise FileFormatError('Legacy file corrupted: %s' % e)
+
+
+def migrate_file(file_name, backup=True):
+    """ Rewrite a pickled .wct or .wcc file in the current format
+
+    Returns False when the file did not need it. The pickled file is
+    kept with a .bak extension unless backup is False.
+    """
+
+    with open(file_name, 'rb') as f:
+        # current files start with their JSON header
+        if f.read(1) == b'{':
+            return False
+    data = _load_legacy(file_name)
+
+    tmp_name = file_name + '.new'
+    if file_name.endswith('.wct'):
+        if not isinstance(data, list):
+            raise FileFormatError('Legacy transformations are not a list')
+        write_transformations(tmp_name, data)
+    elif file_name.endswith('.wcc'):
+        if not isinstance(data, (tuple, list)) or len(data) != 4 or \
+                not all(isinstance(option, dict) for option in data):
+            raise FileFormatError('Legacy model columns are not 4 dicts')
+        write_model_columns(tmp_name, *data)
+    else:
+        raise FileFormatError('Unknown file type ' + file_name)
+
+    if backup:
+        os.replace(file_name, file_name + '.bak')
+    os.replace(tmp_name, file_name)
+    return True
+
+
+def migrate(paths, backup=True):
+    """ Migrate the .wct and .wcc files in paths, files or directories """
+
+    migrated = []
+    for path in paths:
+        if os.path.isdir(path):
+            names = [os.path.join(path, name)
+                     for name in sorted(os.listdir(path))
+                     if name.endswith(('.wct', '.wcc'))]
+        else:
+            names = [path]
+        for name in names:
+            if migrate_file(name, backup):
+                migrated.append(name)
+    return migrated
+
+
+if __name__ == "__main__":
+    here = os.path.dirname(os.path.abspath(__file__))
+    paths = sys.argv[1:] or [os.path.join(here, 'transformations'),
+                             os.path.join(here, 'modelcolumns')]
+    for name in migrate(paths):
+        print('migrated ' + name)
@@ -0,0 +1,198 @@
+"""
+    Warchest: Data management and automation GUI for Machine Learning projects
+    Created September 2017
+    Copyright (C) Nelson R Gonzalez
+
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+import ast
+from collections import OrderedDict
+import numpy as np
+import pandas as pd
+from global_config import g
+try:
+    import numexpr as ne
+except ImportError:
+    # pandas evaluates the expressions it can without it
+    ne = None
+
+# numexpr reductions need every row at once
+_REDUCTIONS = ('sum', 'prod', 'min', 'max')
+
+
+def get_names(ex):
+    """ The variables of expression ex, the functions it calls aside, and
+    whether it reduces the rows to one value """
+
+    tree = ast.parse(ex.strip(), mode='eval')
+    called = set()
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Call) and isinstance(node.func, ast.Name):
+            called.add(node.func.id)
+    names = set(node.id for node in ast.walk(tree)
+                if isinstance(node, ast.Name)) - called
+    return names, any(name in called for name in _REDUCTIONS)
+
+
+def evaluate(ex, columns):
+    """ Evaluate ex with the arrays of columns, a dict of name: array """
+
+    if ne is not None:
+        return ne.evaluate(ex, local_dict=columns)
+    return np.asarray(pd.eval(ex, local_dict=columns, engine='python'))
+
+
+class FormulaEngine():
+    """ Columns of a table computed from expressions of other columns
+
+    Each formula is parsed once for the columns it reads, which makes a
+    dependency graph: after a column changes only the formulas reading
+    it, directly or through other formulas, are computed again, each
+    after the formulas it reads (recalculate).
+
+    Expressions are evaluated with numexpr on the table's own column
+    arrays, only those the expression reads, and tables of at least
+    chunk_rows rows are evaluated chunk_rows rows at a time into one
+    result array.
+    """
+
+    def __init__(self, chunk_rows=None):
+
+        if chunk_rows is None:
+            chunk_rows = g.formula_chunk_rows
+        self.chunk_rows = chunk_rows
+        self.formulae = OrderedDict()
+        self._names = {}
+        self._reduces = {}
+
+    def set_formula(self, name, ex):
+        """ Add or replace the formula of column name, ValueError if it
+        would read itself through other formulas """
+
+        names, reduces = get_names(ex)
+        if name in names or name in self._get_upstream(names):
+            raise ValueError('formula %s reads itself' % name)
+        self.formulae[name] = ex
+        self._names[name] = names
+        self._reduces[name] = reduces
+
+    def remove(self, name):
+
+        self.formulae.pop(name, None)
+        self._names.pop(name, None)
+        self._reduces.pop(name, None)
+
+    def prune(self, columns):
+        """ Remove the formulas of columns no longer in columns """
+
+        for name in list(self.formulae):
+            if name not in columns:
+                self.remove(name)
+
+    def clear(self):
+
+        self.formulae.clear()
+        self._names.clear()
+        self._reduces.clear()
+
+    def _get_upstream(self, names):
+
+        upstream = set()
+        stack = list(names)
+        while stack:
+            name = stack.pop()
+            for read in self._names.get(name, ()):
+                if read not in upstream:
+                    upstream.add(read)
+                    stack.append(read)
+        return upstream
+
+    def get_downstream(self, changed=None):
+        """ Formulas to compute after the columns changed change, all of
+        them if changed is None, in an order where every formula comes
+        after the formulas it reads """
+
+        if changed is None:
+            affected = set(self.formulae)
+        else:
+            affected = set()
+            stack = list(changed)
+            while stack:
+                column = stack.pop()
+                for name, names in self._names.items():
+                    if column in names and name not in affected:
+                        affected.add(name)
+                        stack.append(name)
+
+        order = []
+        done = set()
+
+        def visit(name):
+            if name in done:
+                return
+            done.add(name)
+            for read in self._names[name]:
+                if read in affected:
+                    visit(read)
+            order.append(name)
+
+        for name in self.formulae:
+            if name in affected:
+                visit(name)
+        return order
+
+    def evaluate(self, df, name=None, ex=None):
+        """ The values of a formula, the one of column name unless ex is
+        given, for the rows of df """
+
+        if ex is None:
+            ex = self.formulae[name]
+            names, reduces = self._names[name], self._reduces[name]
+        else:
+            names, reduces = get_names(ex)
+        # to_numpy() is a view of the column's data where it can be
+        columns = {c: df[c].to_numpy() for c in names if c in df.columns}
+        rows = len(df.index)
+        if reduces or rows < self.chunk_rows or not columns:
+            return evaluate(ex, columns)
+
+        result = None
+        for start in range(0, rows, self.chunk_rows):
+            stop = min(start + self.chunk_rows, rows)
+            chunk = evaluate(ex, {c: values[start:stop]
+                                  for c, values in columns.items()})
+            if np.ndim(chunk) == 0:
+                return chunk
+            if result is None:
+                result = np.empty(rows, dtype=chunk.dtype)
+            result[start:stop] = chunk
+        return result
+
+    def recalculate(self, df, changed=None, omit=None):
+        """ Compute the formulas downstream of the columns changed again,
+        writing them to df; returns the columns computed and the formulas
+        that failed """
+
+        computed = []
+        failed = []
+        for name in self.get_downstream(changed):
+            if name == omit:
+                continue
+            try:
+                df[name] = self.evaluate(df, name)
+                computed.append(name)
+            except Exception:
+                failed.append(name)
+        return computed, failed
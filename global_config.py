@@ -22,5 +22,104 @@ class g:
     # Whether or not need to plot decision regions
     decision_regions = True
 
+    # Decision regions: pixels per grid cell, times the grid is halved
+    # for the first predictions and refined near the class boundaries,
+    # points per predict call and surfaces kept per model and data
+    decision_cell_pixels = 2
+    decision_refine_levels = 3
+    decision_batch_size = 65536
+    decision_cache_size = 8
+
     # Global localized language
     localized_lang = 1  # English
+
+    # SQLite connection settings (see database.py)
+    db_journal_mode = 'WAL'
+    db_synchronous = 'NORMAL'  # OFF, NORMAL, FULL or EXTRA
+    db_cached_statements = 256
+    db_timeout = 5.0
+
+    # Worker processes used to fit classifiers, 0 for one per CPU
+    model_workers = 0
+
+    # Feature selection (feat_sel_sbs.py): worker processes, 0 for one per
+    # CPU, fewest subsets a step must score to use them, and subset
+    # scores kept across runs
+    feature_selection_workers = 0
+    feature_selection_min_subsets = 32
+    feature_selection_cache_size = 100000
+
+    # Rows per chunk when reading a dataset in the background
+    load_chunk_rows = 50000
+
+    # Parsed datasets are cached here as .npy columns (see load_datasets.py),
+    # the least recently used going once they take more than the budget,
+    # files smaller than min_size are always parsed
+    dataset_cache_dir = './datasets/.cache'
+    dataset_cache_budget = 2 * 1024 ** 3
+    dataset_cache_min_size = 1024 ** 2
+
+    # Datasets of at least lazy_min_rows rows with a cache entry are shown
+    # from it lazily, lazy_page_rows rows at a time keeping lazy_max_pages
+    lazy_min_rows = 1000000
+    lazy_page_rows = 1000
+    lazy_max_pages = 32
+
+    # Text import: rows sampled for dtype hints, preview size, and worker
+    # processes (0 for one per CPU) for files of at least min_bytes
+    import_sample_rows = 1000
+    import_preview_kb = 64
+    import_workers = 0
+    import_parallel_min_bytes = 64 * 1024 ** 2
+
+    # Column widths come from the longest text of a stratified sample of
+    # sample_size rows in strata runs, or of every row when exact is set
+    column_width_sample_size = 2000
+    column_width_strata = 20
+    column_width_exact = False
+
+    # Query bar: filtered columns of at least index_min_rows rows get a
+    # sorted or hash index, a range is looked up in the sorted index when
+    # at most 1 row in max_ratio matches, and the last cache_masks row
+    # masks are kept
+    query_index_min_rows = 100000
+    query_index_max_ratio = 256
+    query_cache_masks = 64
+
+    # Formula columns of tables of at least chunk_rows rows are evaluated
+    # chunk_rows rows at a time
+    formula_chunk_rows = 1000000
+
+    # Plots: lines of more than decimate_min_points points are drawn from
+    # the points picked for the axes width by decimation ('minmax' or
+    # 'lttb'), scatters of more than hexbin_min_points points as hexagons
+    # hexbin_pixels wide, or sampled to scatter_max_points points per
+    # series when several share an axes; the last decimation_views zoomed
+    # views are kept
+    plot_decimate_min_points = 20000
+    plot_decimation = 'minmax'
+    plot_hexbin_min_points = 100000
+    plot_hexbin_pixels = 8
+    plot_scatter_max_points = 100000
+    plot_decimation_views = 16
+
+    # Table undo: most changes kept and most bytes the kept changes may
+    # hold before the oldest are forgotten
+    undo_levels = 20
+    undo_budget = 512 * 1024 ** 2
+
+    # Blocks of formatted cell text kept for redrawing the table
+    cell_format_cache_blocks = 2048
+
+    # Values sampled per object column to estimate its deep memory usage
+    # in the Table tab, 0 to always walk every value
+    memory_sample_size = 10000
+
+    # Table analysis: columns per block and threads, 0 for one per CPU
+    insight_block_columns = 256
+    insight_workers = 0
+
+    # Optimize Memory: largest relative error allowed when a float column
+    # is narrowed, and most distinct values per row for a category column
+    downcast_float_tolerance = 1e-6
+    downcast_category_max_ratio = 0.5
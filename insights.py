@@ -17,41 +17,50 @@
     along with this program.  If not, see <https://www.gnu.org/licenses/>.
 """
 
+import os
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+import pandas as pd
 from toolbox import exec_qry, is_float_series_integer, is_integer_series_natural
+from database import join_batch
 from datetime import datetime
 from global_config import g
 
+INSIGHT_TEXTS = {
+    'missing': 'Missing values found in column ({name}), index ({index}).',
+    'integer': 'Try converting column ({name}), index ({index}) to integer.',
+    'smaller_float': 'Try converting column ({name}), index ({index}) to a '
+                     'smaller precision float.',
+    'unsigned': 'Try converting column ({name}), index ({index}) to '
+                'unsigned integer.',
+    'smaller_int': 'Try converting column ({name}), index ({index}) to a '
+                   'smaller integer.',
+    'smaller_uint': 'Try converting column ({name}), index ({index}) to a '
+                    'smaller unsigned integer.',
+}
 
-class ColumnInsight():
+INSIGHT_PRIORITIES = {
+    'missing': 'High',
+    'integer': 'Medium',
+    'smaller_float': 'Medium',
+    'unsigned': 'Medium',
+    'smaller_int': 'Medium',
+    'smaller_uint': 'Medium',
+}
 
-    def __init__(self, col_values, column_tab_dict):
 
-        self.col_values = col_values
-        self.column_tab_dict = column_tab_dict
+def insight_text(kind, column_name, column_index):
 
-        # column identity
-        self.column_index = int(self.
-                                column_tab_dict['selected_column_entry'][0])
-        self.column_name = self. \
-            column_tab_dict['selected_column_name_entry'][0]
+    return INSIGHT_TEXTS[kind].format(name=column_name, index=column_index)
 
-        # feature information
-        self.feature_type = self.column_tab_dict['feature_type_entry'][0]
-        self.dtype = str(self.column_tab_dict['dtype_entry'][0])
 
-        # memory usage
-        self.bytes_in_data_entry = self. \
-            column_tab_dict['bytes_in_data_entry'][0]
-        self.bytes_in_col_index_entry = self. \
-            column_tab_dict['bytes_in_col_index_entry'][0]
-        self.memusage_of_col_without_index_entry = self. \
-            column_tab_dict['memusage_of_col_without_index_entry'][0]
-        self.memusage_of_col_with_index_entry = self. \
-            column_tab_dict['memusage_of_col_with_index_entry'][0]
-        self.deep_memusage_of_col_with_index_entry = self. \
-            column_tab_dict['deep_memusage_of_col_with_index_entry'][0]
-        self.getsizeof_col_entry = self. \
-            column_tab_dict['getsizeof_col_entry'][0]
+class Insight():
+    """ Reads and writes the Insights table """
+
+    def __init__(self, batch=None):
+
+        # optional BatchWriter, writes are flushed by its owner
+        self.batch = batch
 
     def get_insights(self):
 
@@ -63,7 +72,7 @@ class ColumnInsight():
         # remove all records in Insights table
         table_name = 'Insights'
         qry = "DELETE FROM {tbl}".format(tbl=table_name)
-        exec_qry(qry)
+        self._write(qry)
 
         # reset autonumber in Insights table
         sqlite_table_name = 'sqlite_sequence'
@@ -75,17 +84,82 @@ class ColumnInsight():
                    tbl=sqlite_table_name,
                    cond=where_column1)
         parameters = (0, table_name)
+        return self._write(qry, parameters)
+
+    def _add_insight(self,
+                     column_index=0,
+                     column_name='',
+                     insight_text='',
+                     insight_priority='',
+                     language_id=1):
+
+        # fields to insert into
+        table_name = 'Insights'
+        col_index = 'ColumnIndex'
+        col_name = 'ColumnName'
+        col_insight_text = 'InsightText'
+        col_insight_priority = 'InsightPriority'
+        col_date_created = 'DateCreated'
+        col_language_id = 'LanguageID'
+
+        qry = "INSERT INTO {tbl} ({col1}, {col2}, {col3}, {col4}, {col5}, {col6}) VALUES (?, ?, ?, ?, ?, ?)".\
+            format(tbl=table_name, col1=col_index, col2=col_name,
+                   col3=col_insight_text, col4=col_insight_priority,
+                   col5=col_date_created, col6=col_language_id)
+        parameters = (column_index, column_name, insight_text,
+                      insight_priority, datetime.now(), language_id)
+
+        return self._write(qry, parameters)
+
+    def _write(self, qry, parameters=()):
+
+        if self.batch is not None:
+            self.batch.add(qry, parameters)
+            return None
         return exec_qry(qry, parameters)
 
+
+class ColumnInsight(Insight):
+
+    def __init__(self, col_values, column_tab_dict, batch=None):
+
+        Insight.__init__(self, batch=batch)
+        self.col_values = col_values
+        self.column_tab_dict = column_tab_dict
+
+        # column identity
+        self.column_index = int(self.
+                                column_tab_dict['selected_column_entry'][0])
+        self.column_name = self. \
+            column_tab_dict['selected_column_name_entry'][0]
+
+        # feature information
+        self.feature_type = self.column_tab_dict['feature_type_entry'][0]
+        self.dtype = str(self.column_tab_dict['dtype_entry'][0])
+
+        # memory usage
+        self.bytes_in_data_entry = self. \
+            column_tab_dict['bytes_in_data_entry'][0]
+        self.bytes_in_col_index_entry = self. \
+            column_tab_dict['bytes_in_col_index_entry'][0]
+        self.memusage_of_col_without_index_entry = self. \
+            column_tab_dict['memusage_of_col_without_index_entry'][0]
+        self.memusage_of_col_with_index_entry = self. \
+            column_tab_dict['memusage_of_col_with_index_entry'][0]
+        self.deep_memusage_of_col_with_index_entry = self. \
+            column_tab_dict['deep_memusage_of_col_with_index_entry'][0]
+        self.getsizeof_col_entry = self. \
+            column_tab_dict['getsizeof_col_entry'][0]
+
     def missing_values(self):
 
         if self.col_values.isnull().sum() > 0:
 
             self._add_insight(column_index=self.column_index,
                               column_name=self.column_name,
-                              insight_text='Missing values found in column (' +
-                              self.column_name + '), index (' +
-                              str(self.column_index) + ').',
+                              insight_text=insight_text('missing',
+                                                        self.column_name,
+                                                        self.column_index),
                               insight_priority='High',
                               language_id=g.localized_lang)
             return True
@@ -103,9 +177,9 @@ class ColumnInsight():
                 # recommend to cast to some form of int
                 self._add_insight(column_index=self.column_index,
                                   column_name=self.column_name,
-                                  insight_text='Try converting column (' +
-                                  self.column_name + '), index (' +
-                                  str(self.column_index) + ') to integer.',
+                                  insight_text=insight_text('integer',
+                                                            self.column_name,
+                                                            self.column_index),
                                   insight_priority='Medium',
                                   language_id=g.localized_lang)
             else:
@@ -113,10 +187,9 @@ class ColumnInsight():
                     # recommend to cast to smaller precision float
                     self._add_insight(column_index=self.column_index,
                                       column_name=self.column_name,
-                                      insight_text='Try converting column (' +
-                                      self.column_name + '), index (' +
-                                      str(self.column_index) + ') to a ' +
-                                      'smaller precision float.',
+                                      insight_text=insight_text(
+                                          'smaller_float', self.column_name,
+                                          self.column_index),
                                       insight_priority='Medium',
                                       language_id=g.localized_lang)
 
@@ -129,10 +202,9 @@ class ColumnInsight():
                 # recommend to cast to unsigned integers
                 self._add_insight(column_index=self.column_index,
                                   column_name=self.column_name,
-                                  insight_text='Try converting column (' +
-                                  self.column_name + '), index (' +
-                                  str(self.column_index) + ') to unsigned ' +
-                                  'integer.',
+                                  insight_text=insight_text('unsigned',
+                                                            self.column_name,
+                                                            self.column_index),
                                   insight_priority='Medium',
                                   language_id=g.localized_lang)
             else:
@@ -141,10 +213,9 @@ class ColumnInsight():
                     # recommend to cast to smaller integer
                     self._add_insight(column_index=self.column_index,
                                       column_name=self.column_name,
-                                      insight_text='Try converting column (' +
-                                      self.column_name + '), index (' +
-                                      str(self.column_index) + ') to a ' +
-                                      'smaller integer.',
+                                      insight_text=insight_text(
+                                          'smaller_int', self.column_name,
+                                          self.column_index),
                                       insight_priority='Medium',
                                       language_id=g.localized_lang)
 
@@ -155,35 +226,164 @@ class ColumnInsight():
             # recommend to cast to smaller unsigned integer
             self._add_insight(column_index=self.column_index,
                               column_name=self.column_name,
-                              insight_text='Try converting column (' +
-                              self.column_name + '), index (' +
-                              str(self.column_index) + ') to a ' +
-                              'smaller unsigned integer.',
+                              insight_text=insight_text('smaller_uint',
+                                                        self.column_name,
+                                                        self.column_index),
                               insight_priority='Medium',
                               language_id=g.localized_lang)
         return
 
-    def _add_insight(self,
-                     column_index=0,
-                     column_name='',
-                     insight_text='',
-                     insight_priority='',
-                     language_id=1):
 
-        # fields to insert into
-        table_name = 'Insights'
-        col_index = 'ColumnIndex'
-        col_name = 'ColumnName'
-        col_insight_text = 'InsightText'
-        col_insight_priority = 'InsightPriority'
-        col_date_created = 'DateCreated'
-        col_language_id = 'LanguageID'
+# smallest types first, used by the range checks
+SIGNED_INTS = ('int8', 'int16', 'int32', 'int64')
+UNSIGNED_INTS = ('uint8', 'uint16', 'uint32', 'uint64')
+FLOATS = ('float16', 'float32', 'float64')
 
-        qry = "INSERT INTO {tbl} ({col1}, {col2}, {col3}, {col4}, {col5}, {col6}) VALUES (?, ?, ?, ?, ?, ?)".\
-            format(tbl=table_name, col1=col_index, col2=col_name,
-                   col3=col_insight_text, col4=col_insight_priority,
-                   col5=col_date_created, col6=col_language_id)
-        parameters = (column_index, column_name, insight_text,
-                      insight_priority, datetime.now(), language_id)
 
-        return exec_qry(qry, parameters)
+def fits_smaller_type(types, dtype, min_value, max_value):
+    """ Whether [min_value, max_value] fits a type before dtype in types """
+
+    for smaller in types[:types.index(dtype)]:
+        if smaller.startswith('float'):
+            info = np.finfo(smaller)
+        else:
+            info = np.iinfo(smaller)
+        if info.min <= min_value and max_value <= info.max:
+            return True
+    return False
+
+
+class TableInsight(Insight):
+    """ Insights for every column of a DataFrame at once
+
+    Columns are grouped by dtype and cut into blocks of up to
+    g.insight_block_columns columns. Each block is checked as one 2D
+    array (missing values, integer valued floats, non negative ints and
+    value ranges), blocks running on g.insight_workers threads since
+    the numpy reductions release the GIL. Findings are written in one
+    transaction by save().
+    """
+
+    def __init__(self, df, batch=None, workers=None, block_columns=None):
+
+        Insight.__init__(self, batch=batch)
+        self.df = df
+        if workers is None:
+            workers = g.insight_workers or os.cpu_count() or 1
+        if block_columns is None:
+            block_columns = g.insight_block_columns
+        self.workers = workers
+        self.block_columns = block_columns
+
+    def get_blocks(self):
+
+        positions_by_dtype = {}
+        for position, dtype in enumerate(self.df.dtypes):
+            positions_by_dtype.setdefault(str(dtype), []).append(position)
+
+        blocks = []
+        for dtype, positions in positions_by_dtype.items():
+            for i in range(0, len(positions), self.block_columns):
+                blocks.append((dtype, positions[i:i + self.block_columns]))
+        return blocks
+
+    def analyze(self, job=None):
+        """ Return the findings as (column index, kind) sorted by column
+
+        job is an optional BackgroundJob to report progress to.
+        """
+
+        blocks = self.get_blocks()
+        findings = []
+
+        def collect(results):
+            for i, block_findings in enumerate(results):
+                findings.extend(block_findings)
+                if job is not None:
+                    job.check_cancelled()
+                    job.report(i + 1, len(blocks), 'Analyzing table')
+
+        if self.workers > 1 and len(blocks) > 1:
+            with ThreadPoolExecutor(max_workers=self.workers) as executor:
+                collect(executor.map(self.analyze_block, blocks))
+        else:
+            collect(map(self.analyze_block, blocks))
+
+        findings.sort(key=lambda finding: finding[0])
+        return findings
+
+    def analyze_block(self, block):
+
+        dtype, positions = block
+        values = self.df.iloc[:, positions]
+        if dtype in FLOATS or dtype in SIGNED_INTS or dtype in UNSIGNED_INTS:
+            values = values.to_numpy()  # one dtype, so no copy
+            missing = np.isnan(values).any(axis=0) \
+                if dtype in FLOATS else np.zeros(len(positions), dtype=bool)
+        else:
+            missing = pd.isna(values).to_numpy().any(axis=0)
+
+        findings = []
+        for i, position in enumerate(positions):
+            if missing[i]:
+                findings.append((position, 'missing'))
+
+        if len(self.df.index) == 0 or not (
+                dtype in FLOATS or dtype in SIGNED_INTS or
+                dtype in UNSIGNED_INTS):
+            return findings
+
+        # the memory checks only run on columns without missing values
+        complete = ~missing
+        if not complete.any():
+            return findings
+        values = values[:, complete]
+        positions = [p for p, ok in zip(positions, complete) if ok]
+        min_values = values.min(axis=0)
+        max_values = values.max(axis=0)
+
+        if dtype in FLOATS:
+            with np.errstate(invalid='ignore'):
+                is_integer = (np.mod(values, 1) == 0).all(axis=0)
+            for i, position in enumerate(positions):
+                if is_integer[i]:
+                    findings.append((position, 'integer'))
+                elif fits_smaller_type(FLOATS, dtype,
+                                       min_values[i], max_values[i]):
+                    findings.append((position, 'smaller_float'))
+
+        elif dtype in SIGNED_INTS:
+            for i, position in enumerate(positions):
+                if min_values[i] >= 0:
+                    findings.append((position, 'unsigned'))
+                elif fits_smaller_type(SIGNED_INTS, dtype,
+                                       min_values[i], max_values[i]):
+                    findings.append((position, 'smaller_int'))
+
+        else:
+            for i, position in enumerate(positions):
+                if fits_smaller_type(UNSIGNED_INTS, dtype,
+                                     min_values[i], max_values[i]):
+                    findings.append((position, 'smaller_uint'))
+
+        return findings
+
+    def save(self, findings):
+        """ Replace the Insights table with findings, in one transaction """
+
+        columns = self.df.columns
+        owner_batch = self.batch
+        with join_batch(owner_batch) as batch:
+            self.batch = batch
+            try:
+                self.reset_insights()
+                for position, kind in findings:
+                    self._add_insight(
+                        column_index=position,
+                        column_name=columns[position],
+                        insight_text=insight_text(kind, columns[position],
+                                                  position),
+                        insight_priority=INSIGHT_PRIORITIES[kind],
+                        language_id=g.localized_lang)
+            finally:
+                self.batch = owner_batch
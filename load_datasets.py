@@ -17,26 +17,344 @@
     along with this program.  If not, see <https://www.gnu.org/licenses/>.
 """
 
+import hashlib
+import json
+import os
+import shutil
+import threading
+import numpy as np
 import pandas as pd
 from toolbox import write_to_console
+from pagedframe import ColumnarSource, PagedFrame
+from global_config import g
+
+
+def read_csv_with_progress(file_name, on_progress=None,
+                           check_cancelled=None, chunk_rows=None):
+    """ pd.read_csv in chunks, reporting the bytes read so far
+
+    on_progress(done, total) is called after every chunk with the
+    position in the file and its size, check_cancelled() before reading
+    the next one.
+    """
+
+    if chunk_rows is None:
+        chunk_rows = g.load_chunk_rows
+    total = os.path.getsize(file_name)
+
+    chunks = []
+    with open(file_name, 'rb') as f:
+        for chunk in pd.read_csv(f, chunksize=chunk_rows):
+            if check_cancelled is not None:
+                check_cancelled()
+            chunks.append(chunk)
+            if on_progress is not None:
+                on_progress(f.tell(), total)
+
+    if not chunks:
+        return pd.read_csv(file_name)
+    return pd.concat(chunks, ignore_index=True)
+
+
+# bump when the layout of a cache entry changes
+CACHE_FORMAT = 1
+
+# bytes hashed per read when fingerprinting a source file
+HASH_BLOCK = 1 << 20
+
+
+def hash_file(file_name, check_cancelled=None):
+
+    digest = hashlib.sha1()
+    with open(file_name, 'rb') as f:
+        for block in iter(lambda: f.read(HASH_BLOCK), b''):
+            if check_cancelled is not None:
+                check_cancelled()
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class DatasetCache():
+    """ Columnar copies of parsed CSV files
+
+    The first read of a CSV file parses it and writes every column next
+    to it as a .npy file; text columns are written as integer codes
+    plus a JSON list of their values, so nothing is pickled. Later reads
+    memory map the .npy files instead of parsing the CSV again.
+
+    An entry is keyed on the file's path and the read_csv options and
+    records the file's size, mtime and SHA-1. Size and mtime unchanged
+    means the entry is used as is; a new mtime with the same size is
+    checked against the hash, anything else evicts the entry. Once the
+    cache grows over budget bytes the least recently used entries go.
+    Files under min_size bytes parse faster than their columns load and
+    are not cached.
+    """
+
+    def __init__(self, cache_dir=None, budget=None, min_size=None):
+
+        if cache_dir is None:
+            cache_dir = g.dataset_cache_dir
+        if budget is None:
+            budget = g.dataset_cache_budget
+        if min_size is None:
+            min_size = g.dataset_cache_min_size
+        self.cache_dir = cache_dir
+        self.budget = budget
+        self.min_size = min_size
+        self._lock = threading.Lock()
+
+    def read_csv(self, file_name, on_progress=None, check_cancelled=None,
+                 **read_options):
+        """ pd.read_csv(file_name, **read_options), from the cache if
+        possible, with read_csv_with_progress's progress reporting """
+
+        stat = os.stat(file_name)
+        if stat.st_size < self.min_size:
+            if read_options:
+                return pd.read_csv(file_name, **read_options)
+            return read_csv_with_progress(file_name, on_progress,
+                                          check_cancelled)
+
+        entry_dir = self.get_entry_dir(file_name, read_options)
+
+        with self._lock:
+            meta = self._read_meta(entry_dir)
+            if meta is not None and not self._is_valid(meta, file_name,
+                                                       stat):
+                self._remove(entry_dir)
+                meta = None
+        if meta is not None:
+            try:
+                df = self._load(entry_dir, meta, on_progress,
+                                check_cancelled)
+            except (OSError, ValueError):
+                # a damaged entry is read from the CSV again
+                with self._lock:
+                    self._remove(entry_dir)
+            else:
+                self._touch(entry_dir)
+                return df
+
+        if read_options:
+            df = pd.read_csv(file_name, **read_options)
+        else:
+            df = read_csv_with_progress(file_name, on_progress,
+                                        check_cancelled)
+        try:
+            self._save(entry_dir, df, file_name, stat, read_options,
+                       check_cancelled)
+        except (OSError, TypeError, ValueError):
+            # columns that cannot be cached only cost the speed up
+            with self._lock:
+                self._remove(entry_dir + '.tmp')
+        return df
+
+    def open_paged(self, file_name, **read_options):
+        """ A PagedFrame over the cache entry of the file, None when the
+        file has no valid entry (read_csv makes it) """
+
+        entry_dir = self.get_entry_dir(file_name, read_options)
+        stat = os.stat(file_name)
+        with self._lock:
+            meta = self._read_meta(entry_dir)
+            if meta is None or not self._is_valid(meta, file_name, stat):
+                return None
+        try:
+            frame = PagedFrame(ColumnarSource(entry_dir))
+        except (OSError, ValueError, TypeError):
+            return None
+        self._touch(entry_dir)
+        return frame
+
+    def get_entry_dir(self, file_name, read_options):
+
+        key = json.dumps([CACHE_FORMAT, pd.__version__,
+                          os.path.abspath(file_name),
+                          sorted(read_options.items())],
+                         default=str)
+        digest = hashlib.sha1(key.encode('utf-8')).hexdigest()[:16]
+        return os.path.join(self.cache_dir,
+                            os.path.basename(file_name) + '-' + digest)
+
+    def clear(self):
+
+        with self._lock:
+            self._remove(self.cache_dir)
+
+    def _is_valid(self, meta, file_name, stat):
+
+        if meta.get('size') != stat.st_size:
+            return False
+        if meta.get('mtime_ns') == stat.st_mtime_ns:
+            return True
+        # touched, or copied over with the same size
+        if hash_file(file_name) != meta.get('sha1'):
+            return False
+        meta['mtime_ns'] = stat.st_mtime_ns
+        self._write_meta(meta['entry_dir'], meta)
+        return True
+
+    def _read_meta(self, entry_dir):
+
+        try:
+            with open(os.path.join(entry_dir, 'meta.json'), 'r',
+                      encoding='utf-8') as f:
+                meta = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if meta.get('format') != CACHE_FORMAT:
+            return None
+        meta['entry_dir'] = entry_dir
+        return meta
+
+    def _write_meta(self, entry_dir, meta):
+
+        meta = {key: value for key, value in meta.items()
+                if key != 'entry_dir'}
+        with open(os.path.join(entry_dir, 'meta.json'), 'w',
+                  encoding='utf-8') as f:
+            json.dump(meta, f, default=str)
+
+    def _load(self, entry_dir, meta, on_progress, check_cancelled):
+
+        columns = meta['columns']
+        data = {}
+        for i, column in enumerate(columns):
+            if check_cancelled is not None:
+                check_cancelled()
+            values = np.load(os.path.join(entry_dir, column['file']),
+                             mmap_mode='c', allow_pickle=False)
+            if 'categories' in column:
+                with open(os.path.join(entry_dir, column['categories']), 'r',
+                          encoding='utf-8') as f:
+                    categories = np.array(json.load(f) + [np.nan],
+                                          dtype=object)
+                # code -1 picks the trailing NaN
+                values = categories[values]
+            data[i] = pd.Series(values, copy=False).astype(column['dtype'],
+                                                           copy=False)
+            if on_progress is not None:
+                on_progress(i + 1, len(columns))
+
+        df = pd.DataFrame(data, index=pd.RangeIndex(meta['rows']))
+        df.columns = [column['name'] for column in columns]
+        return df
+
+    def _save(self, entry_dir, df, file_name, stat, read_options,
+              check_cancelled):
+
+        if not isinstance(df.index, pd.RangeIndex) or df.index.start != 0 \
+                or df.index.step != 1:
+            return
+
+        tmp_dir = entry_dir + '.tmp'
+        with self._lock:
+            self._remove(tmp_dir)
+            os.makedirs(tmp_dir)
+
+        columns = []
+        for i, name in enumerate(df.columns):
+            if check_cancelled is not None:
+                check_cancelled()
+            col_values = df.iloc[:, i]
+            column = {'name': name, 'dtype': str(col_values.dtype),
+                      'file': '%d.npy' % i}
+            dtype = col_values.dtype
+            if isinstance(dtype, np.dtype) and dtype.kind in 'biufcmM':
+                values = col_values.to_numpy()
+            else:
+                # text columns, _json_values refuses anything json could
+                # not give back as the same value
+                codes, uniques = pd.factorize(col_values.astype(object))
+                values = codes
+                column['categories'] = '%d.json' % i
+                with open(os.path.join(tmp_dir, column['categories']), 'w',
+                          encoding='utf-8') as f:
+                    json.dump(_json_values(uniques), f, allow_nan=False)
+            np.save(os.path.join(tmp_dir, column['file']), values,
+                    allow_pickle=False)
+            columns.append(column)
+
+        meta = {'format': CACHE_FORMAT,
+                'source': os.path.abspath(file_name),
+                'size': stat.st_size,
+                'mtime_ns': stat.st_mtime_ns,
+                'sha1': hash_file(file_name, check_cancelled),
+                'read_options': sorted(read_options.items()),
+                'rows': len(df),
+                'columns': columns}
+        self._write_meta(tmp_dir, meta)
+
+        with self._lock:
+            self._remove(entry_dir)
+            os.replace(tmp_dir, entry_dir)
+            self._evict(keep=entry_dir)
+
+    def _touch(self, entry_dir):
+
+        # the directory's mtime orders the entries for eviction
+        try:
+            os.utime(entry_dir)
+        except OSError:
+            pass
+
+    def _evict(self, keep=None):
+
+        entries = []
+        total = 0
+        for name in os.listdir(self.cache_dir):
+            path = os.path.join(self.cache_dir, name)
+            if not os.path.isdir(path) or name.endswith('.tmp'):
+                continue
+            size = sum(entry.stat().st_size for entry in os.scandir(path))
+            entries.append((os.stat(path).st_mtime, path, size))
+            total += size
+
+        for mtime, path, size in sorted(entries):
+            if total <= self.budget:
+                break
+            if path == keep:
+                continue
+            self._remove(path)
+            total -= size
+
+    def _remove(self, path):
+
+        shutil.rmtree(path, ignore_errors=True)
+
+
+def _json_values(values):
+
+    result = []
+    for value in values:
+        if isinstance(value, np.generic):
+            value = value.item()
+        if not isinstance(value, (str, int, float)):
+            raise TypeError('Cannot cache %r' % type(value))
+        result.append(value)
+    return result
+
+
+dataset_cache = DatasetCache()
 
 
 def load_dataset(obj):
 
     if (obj == "iris"):
         write_to_console('\nLoading %s Dataset...' % (obj))
-        df = pd.read_csv('./datasets/iris.csv')
+        df = dataset_cache.read_csv('./datasets/iris.csv')
         write_to_console('\nLoading complete.')
         return df
 
     if (obj == "eda"):
         write_to_console('\nLoading %s Dataset...' % (obj))
-        df = pd.read_csv('./datasets/eda.csv')
+        df = dataset_cache.read_csv('./datasets/eda.csv')
         write_to_console('\nLoading complete.')
         return df
 
     if (obj == "wine"):
         write_to_console('\nLoading %s Dataset...' % (obj))
-        df = pd.read_csv('./datasets/wine.csv')
+        df = dataset_cache.read_csv('./datasets/wine.csv')
         write_to_console('\nLoading complete.')
         return df
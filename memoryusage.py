@@ -0,0 +1,158 @@
+"""
+    Warchest: Data management and automation GUI for Machine Learning projects
+    Created September 2017
+    Copyright (C) Nelson R Gonzalez
+
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+import sys
+import threading
+from collections import namedtuple
+import numpy as np
+from columnprofile import GC_OVERHEAD
+from global_config import g
+
+ColumnMemory = namedtuple('ColumnMemory', [
+    'name', 'dtype', 'memusage', 'deep_memusage', 'estimated'])
+
+TableMemory = namedtuple('TableMemory', [
+    # per column ColumnMemory, and dtype -> (memusage, deep_memusage)
+    'columns', 'blocks',
+    # the figures shown in the Table tab, summed over the columns as
+    # if each one was a Series carrying its own copy of the index
+    'nbytes', 'index_nbytes', 'memusage', 'memusage_with_index',
+    'deep_memusage_with_index', 'getsizeof',
+    # True when a deep figure includes a sampled estimate
+    'estimated'])
+
+
+def estimate_objects_size(values, sample_size):
+    """ Bytes held by the python objects of an object array
+
+    Exact when the array has at most sample_size values, otherwise the
+    mean size of sample_size evenly spaced values times the length.
+    """
+
+    n = len(values)
+    if n == 0:
+        return 0, False
+    if not sample_size or n <= sample_size:
+        return sum(map(sys.getsizeof, values)), False
+    positions = np.linspace(0, n - 1, sample_size).astype(np.intp)
+    sampled = sum(map(sys.getsizeof, values[positions]))
+    return int(sampled * n / sample_size), True
+
+
+class MemoryAccountant():
+    """ Memory usage of a whole table, per column and per dtype block
+
+    Plain numpy columns are accounted from their dtype alone (rows times
+    item size), without building a Series. Only object and extension
+    columns are looked at, and their deep size is kept per column
+    version so a change to one column does not walk the others again.
+    The last result is kept for the model's data version.
+    """
+
+    def __init__(self, sample_size=None):
+
+        if sample_size is None:
+            sample_size = g.memory_sample_size
+        self.sample_size = sample_size
+        self._usage = None
+        self._columns = {}
+        self._lock = threading.Lock()
+
+    def get_usage(self, model):
+
+        version = model.data_version
+        with self._lock:
+            if self._usage is not None and self._usage[0] == version:
+                return self._usage[1]
+
+        usage = self._account(model)
+        with self._lock:
+            self._usage = (version, usage)
+        return usage
+
+    def clear(self):
+
+        with self._lock:
+            self._usage = None
+            self._columns = {}
+
+    def _account(self, model):
+
+        df = model.frame
+        rows = len(df)
+        index = df.index
+
+        columns = []
+        columns_cache = {}
+        for i, (name, dtype) in enumerate(df.dtypes.items()):
+            if isinstance(dtype, np.dtype) and dtype != object:
+                memusage = rows * dtype.itemsize
+                column = ColumnMemory(name, str(dtype), memusage, memusage,
+                                      False)
+            else:
+                key = (i, name)
+                version = model.getColumnVersion(name)
+                cached = self._columns.get(key)
+                if cached is not None and cached[0] == version:
+                    column = cached[1]
+                else:
+                    column = self._account_column(df.iloc[:, i], name)
+                columns_cache[key] = (version, column)
+            columns.append(column)
+
+        blocks = {}
+        for column in columns:
+            memusage, deep_memusage = blocks.get(column.dtype, (0, 0))
+            blocks[column.dtype] = (memusage + column.memusage,
+                                    deep_memusage + column.deep_memusage)
+
+        n = len(columns)
+        memusage = sum(column.memusage for column in columns)
+        deep_memusage = sum(column.deep_memusage for column in columns)
+        deep_memusage_with_index = deep_memusage + \
+            n * index.memory_usage(deep=True)
+
+        with self._lock:
+            self._columns = columns_cache
+
+        return TableMemory(
+            columns=tuple(columns),
+            blocks=blocks,
+            nbytes=memusage,
+            index_nbytes=n * index.nbytes,
+            memusage=memusage,
+            memusage_with_index=memusage + n * index.memory_usage(deep=False),
+            deep_memusage_with_index=deep_memusage_with_index,
+            getsizeof=deep_memusage_with_index + n * GC_OVERHEAD,
+            estimated=any(column.estimated for column in columns))
+
+    def _account_column(self, col_values, name):
+
+        memusage = int(col_values.memory_usage(index=False, deep=False))
+        if col_values.dtype == object:
+            objects_size, estimated = estimate_objects_size(
+                col_values.to_numpy(), self.sample_size)
+            deep_memusage = memusage + objects_size
+        else:
+            # extension arrays report their own deep size
+            deep_memusage = int(col_values.memory_usage(index=False,
+                                                        deep=True))
+            estimated = False
+        return ColumnMemory(name, str(col_values.dtype), memusage,
+                            deep_memusage, estimated)
@@ -0,0 +1,152 @@
+"""
+    Warchest: Data management and automation GUI for Machine Learning projects
+    Created September 2017
+    Copyright (C) Nelson R Gonzalez
+
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+import json
+import threading
+from collections import namedtuple
+from toolbox import exec_qry
+
+Algorithm = namedtuple('Algorithm', [
+    'AlgorithmID', 'AlgorithmName', 'AlgorithmInternalName',
+    'AlgorithmDesc', 'AlgorithmNotes', 'AlgorithmDocs', 'AlgorithmGuides',
+    'AlgorithmWiki', 'AlgorithmTypeID', 'NeedsScaling', 'IsActive'])
+
+OverrideAlgorithm = namedtuple('OverrideAlgorithm', [
+    'AlgorithmID', 'AlgorithmDesc', 'AlgorithmTypeID', 'NeedsScaling',
+    'IsSelected'])
+
+ModelOverrideRow = namedtuple('ModelOverrideRow', [
+    'ModelOverrideID', 'ModelOverrideName',
+    'ModelOverrideText1', 'ModelOverrideText2',
+    'ModelOverrideInt1', 'ModelOverrideInt2',
+    'ModelOverrideFloat1', 'ModelOverrideFloat2'])
+
+# table name -> (query, key of each row, row type)
+CACHED_TABLES = {
+    'Algorithms': (
+        'SELECT AlgorithmID, AlgorithmName, AlgorithmInternalName, '
+        'AlgorithmDesc, AlgorithmNotes, AlgorithmDocs, AlgorithmGuides, '
+        'AlgorithmWiki, AlgorithmTypeID, NeedsScaling, IsActive '
+        'FROM Algorithms',
+        lambda row: row.AlgorithmID,
+        Algorithm),
+    'ModelOverrideAlgorithms': (
+        'SELECT AlgorithmID, AlgorithmDesc, AlgorithmTypeID, NeedsScaling, '
+        'IsSelected FROM ModelOverrideAlgorithms',
+        lambda row: row.AlgorithmID,
+        OverrideAlgorithm),
+    'ModelOverrides': (
+        'SELECT ModelOverrideID, ModelOverrideName, '
+        'ModelOverrideText1, ModelOverrideText2, '
+        'ModelOverrideInt1, ModelOverrideInt2, '
+        'ModelOverrideFloat1, ModelOverrideFloat2 FROM ModelOverrides',
+        lambda row: row.ModelOverrideName,
+        ModelOverrideRow),
+    'Tooltips': (
+        'SELECT WidgetName, LanguageID, TooltipText FROM Tooltips',
+        lambda row: (row[0], row[1]),
+        tuple),
+    'ModelOptions': (
+        'SELECT ModelOptionName, ModelOptionDesc FROM ModelOptions',
+        lambda row: row[0],
+        tuple),
+}
+
+
+class MetadataCache():
+    """ Read-through cache for metadata tables that rarely change
+
+    Each table in CACHED_TABLES is read in full the first time it is
+    needed and served from memory afterwards. The dialogs that write
+    to those tables call invalidate() so the next read reloads it.
+    """
+
+    def __init__(self):
+
+        self._tables = {}
+        self._lock = threading.Lock()
+
+    def _get_table(self, table_name):
+
+        table = self._tables.get(table_name)
+        if table is None:
+            qry, key, row_type = CACHED_TABLES[table_name]
+            table = {}
+            for row in exec_qry(qry):
+                row = row_type(row) if row_type is tuple else row_type(*row)
+                table[key(row)] = row
+            with self._lock:
+                self._tables[table_name] = table
+        return table
+
+    def invalidate(self, *table_names):
+        """ Drop the given tables, or every table when none is given """
+
+        with self._lock:
+            if not table_names:
+                self._tables.clear()
+            for table_name in table_names:
+                self._tables.pop(table_name, None)
+
+    def get_algorithm(self, algorithm_id):
+
+        return self._get_table('Algorithms').get(algorithm_id)
+
+    def get_algorithm_internal_name(self, algorithm_id):
+
+        algorithm = self.get_algorithm(algorithm_id)
+        if algorithm is not None:
+            return algorithm.AlgorithmInternalName
+
+    def get_override_algorithm(self, algorithm_id):
+
+        return self._get_table('ModelOverrideAlgorithms').get(algorithm_id)
+
+    def does_algorithm_need_scaling(self, algorithm_id):
+
+        algorithm = self.get_override_algorithm(algorithm_id)
+        if algorithm is not None:
+            return algorithm.NeedsScaling == 1
+
+    def get_model_override(self, name):
+
+        return self._get_table('ModelOverrides').get(name)
+
+    def get_tooltip(self, widget_name, language=1):
+
+        row = self._get_table('Tooltips').get((widget_name, language))
+        if row is not None:
+            return row[2]
+
+    def get_model_option(self, option):
+
+        row = self._get_table('ModelOptions').get(option)
+        if row is not None:
+            # decoded on every call so callers can mutate what they get
+            return json.loads(row[1])
+
+    def set_model_option(self, option, text):
+        """ Write-through for ModelOption.update_model_option """
+
+        table = self._tables.get('ModelOptions')
+        if table is not None and option in table:
+            table[option] = (option, text)
+
+
+metadata_cache = MetadataCache()
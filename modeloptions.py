@@ -18,6 +18,7 @@
 """
 
 from toolbox import exec_qry
+from metadatacache import metadata_cache
 import json
 
 
@@ -29,15 +30,17 @@ class ModelOption():
 
     def get_model_option(self, option):
 
-        qry = 'SELECT ModelOptionDesc FROM ModelOptions WHERE ModelOptionName=?'
-        parameters = (option,)
-        cursor = exec_qry(qry, parameters)
+        return metadata_cache.get_model_option(option)
 
-        for row in cursor:
-            return json.loads(row[0])
-
-    def update_model_option(self, option, newvalue):
+    def update_model_option(self, option, newvalue, batch=None):
 
         qry = 'UPDATE ModelOptions SET ModelOptionDesc=? WHERE ModelOptionName=?'
         parameters = (json.dumps(newvalue), option)
-        exec_qry(qry, parameters)
+        if batch is not None:
+            batch.add(qry, parameters)
+            # the cache follows the table once the batch is written
+            batch.on_commit(metadata_cache.set_model_option, option,
+                            parameters[0])
+        else:
+            exec_qry(qry, parameters)
+            metadata_cache.set_model_option(option, parameters[0])
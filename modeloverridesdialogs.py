@@ -22,6 +22,7 @@ import tkinter as tk
 from tkinter import ttk
 from tkinter import messagebox
 from modeltasks import ModelTask
+from metadatacache import metadata_cache
 
 
 class ClassifiersModelOverrides(tk.Toplevel):
@@ -139,6 +140,7 @@ class ClassifiersModelOverrides(tk.Toplevel):
             qry = 'UPDATE ModelOverrideAlgorithms SET NeedsScaling=? WHERE AlgorithmID=?'
             parameters = (1, algorithm_id)
             exec_qry(qry, parameters)
+        metadata_cache.invalidate('ModelOverrideAlgorithms')
 
         self.parent_callback('update')
 
@@ -169,6 +171,7 @@ class ClassifiersModelOverrides(tk.Toplevel):
             qry = 'UPDATE ModelOverrideAlgorithms SET IsSelected=? WHERE AlgorithmID=?'
             parameters = ("Yes", algorithm_id)
             exec_qry(qry, parameters)
+        metadata_cache.invalidate('ModelOverrideAlgorithms')
 
         self.parent_callback('update')
 
@@ -1076,6 +1079,7 @@ class TrainAndTestSplitOverrides(tk.Toplevel):
                       self.test_size_entry.get(),
                       'train_and_test_split')
         exec_qry(qry, parameters)
+        metadata_cache.invalidate('ModelOverrides')
 
         self.parent_callback('update')
 
@@ -1263,6 +1267,7 @@ class ScalingOverrides(tk.Toplevel):
             "WHERE ModelOverrideName=?"
         parameters = (self.scaling_var.get(), 'scaling')
         exec_qry(qry, parameters)
+        metadata_cache.invalidate('ModelOverrides')
 
         self.parent_callback('update')
 
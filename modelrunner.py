@@ -0,0 +1,192 @@
+"""
+    Warchest: Data management and automation GUI for Machine Learning projects
+    Created September 2017
+    Copyright (C) Nelson R Gonzalez
+
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+import os
+import multiprocessing as mp
+from multiprocessing import shared_memory
+import numpy as np
+import classifiers
+from global_config import g
+
+# arrays attached by _init_worker, one set per worker process
+_worker_arrays = {}
+_worker_shms = []
+
+
+def get_model_workers():
+
+    if g.model_workers:
+        return g.model_workers
+    return os.cpu_count() or 1
+
+
+def _share_array(arr):
+    """ Copy arr into a shared memory block once
+
+    Returns the block (owned by the caller, who must unlink it) and a
+    picklable spec workers use to map the same memory. Object arrays
+    cannot live in shared memory, those are sent as they are and get
+    pickled once per worker instead of once per task.
+    """
+
+    arr = np.ascontiguousarray(arr)
+    if arr.dtype.hasobject or arr.nbytes == 0:
+        return None, ('array', arr)
+    shm = shared_memory.SharedMemory(create=True, size=arr.nbytes)
+    shared = np.ndarray(arr.shape, dtype=arr.dtype, buffer=shm.buf)
+    shared[...] = arr
+    return shm, ('shm', shm.name, arr.shape, arr.dtype.str)
+
+
+def _init_worker(specs):
+
+    for name, spec in specs.items():
+        if spec[0] == 'shm':
+            shm = shared_memory.SharedMemory(name=spec[1])
+            _worker_shms.append(shm)
+            arr = np.ndarray(spec[2], dtype=np.dtype(spec[3]),
+                             buffer=shm.buf)
+            arr.flags.writeable = False
+        else:
+            arr = spec[1]
+        _worker_arrays[name] = arr
+
+
+def _fit_classifier(internal_name, needs_scaling, params):
+
+    if needs_scaling:
+        x_train = _worker_arrays['x_train_std']
+        x_test = _worker_arrays['x_test_std']
+    else:
+        x_train = _worker_arrays['x_train']
+        x_test = _worker_arrays['x_test']
+
+    clf = classifiers.get_classifier(internal_name)(**params)
+    return classifiers.score_clf(clf, x_train, x_test,
+                                 _worker_arrays['y_train'],
+                                 _worker_arrays['y_test'])
+
+
+class ModelJob():
+
+    def __init__(self, algorithm_id, internal_name, needs_scaling, params):
+
+        self.algorithm_id = algorithm_id
+        self.internal_name = internal_name
+        self.needs_scaling = needs_scaling
+        self.params = params
+        self.async_result = None
+        self.results = None
+        self.error = None
+
+
+class ModelRunner():
+    """ Fit several classifiers at once in a pool of worker processes
+
+    The train/test arrays are copied into shared memory once and every
+    worker maps them at start-up, so tasks only carry the algorithm
+    name and its parameters. start() submits every job, poll() returns
+    the jobs finished since the last call (so the caller can store
+    results while the others are still running) and cancel() kills the
+    workers right away.
+    """
+
+    def __init__(self, jobs, arrays, workers=None):
+
+        self.jobs = list(jobs)
+        self.arrays = arrays
+        if workers is None:
+            workers = get_model_workers()
+        self.workers = max(1, min(workers, len(self.jobs)))
+        self.pool = None
+        self._shms = []
+        self._pending = []
+        self.cancelled = False
+
+    def start(self):
+
+        for job in self.jobs:
+            if classifiers.get_classifier(job.internal_name) is None:
+                raise ValueError('Unknown classifier: %s' % job.internal_name)
+
+        names = ['y_train', 'y_test']
+        if any(job.needs_scaling for job in self.jobs):
+            names += ['x_train_std', 'x_test_std']
+        if not all(job.needs_scaling for job in self.jobs):
+            names += ['x_train', 'x_test']
+
+        specs = {}
+        for name in names:
+            shm, spec = _share_array(self.arrays[name])
+            if shm is not None:
+                self._shms.append(shm)
+            specs[name] = spec
+
+        # spawn, so workers never inherit a forked copy of the Tk app
+        ctx = mp.get_context('spawn')
+        self.pool = ctx.Pool(processes=self.workers,
+                             initializer=_init_worker,
+                             initargs=(specs,))
+        for job in self.jobs:
+            job.async_result = self.pool.apply_async(
+                _fit_classifier,
+                (job.internal_name, job.needs_scaling, job.params))
+        self._pending = list(self.jobs)
+
+    def poll(self):
+
+        finished = [job for job in self._pending if job.async_result.ready()]
+        for job in finished:
+            self._pending.remove(job)
+            try:
+                job.results = job.async_result.get()
+            except Exception as e:
+                job.error = e
+        if not self._pending:
+            self.close()
+        return finished
+
+    def is_done(self):
+
+        return not self._pending
+
+    def cancel(self):
+
+        self.cancelled = True
+        self._pending = []
+        if self.pool is not None:
+            self.pool.terminate()
+            self.pool.join()
+            self.pool = None
+        self._release()
+
+    def close(self):
+
+        if self.pool is not None:
+            self.pool.close()
+            self.pool.join()
+            self.pool = None
+        self._release()
+
+    def _release(self):
+
+        for shm in self._shms:
+            shm.close()
+            shm.unlink()
+        self._shms = []
@@ -17,17 +17,25 @@
     along with this program.  If not, see <https://www.gnu.org/licenses/>.
 """
 
-from toolbox import exec_qry, exec_insert_qry, scale, is_even
+from toolbox import scale, is_even
 import tkinter as tk
 from tkinter import ttk
 from sklearn.model_selection import train_test_split
 from tkinter import messagebox, filedialog
 from modeltasks import ModelTask
+from database import BatchWriter
+from modelrunner import ModelRunner, ModelJob
+from backgroundjobs import BackgroundJob, JobSlot
+from metadatacache import metadata_cache
 from sessions import Session
 from modeloverridesdialogs import ClassifiersModelOverrides
 from modeloverridesdialogs import TrainAndTestSplitOverrides
 from modeloverridesdialogs import ScalingOverrides
 import classifiers
+import time
+
+# how often the window checks the model runner for finished classifiers
+MODEL_RUNNER_POLL_MS = 100
 
 
 class Model(tk.Toplevel):
@@ -55,6 +63,9 @@ class Model(tk.Toplevel):
         session = Session()
         self.session_id = session.get_current_session()
 
+        # split, scale, fit and save all run off the Tk thread
+        self.model_job = JobSlot()
+
         model_task = ModelTask()
         self.simple_set_id = model_task.get_max_simple_set_number()
 
@@ -100,6 +111,9 @@ class Model(tk.Toplevel):
                                   activeforeground="black")
         self.model_menu.add_command(
             label="Run Model", command=self.on_run_model_menu_clicked)
+        self.model_menu.add_command(
+            label="Cancel Run", command=self.on_cancel_model_menu_clicked,
+            state='disabled')
         self.model_menu.add_separator()
         self.model_menu.add_command(label="Close", command=self.exit_window)
         self.menu_bar.add_cascade(label="Model", menu=self.model_menu)
@@ -332,6 +346,26 @@ class Model(tk.Toplevel):
                                               padx=1, pady=1)
         # self.add_tooltip_to_widget(self.run_simple_set_model_button)
 
+        # cancel_simple_set_model_button
+        self.cancel_simple_set_model_button = \
+            ttk.Button(self.simple_set_tab_button_area,
+                       text="Cancel",
+                       name="cancel_simple_set_model_button",
+                       state='disabled',
+                       command=self.on_cancel_model_menu_clicked)
+        self.cancel_simple_set_model_button.grid(row=0, column=1,
+                                                 sticky="nsew",
+                                                 padx=1, pady=1)
+
+        # simple_set_status_label
+        self.simple_set_status_label = \
+            ttk.Label(self.simple_set_tab_button_area,
+                      text="",
+                      name="simple_set_status_label")
+        self.simple_set_status_label.grid(row=0, column=2, sticky="nsew",
+                                          padx=1, pady=1)
+        self.simple_set_status_label.configure(style='Tabs.TLabel')
+
         # simple_set_tree
         self.simple_set_tree = \
             ttk.Treeview(self.simple_set_tab_work_area,
@@ -422,15 +456,17 @@ class Model(tk.Toplevel):
             messagebox.showwarning("Warning", "No features selected.")
             return
 
+        if self.model_job.is_running():
+            messagebox.showwarning("Warning", "A model is already running.")
+            return
+
         model_task = ModelTask()
         self.simple_set_id = model_task.get_next_available_simple_set_number()
 
-        self.get_train_and_test_split()
-        self.get_scaled_features(self.selected_scaling)
-
         for row in self.selected_params:
             print(row[0], row[1], row[2], row[3], row[4])
 
+        jobs = []
         for row in self.selected_classifiers:
 
             print(row)
@@ -449,30 +485,132 @@ class Model(tk.Toplevel):
 
             print(params)
 
-            called_clf = getattr(classifiers, self.get_algorithm_internal_name(row))
-
-            if self.does_algorithm_need_scaling(row) == True:
-                called_clf(x_train=self.x_train_std,
-                           x_test=self.x_test_std,
-                           y_train=self.y_train,
-                           y_test=self.y_test,
-                           session_id=self.session_id,
-                           simple_set_id=self.simple_set_id,
-                           algorithm_id=row,
-                           **params)
-            else:
-                called_clf(x_train=self.x_train,
-                           x_test=self.x_test,
-                           y_train=self.y_train,
-                           y_test=self.y_test,
-                           session_id=self.session_id,
-                           simple_set_id=self.simple_set_id,
-                           algorithm_id=row,
-                           **params)
+            jobs.append(ModelJob(algorithm_id=row,
+                                 internal_name=self.get_algorithm_internal_name(row),
+                                 needs_scaling=self.does_algorithm_need_scaling(row) == True,
+                                 params=params))
+
+        if len(jobs) == 0:
+            messagebox.showwarning("Warning", "No classifiers selected.")
+            return
 
+        self.set_running_state(True)
         self.tabs.select(1)
         self.update_simple_set_tree()
 
+        self.model_job.start(
+            BackgroundJob(self, self.run_models,
+                          args=(jobs,),
+                          on_progress=self.on_run_models_progress,
+                          on_done=self.on_run_models_finished,
+                          on_error=self.on_run_models_error,
+                          on_cancel=self.on_run_models_finished))
+
+    def run_models(self, job, jobs):
+
+        job.report(0, len(jobs), 'Splitting and scaling features...')
+        self.get_train_and_test_split()
+        self.get_scaled_features(self.selected_scaling)
+        job.check_cancelled()
+
+        runner = ModelRunner(jobs,
+                             {'x_train': self.x_train,
+                              'x_test': self.x_test,
+                              'y_train': self.y_train,
+                              'y_test': self.y_test,
+                              'x_train_std': self.x_train_std,
+                              'x_test_std': self.x_test_std})
+        failed = []
+        try:
+            runner.start()
+            jobs_done = 0
+            job.report(jobs_done, len(jobs),
+                       self.get_run_status(jobs_done, runner))
+
+            while not runner.is_done():
+                job.check_cancelled()
+                finished = runner.poll()
+                if not finished:
+                    time.sleep(MODEL_RUNNER_POLL_MS / 1000)
+                    continue
+
+                # results finished since last poll are written in one
+                # transaction
+                with BatchWriter() as batch:
+                    for model_job in finished:
+                        if model_job.error is not None:
+                            print('Algorithm %d failed: %s' %
+                                  (model_job.algorithm_id, model_job.error))
+                            failed.append(model_job)
+                            continue
+                        classifiers.save_clf_results(
+                            model_job.results,
+                            session_id=self.session_id,
+                            simple_set_id=self.simple_set_id,
+                            algorithm_id=model_job.algorithm_id,
+                            batch=batch,
+                            **model_job.params)
+                        classifiers.print_clf_results(model_job.results,
+                                                      model_job.algorithm_id)
+
+                jobs_done += len(finished)
+                job.report(jobs_done, len(jobs),
+                           self.get_run_status(jobs_done, runner))
+        finally:
+            if not runner.is_done():
+                runner.cancel()
+            else:
+                runner.close()
+        return failed
+
+    def get_run_status(self, jobs_done, runner):
+
+        return 'Running %d of %d classifiers (%d workers)...' % \
+            (jobs_done, len(runner.jobs), runner.workers)
+
+    def on_run_models_progress(self, done, total, message):
+
+        self.simple_set_status_label.configure(text=message)
+        if done > 0:
+            self.update_simple_set_tree()
+
+    def on_run_models_finished(self, failed=None):
+
+        self.set_running_state(False)
+        self.update_simple_set_tree()
+        if failed:
+            messagebox.showerror(
+                "Error", "\n".join('Algorithm %d (%s) failed: %s' %
+                                   (model_job.algorithm_id,
+                                    model_job.internal_name,
+                                    model_job.error)
+                                   for model_job in failed))
+
+    def on_run_models_error(self, e):
+
+        self.set_running_state(False)
+        self.update_simple_set_tree()
+        messagebox.showerror("Error", str(e))
+
+    def on_cancel_model_menu_clicked(self):
+
+        # the worker kills the pool at its next check
+        self.model_job.cancel()
+
+    def set_running_state(self, running):
+
+        if running:
+            self.run_simple_set_model_button.configure(state='disabled')
+            self.cancel_simple_set_model_button.configure(state='normal')
+            self.model_menu.entryconfigure("Run Model", state='disabled')
+            self.model_menu.entryconfigure("Cancel Run", state='normal')
+        else:
+            self.run_simple_set_model_button.configure(state='normal')
+            self.cancel_simple_set_model_button.configure(state='disabled')
+            self.model_menu.entryconfigure("Run Model", state='normal')
+            self.model_menu.entryconfigure("Cancel Run", state='disabled')
+            self.simple_set_status_label.configure(text='')
+
     def on_classifiers_overrides_menu_clicked(self):
 
         ClassifiersModelOverrides(self, callback=self.update_from_model_overrides_dialogs)
@@ -515,26 +653,11 @@ class Model(tk.Toplevel):
 
     def does_algorithm_need_scaling(self, algorithm_id):
 
-        qry = "SELECT NeedsScaling FROM ModelOverrideAlgorithms WHERE AlgorithmID=?"
-        parameters = (algorithm_id,)
-
-        cursor = exec_qry(qry, parameters)
-
-        for row in cursor:
-            if row[0] == 1:
-                return True
-            else:
-                return False
+        return metadata_cache.does_algorithm_need_scaling(algorithm_id)
 
     def get_algorithm_internal_name(self, algorithm_id):
 
-        qry = "SELECT AlgorithmInternalName FROM Algorithms WHERE AlgorithmID=?"
-        parameters = (algorithm_id,)
-
-        cursor = exec_qry(qry, parameters)
-
-        for row in cursor:
-            return row[0]
+        return metadata_cache.get_algorithm_internal_name(algorithm_id)
 
     def handle_simple_set_tree_double_click(self, event):
 
@@ -568,4 +691,5 @@ class Model(tk.Toplevel):
 
     def exit_window(self):
 
+        self.model_job.cancel()
         self.destroy()
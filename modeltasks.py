@@ -18,6 +18,8 @@
 """
 
 from toolbox import exec_qry, exec_insert_qry
+from database import BatchWriter, join_batch
+from metadatacache import metadata_cache
 from datetime import datetime
 
 
@@ -27,10 +29,7 @@ class ModelTask():
 
         pass
 
-    def update_model_override_algorithms(self):
-
-        qry_del = 'DELETE FROM ModelOverrideAlgorithms'
-        exec_qry(qry_del)
+    def update_model_override_algorithms(self, batch=None):
 
         qry_sel = 'SELECT * FROM ModelDefaultAlgorithms ORDER BY AlgorithmID'
         algorithms = exec_qry(qry_sel)
@@ -38,18 +37,20 @@ class ModelTask():
         for row in algorithms:
             lst.append(list([row[0], row[1], row[2], row[3], row[4]]))
 
-        for row in lst:
-            qry_ins = "INSERT INTO ModelOverrideAlgorithms (" \
-                "AlgorithmID, AlgorithmDesc, " \
-                "AlgorithmTypeID, NeedsScaling, IsSelected) " \
-                "VALUES (?, ?, ?, ?, ?)"
-            parameters = (row[0], row[1], row[2], row[3], row[4])
-            exec_insert_qry(qry_ins, parameters)
+        qry_del = 'DELETE FROM ModelOverrideAlgorithms'
+        qry_ins = "INSERT INTO ModelOverrideAlgorithms (" \
+            "AlgorithmID, AlgorithmDesc, " \
+            "AlgorithmTypeID, NeedsScaling, IsSelected) " \
+            "VALUES (?, ?, ?, ?, ?)"
 
-    def update_model_override_algorithm_params(self):
+        with join_batch(batch) as batch:
+            batch.add(qry_del)
+            for row in lst:
+                parameters = (row[0], row[1], row[2], row[3], row[4])
+                batch.add(qry_ins, parameters)
+            batch.on_commit(metadata_cache.invalidate, 'ModelOverrideAlgorithms')
 
-        qry_del = 'DELETE FROM ModelOverrideAlgorithmParams'
-        exec_qry(qry_del)
+    def update_model_override_algorithm_params(self, batch=None):
 
         qry_sel = 'SELECT * FROM ModelDefaultAlgorithmParams ORDER BY AlgorithmID'
         algorithms = exec_qry(qry_sel)
@@ -57,18 +58,19 @@ class ModelTask():
         for row in algorithms:
             lst.append(list([row[0], row[1], row[2], row[3], row[4], row[5], row[6], row[7]]))
 
-        for row in lst:
-            qry_ins = "INSERT INTO ModelOverrideAlgorithmParams (" \
-                "AlgorithmParamID, AlgorithmID, ParamName, " \
-                "ParamType, DefaultsTo, DependsOn, IsOptional, IsSelected) " \
-                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)"
-            parameters = (row[0], row[1], row[2], row[3], row[4], row[5], row[6], row[7])
-            exec_insert_qry(qry_ins, parameters)
+        qry_del = 'DELETE FROM ModelOverrideAlgorithmParams'
+        qry_ins = "INSERT INTO ModelOverrideAlgorithmParams (" \
+            "AlgorithmParamID, AlgorithmID, ParamName, " \
+            "ParamType, DefaultsTo, DependsOn, IsOptional, IsSelected) " \
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?)"
 
-    def update_model_overrides(self):
+        with join_batch(batch) as batch:
+            batch.add(qry_del)
+            for row in lst:
+                parameters = (row[0], row[1], row[2], row[3], row[4], row[5], row[6], row[7])
+                batch.add(qry_ins, parameters)
 
-        qry_del = 'DELETE FROM ModelOverrides'
-        exec_qry(qry_del)
+    def update_model_overrides(self, batch=None):
 
         qry_sel = 'SELECT * FROM ModelDefaults'
         defaults = exec_qry(qry_sel)
@@ -76,15 +78,28 @@ class ModelTask():
         for row in defaults:
             lst.append(list([row[0], row[1], row[2], row[3], row[4], row[5], row[6], row[7]]))
 
-        for row in lst:
-            qry_ins = "INSERT INTO ModelOverrides (" \
-                "ModelOverrideID, ModelOverrideName, " \
-                "ModelOverrideText1, ModelOverrideText2, " \
-                "ModelOverrideInt1, ModelOverrideInt2, " \
-                "ModelOverrideFloat1, ModelOverrideFloat2) " \
-                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)"
-            parameters = (row[0], row[1], row[2], row[3], row[4], row[5], row[6], row[7])
-            exec_insert_qry(qry_ins, parameters)
+        qry_del = 'DELETE FROM ModelOverrides'
+        qry_ins = "INSERT INTO ModelOverrides (" \
+            "ModelOverrideID, ModelOverrideName, " \
+            "ModelOverrideText1, ModelOverrideText2, " \
+            "ModelOverrideInt1, ModelOverrideInt2, " \
+            "ModelOverrideFloat1, ModelOverrideFloat2) " \
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?)"
+
+        with join_batch(batch) as batch:
+            batch.add(qry_del)
+            for row in lst:
+                parameters = (row[0], row[1], row[2], row[3], row[4], row[5], row[6], row[7])
+                batch.add(qry_ins, parameters)
+            batch.on_commit(metadata_cache.invalidate, 'ModelOverrides')
+
+    def update_all_model_overrides(self):
+
+        # reset algorithms, params and overrides in one transaction
+        with BatchWriter() as batch:
+            self.update_model_override_algorithms(batch=batch)
+            self.update_model_override_algorithm_params(batch=batch)
+            self.update_model_overrides(batch=batch)
 
     def get_selected_classifiers(self):
 
@@ -109,20 +124,14 @@ class ModelTask():
 
     def get_selected_train_test_splits(self):
 
-        qry = 'SELECT * FROM ModelOverrides WHERE ModelOverrideName=?'
-        parameters = ('train_and_test_split',)
-        cursor = exec_qry(qry, parameters)
-
-        for row in cursor:
+        row = metadata_cache.get_model_override('train_and_test_split')
+        if row is not None:
             return(row[4], row[5], row[6], row[7])
 
     def get_selected_scaling(self):
 
-        qry = 'SELECT * FROM ModelOverrides WHERE ModelOverrideName=?'
-        parameters = ('scaling',)
-        cursor = exec_qry(qry, parameters)
-
-        for row in cursor:
+        row = metadata_cache.get_model_override('scaling')
+        if row is not None:
             return row[4]
 
     def add_simple_set_entry(self,
@@ -135,7 +144,8 @@ class ModelTask():
                              skl_accuracy_score,
                              training_accuracy,
                              test_accuracy,
-                             overfitting):
+                             overfitting,
+                             batch=None):
 
         qry = "INSERT INTO SimpleSets (" \
             "SessionID, SimpleSetID, DateCreated, AlgorithmID, " \
@@ -148,6 +158,11 @@ class ModelTask():
                       misclassified_error, skl_accuracy_score,
                       training_accuracy, test_accuracy, overfitting)
 
+        # buffered rows get their ID when the batch is flushed
+        if batch is not None:
+            batch.add(qry, parameters)
+            return None
+
         return exec_insert_qry(qry, parameters)
 
     def get_next_available_simple_set_number(self):
@@ -0,0 +1,247 @@
+"""
+    Warchest: Data management and automation GUI for Machine Learning projects
+    Created September 2017
+    Copyright (C) Nelson R Gonzalez
+
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+import json
+import os
+import threading
+from collections import OrderedDict
+import numpy as np
+import pandas as pd
+from global_config import g
+
+
+class ColumnarSource():
+    """ Rows of a dataset cache entry (see load_datasets.DatasetCache)
+
+    Every column is memory mapped read only, so a window of rows only
+    touches the pages of the file holding it. Text columns are decoded
+    from their codes for the rows asked for only.
+    """
+
+    def __init__(self, entry_dir):
+
+        with open(os.path.join(entry_dir, 'meta.json'), 'r',
+                  encoding='utf-8') as f:
+            meta = json.load(f)
+        self.entry_dir = entry_dir
+        self.meta = meta
+        self.rows = meta['rows']
+        self.columns = pd.Index([column['name']
+                                 for column in meta['columns']])
+        self.dtypes = pd.Series([pd.api.types.pandas_dtype(column['dtype'])
+                                 for column in meta['columns']],
+                                index=self.columns, dtype=object)
+        self._values = {}
+        self._categories = {}
+        # opened now, an entry evicted later stays readable through them
+        for i in range(len(self.columns)):
+            self._get_values(i)
+
+    def _get_values(self, i):
+
+        values = self._values.get(i)
+        if values is None:
+            column = self.meta['columns'][i]
+            values = np.load(os.path.join(self.entry_dir, column['file']),
+                             mmap_mode='r', allow_pickle=False)
+            self._values[i] = values
+            if 'categories' in column:
+                with open(os.path.join(self.entry_dir,
+                                       column['categories']), 'r',
+                          encoding='utf-8') as f:
+                    # code -1 picks the trailing NaN
+                    self._categories[i] = np.array(json.load(f) + [np.nan],
+                                                   dtype=object)
+        return values
+
+    def read_column(self, i, start=0, stop=None):
+
+        values = np.asarray(self._get_values(i)[start:stop])
+        if i in self._categories:
+            values = self._categories[i][values]
+        else:
+            values = values.copy()
+        return pd.Series(values, name=self.columns[i]).astype(
+            self.dtypes.iloc[i], copy=False)
+
+    def read_rows(self, start, stop, columns=None):
+
+        if columns is None:
+            columns = range(len(self.columns))
+        data = {}
+        for i in columns:
+            data[i] = self.read_column(i, start, stop).to_numpy()
+        df = pd.DataFrame(data, index=pd.RangeIndex(start, start +
+                                                    len(data[columns[0]])
+                                                    if data else stop))
+        df.columns = self.columns[list(columns)]
+        return df
+
+
+class PagedFrame():
+    """ A read only, row paged stand-in for a DataFrame
+
+    Rows are read from the source page_rows at a time and the last
+    max_pages pages are kept, so showing a window of a very large table
+    uses memory for that window only. It answers what the table canvas
+    asks of a DataFrame: columns, dtypes, index, len() and iloc with
+    positional rows and columns.
+
+    Whole columns come from the source (frame[name], iloc[:, i]);
+    iter_chunks() streams the rows and materialize() reads everything
+    into a real DataFrame.
+    """
+
+    def __init__(self, source, page_rows=None, max_pages=None):
+
+        if page_rows is None:
+            page_rows = g.lazy_page_rows
+        if max_pages is None:
+            max_pages = g.lazy_max_pages
+        self.source = source
+        self.page_rows = page_rows
+        self.max_pages = max_pages
+        self.columns = source.columns
+        self.dtypes = source.dtypes
+        self.index = pd.RangeIndex(source.rows)
+        self.iloc = _PagedILoc(self)
+        self._pages = OrderedDict()
+        self._lock = threading.Lock()
+
+    @property
+    def shape(self):
+
+        return (len(self.index), len(self.columns))
+
+    def __len__(self):
+
+        return len(self.index)
+
+    def __getitem__(self, name):
+
+        return self.get_column(self.columns.get_loc(name))
+
+    def get_page(self, page):
+
+        with self._lock:
+            df = self._pages.get(page)
+            if df is not None:
+                self._pages.move_to_end(page)
+                return df
+
+        start = page * self.page_rows
+        df = self.source.read_rows(start, min(start + self.page_rows,
+                                              len(self.index)))
+        with self._lock:
+            self._pages[page] = df
+            while len(self._pages) > self.max_pages:
+                self._pages.popitem(last=False)
+        return df
+
+    def get_rows(self, rows, columns=None):
+        """ The rows at positions rows (any iterable), as a DataFrame """
+
+        if columns is None:
+            columns = slice(None)
+        rows = np.asarray(rows, dtype=np.intp)
+        if len(rows) == 0:
+            return self.source.read_rows(0, 0).iloc[:, columns]
+        pages = rows // self.page_rows
+        parts = []
+        # consecutive rows of the same page are taken together
+        bounds = np.flatnonzero(np.diff(pages)) + 1
+        for group in np.split(np.arange(len(rows)), bounds):
+            page = int(pages[group[0]])
+            offsets = rows[group] - page * self.page_rows
+            parts.append(self.get_page(page).iloc[offsets, columns])
+        if len(parts) == 1:
+            return parts[0]
+        return pd.concat(parts)
+
+    def get_column(self, i):
+
+        return self.source.read_column(i)
+
+    def iter_chunks(self, chunk_rows=None, columns=None):
+        """ Yield the rows chunk_rows at a time, without caching them """
+
+        if chunk_rows is None:
+            chunk_rows = self.page_rows
+        for start in range(0, len(self.index), chunk_rows):
+            yield self.source.read_rows(
+                start, min(start + chunk_rows, len(self.index)), columns)
+
+    def materialize(self, columns=None):
+        """ Every row as a DataFrame, read a whole column at a time """
+
+        if columns is None:
+            columns = range(len(self.columns))
+        columns = list(columns)
+        df = pd.DataFrame({i: self.source.read_column(i) for i in columns},
+                          index=self.index)
+        df.columns = self.columns[columns]
+        return df
+
+    def clear(self):
+
+        with self._lock:
+            self._pages.clear()
+
+
+class _PagedILoc():
+    """ frame.iloc[rows, cols] for a PagedFrame """
+
+    def __init__(self, frame):
+
+        self.frame = frame
+
+    def __getitem__(self, key):
+
+        if isinstance(key, tuple):
+            rows, cols = key
+        else:
+            rows, cols = key, slice(None)
+
+        frame = self.frame
+        n = len(frame.index)
+        if isinstance(rows, slice) and rows == slice(None):
+            # whole columns come from the source, past the page cache
+            if _is_integer(cols):
+                return frame.get_column(cols)
+            return frame.materialize(
+                list(np.arange(len(frame.columns))[cols]))
+
+        scalar_row = _is_integer(rows)
+        if scalar_row:
+            positions = [rows + n if rows < 0 else rows]
+        elif isinstance(rows, slice):
+            positions = range(*rows.indices(n))
+        else:
+            positions = list(rows)
+
+        data = frame.get_rows(positions, cols)
+        if scalar_row:
+            return data.iloc[0]
+        return data
+
+
+def _is_integer(value):
+
+    return isinstance(value, (int, np.integer)) and \
+        not isinstance(value, bool)
@@ -17,53 +17,173 @@
     along with this program.  If not, see <https://www.gnu.org/licenses/>.
 """
 
+import hashlib
+import pickle
+import warnings
+from collections import OrderedDict
 import numpy as np
 import matplotlib.pyplot as plt
-import warnings
 from matplotlib.colors import ListedColormap
+from global_config import g
+
+# decision surfaces by (model, data, grid) fingerprint
+_surfaces = OrderedDict()
 
 
 def versiontuple(v):
     return tuple(map(int, (v.split("."))))
 
 
-def plot_decision_regions(X, y, classifier, test_idx=None, resolution=0.02):
+def get_fingerprint(classifier, X, extent, shape):
+    """ A digest of the fitted classifier, the data and the grid, None if
+    the classifier cannot be pickled """
+
+    try:
+        model = pickle.dumps(classifier, protocol=4)
+    except Exception:
+        return None
+    digest = hashlib.blake2b(model, digest_size=16)
+    digest.update(np.ascontiguousarray(X).tobytes())
+    digest.update(repr((X.shape, str(X.dtype), extent, shape)).encode())
+    return digest.hexdigest()
+
+
+def predict_batched(classifier, points, batch_size=None):
+    """ classifier.predict on points batch_size rows at a time, so the
+    classifier's own work arrays stay small """
+
+    if batch_size is None:
+        batch_size = g.decision_batch_size
+    if len(points) <= batch_size:
+        return np.asarray(classifier.predict(points))
+    return np.concatenate([np.asarray(classifier.predict(
+        points[start:start + batch_size]))
+        for start in range(0, len(points), batch_size)])
+
+
+def get_grid_shape(ax, extent, resolution=None):
+    """ Grid nodes across and down for ax, one per g.decision_cell_pixels
+    pixels, fewer if resolution (a step in data units) asks for fewer """
+
+    box = ax.get_window_extent()
+    cell = max(g.decision_cell_pixels, 1)
+    nx = max(int(box.width // cell), 2)
+    ny = max(int(box.height // cell), 2)
+    if resolution:
+        nx = min(nx, max(int((extent[1] - extent[0]) / resolution), 2))
+        ny = min(ny, max(int((extent[3] - extent[2]) / resolution), 2))
+    return nx, ny
+
+
+def get_decision_surface(classifier, extent, shape, levels=None):
+    """ Predicted class of every node of a grid of shape (nx, ny) over
+    extent, a (ny, nx) array
+
+    The grid is predicted at 1/2**levels of its size first. Each level
+    then doubles it, predicting only the new nodes of cells whose
+    corners disagree and filling the others with their corners' class,
+    so most predictions are near the class boundaries.
+    """
+
+    if levels is None:
+        levels = g.decision_refine_levels
+    nx, ny = shape
+    x0, x1, y0, y1 = extent
+    step = 2 ** levels
+    # the coarse grid's nodes are nodes of the final grid
+    cx = max((nx - 1 + step - 1) // step, 1)
+    cy = max((ny - 1 + step - 1) // step, 1)
+    fx, fy = cx * step + 1, cy * step + 1
+    xs = np.linspace(x0, x1, fx)
+    ys = np.linspace(y0, y1, fy)
+
+    xx, yy = np.meshgrid(xs[::step], ys[::step])
+    Z = predict_batched(classifier, np.c_[xx.ravel(), yy.ravel()]).reshape(
+        xx.shape)
+    for level in range(levels, 0, -1):
+        half = 2 ** (level - 1)
+        rows, cols = Z.shape
+        fine = np.empty((2 * rows - 1, 2 * cols - 1), dtype=Z.dtype)
+        known = np.zeros(fine.shape, dtype=bool)
+        fine[::2, ::2] = Z
+        known[::2, ::2] = True
+        # cells whose four corners are not all the same class
+        mixed = (Z[:-1, :-1] != Z[1:, :-1]) | (Z[:-1, :-1] != Z[:-1, 1:]) | \
+            (Z[:-1, :-1] != Z[1:, 1:])
+        need = np.zeros(fine.shape, dtype=bool)
+        for a in range(3):
+            for b in range(3):
+                need[a:a + 2 * (rows - 1):2, b:b + 2 * (cols - 1):2] |= mixed
+        need &= ~known
+        r, c = np.nonzero(need)
+        if len(r):
+            gx = xs[::half][c]
+            gy = ys[::half][r]
+            fine[r, c] = predict_batched(classifier, np.c_[gx, gy])
+        # the others take the class of a corner of their uniform cells
+        r, c = np.nonzero(~known & ~need)
+        fine[r, c] = fine[r - r % 2, c - c % 2]
+        Z = fine
+    return xs, ys, Z
+
+
+def plot_decision_regions(X, y, classifier, test_idx=None, resolution=None,
+                          ax=None):
+
+    if ax is None:
+        ax = plt.gca()
 
     # setup marker generator and color map
     markers = ('s', 'x', 'o', '^', 'v')
     colors = ('red', 'blue', 'lightgreen', 'gray', 'cyan')
-    cmap = ListedColormap(colors[:len(np.unique(y))])
+    classes = np.unique(y)
+    cmap = ListedColormap(colors[:len(classes)])
 
-    # plot the decision surface
+    # plot the decision surface, on a grid sized to the axes in pixels
     x1_min, x1_max = X[:, 0].min() - 1, X[:, 0].max() + 1
     x2_min, x2_max = X[:, 1].min() - 1, X[:, 1].max() + 1
-    xx1, xx2 = np.meshgrid(np.arange(x1_min, x1_max, resolution),
-                           np.arange(x2_min, x2_max, resolution))
-    Z = classifier.predict(np.array([xx1.ravel(), xx2.ravel()]).T)
-    Z = Z.reshape(xx1.shape)
-    plt.contourf(xx1, xx2, Z, alpha=0.4, cmap=cmap)
-    plt.xlim(xx1.min(), xx1.max())
-    plt.ylim(xx2.min(), xx2.max())
+    extent = (float(x1_min), float(x1_max), float(x2_min), float(x2_max))
+    shape = get_grid_shape(ax, extent, resolution)
+    key = get_fingerprint(classifier, X, extent, shape)
+    surface = _surfaces.get(key) if key is not None else None
+    if surface is None:
+        surface = get_decision_surface(classifier, extent, shape)
+        # predicting may update the classifier's state (tree query
+        # counters), key it as the next call will find it
+        key = get_fingerprint(classifier, X, extent, shape)
+        if key is not None:
+            _surfaces[key] = surface
+            while len(_surfaces) > g.decision_cache_size:
+                _surfaces.popitem(last=False)
+    else:
+        _surfaces.move_to_end(key)
+    xs, ys, Z = surface
+    # classes as their position in y's classes, for the colormap
+    Z = np.searchsorted(classes, Z)
+    ax.contourf(xs, ys, Z, alpha=0.4, cmap=cmap)
+    ax.set_xlim(xs[0], xs[-1])
+    ax.set_ylim(ys[0], ys[-1])
 
     # plot class samples
-    for idx, cl in enumerate(np.unique(y)):
-        plt.scatter(x=X[y == cl, 0], y=X[y == cl, 1],
-                    alpha=0.8, c=cmap(idx),
-                    marker=markers[idx], label=cl)
+    for idx, cl in enumerate(classes):
+        ax.scatter(x=X[y == cl, 0], y=X[y == cl, 1],
+                   alpha=0.8, color=cmap(idx),
+                   marker=markers[idx], label=cl)
 
     # highlight test samples
-    if test_idx:
+    if test_idx is not None and len(test_idx) > 0:
         # plot all samples
         if not versiontuple(np.__version__) >= versiontuple('1.9.0'):
-            X_test, y_test = X[list(test_idx), :], y[list(test_idx)]
+            X_test = X[list(test_idx), :]
             warnings.warn('Please update to NumPy 1.9.0 or newer')
         else:
-            X_test, y_test = X[test_idx, :], y[test_idx]
-
-        plt.scatter(X_test[:, 0],
-                    X_test[:, 1],
-                    c='',
-                    alpha=1.0,
-                    linewidths=1,
-                    marker='o',
-                    s=55, label='test set')
+            X_test = X[test_idx, :]
+
+        ax.scatter(X_test[:, 0],
+                   X_test[:, 1],
+                   facecolors='none',
+                   edgecolors='black',
+                   alpha=1.0,
+                   linewidths=1,
+                   marker='o',
+                   s=55, label='test set')
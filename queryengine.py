@@ -0,0 +1,294 @@
+"""
+    Warchest: Data management and automation GUI for Machine Learning projects
+    Created September 2017
+    Copyright (C) Nelson R Gonzalez
+
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+import ast
+import threading
+from collections import OrderedDict
+import numpy as np
+import pandas as pd
+from global_config import g
+
+
+def positions_to_mask(positions, rows):
+
+    mask = np.zeros(rows, dtype=bool)
+    mask[positions] = True
+    return mask
+
+
+class SortedIndex():
+    """ The non missing values of a numeric column in sorted order, so a
+    range filter is two binary searches """
+
+    def __init__(self, values):
+
+        values = np.asarray(values)
+        if values.dtype.kind == 'f':
+            order = np.flatnonzero(~np.isnan(values))
+            order = order[np.argsort(values[order], kind='stable')]
+        else:
+            order = np.argsort(values, kind='stable')
+        self.order = order
+        self.values = values[order]
+
+    def greater(self, value):
+
+        return self.order[np.searchsorted(self.values, value, 'right'):]
+
+    def less(self, value):
+
+        return self.order[:np.searchsorted(self.values, value, 'left')]
+
+
+class HashIndex():
+    """ The rows of each distinct value of a column, so an equality filter
+    is a lookup; category columns use their own codes """
+
+    def __init__(self, col_values):
+
+        if isinstance(col_values.dtype, pd.CategoricalDtype):
+            codes = np.asarray(col_values.cat.codes)
+            uniques = col_values.cat.categories
+        else:
+            codes, uniques = pd.factorize(col_values)
+        self.uniques = pd.Index(uniques)
+        # missing values have code -1 and go in the first bucket
+        counts = np.bincount(codes + 1, minlength=len(uniques) + 1)
+        self.starts = np.concatenate([[0], np.cumsum(counts)])
+        self.order = np.argsort(codes, kind='stable')
+
+    def equals(self, value):
+
+        try:
+            code = self.uniques.get_indexer([value])[0]
+        except (TypeError, ValueError):
+            return np.empty(0, dtype=np.intp)
+        if code < 0:
+            return np.empty(0, dtype=np.intp)
+        return self.order[self.starts[code + 1]:self.starts[code + 2]]
+
+
+class QueryEngine():
+    """ Row filtering for the query bar
+
+    Expression and filter masks are kept, least recently used going
+    first past max_masks, keyed on the data versions of the columns they
+    read, so running a query again after changing one filter only
+    evaluates that filter. Columns of at least index_min_rows rows get
+    a sorted index for > and < on numbers, used when few rows match or
+    the table is lazy, and a hash index for equals on text and
+    categories, built on first use and kept for the column version.
+    Results are row positions.
+    """
+
+    def __init__(self, index_min_rows=None, max_masks=None):
+
+        if index_min_rows is None:
+            index_min_rows = g.query_index_min_rows
+        if max_masks is None:
+            max_masks = g.query_cache_masks
+        self.index_min_rows = index_min_rows
+        self.max_masks = max_masks
+        self._names = {}
+        self._masks = OrderedDict()
+        self._indexes = {}
+        self._lock = threading.Lock()
+
+    def query(self, model, expr='', filters=()):
+        """ Positions of the rows matching expr and filters, a list of
+        (column, value, operator, boolean operator), or None if there is
+        neither """
+
+        mask = None
+        if expr != '':
+            mask = self.eval_expr(model, expr)
+        if len(filters) > 0:
+            if mask is None:
+                mask = np.ones(len(model.frame.index), dtype=bool)
+            for col, val, op, b in filters:
+                try:
+                    val = float(val)
+                except (TypeError, ValueError):
+                    pass
+                m = self.predicate(model, col, op, val)
+                if m is None:
+                    continue
+                if b == 'AND':
+                    mask = mask & m
+                elif b == 'OR':
+                    mask = mask | m
+                elif b == 'NOT':
+                    mask = mask ^ m
+        if mask is None:
+            return None
+        return np.flatnonzero(mask)
+
+    def get_names(self, expr, columns):
+        """ Columns read by expr, None if it cannot be told """
+
+        with self._lock:
+            names = self._names.get(expr, False)
+        if names is False:
+            try:
+                tree = ast.parse(expr.strip(), mode='eval')
+                names = set(node.id for node in ast.walk(tree)
+                            if isinstance(node, ast.Name))
+            except SyntaxError:
+                # backquoted names, @ variables
+                names = None
+            with self._lock:
+                self._names[expr] = names
+        if names is None or not set(names) <= set(columns):
+            return None
+        return sorted(names, key=list(columns).index)
+
+    def eval_expr(self, model, expr):
+
+        frame = model.frame
+        names = self.get_names(expr, frame.columns)
+        if names is None:
+            key = ('expr', expr, model.data_version)
+        else:
+            key = ('expr', expr) + tuple((name, model.getColumnVersion(name))
+                                         for name in names)
+        mask = self._get_mask(key)
+        if mask is None:
+            if names is None:
+                df = model.df
+            elif hasattr(frame, 'get_page'):
+                # a lazy table reads the columns used only
+                df = frame.materialize([frame.columns.get_loc(name)
+                                        for name in names])
+            else:
+                df = frame
+            mask = np.asarray(df.eval(expr), dtype=bool)
+            self._put_mask(key, mask)
+        return mask
+
+    def predicate(self, model, col, op, val):
+        """ Mask of the rows of column col passing the filter, None for
+        an unknown operator """
+
+        frame = model.frame
+        if col not in frame.columns:
+            return None
+        version = model.getColumnVersion(col)
+        key = ('filter', col, op, val, version)
+        mask = self._get_mask(key)
+        if mask is not None:
+            return mask
+
+        rows = len(frame.index)
+        kind = getattr(frame.dtypes[col], 'kind', 'O')
+        indexed = rows >= self.index_min_rows
+        found = None
+        # numbers compare fast enough, text is worth hashing
+        if op in ('equals', 'not equals') and indexed and \
+                kind not in 'iufb':
+            found = self._get_index(frame, col, version,
+                                    'hash').equals(val)
+        elif op in ('>', '<') and indexed and isinstance(val, float) and \
+                kind in 'iuf':
+            index = self._get_index(frame, col, version, 'sorted')
+            found = index.greater(val) if op == '>' else index.less(val)
+            # setting many scattered rows is slower than comparing a column
+            # in memory, a lazy table would read the column again
+            if len(found) * g.query_index_max_ratio > rows and \
+                    not hasattr(frame, 'get_page'):
+                found = None
+        if found is not None:
+            mask = positions_to_mask(found, rows)
+            if op == 'not equals':
+                mask = ~mask
+        else:
+            m = self.compare(frame[col], op, val)
+            if m is None:
+                return None
+            mask = np.asarray(m, dtype=bool)
+        self._put_mask(key, mask)
+        return mask
+
+    def compare(self, col_values, op, val):
+
+        s = col_values.astype('object').str if op in (
+            'is number', 'is lowercase', 'is uppercase') else None
+        if op == 'contains':
+            m = col_values.str.contains(val, na=False)
+        elif op == 'excludes':
+            m = ~col_values.str.contains(val, na=False)
+        elif op == 'equals':
+            m = col_values == val
+        elif op == 'not equals':
+            m = col_values != val
+        elif op == '>':
+            m = col_values > val
+        elif op == '<':
+            m = col_values < val
+        elif op == 'starts with':
+            m = col_values.str.startswith(val, na=False)
+        elif op == 'ends with':
+            m = col_values.str.endswith(val, na=False)
+        elif op == 'has length':
+            m = col_values.str.len() > val
+        elif op == 'is number':
+            m = s.isnumeric()
+        elif op == 'is lowercase':
+            m = s.islower()
+        elif op == 'is uppercase':
+            m = s.isupper()
+        else:
+            return None
+        return m.fillna(False)
+
+    def _get_index(self, frame, col, version, kind):
+
+        with self._lock:
+            cached = self._indexes.get((col, kind))
+        if cached is not None and cached[0] == version:
+            return cached[1]
+        col_values = frame[col]
+        if kind == 'hash':
+            index = HashIndex(col_values)
+        else:
+            index = SortedIndex(col_values.to_numpy())
+        with self._lock:
+            self._indexes[(col, kind)] = (version, index)
+        return index
+
+    def _get_mask(self, key):
+
+        with self._lock:
+            mask = self._masks.get(key)
+            if mask is not None:
+                self._masks.move_to_end(key)
+        return mask
+
+    def _put_mask(self, key, mask):
+
+        with self._lock:
+            self._masks[key] = mask
+            while len(self._masks) > self.max_masks:
+                self._masks.popitem(last=False)
+
+    def clear(self):
+
+        with self._lock:
+            self._names.clear()
+            self._masks.clear()
+            self._indexes.clear()
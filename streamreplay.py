@@ -0,0 +1,179 @@
+"""
+    Warchest: Data management and automation GUI for Machine Learning projects
+    Created September 2017
+    Copyright (C) Nelson R Gonzalez
+
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+import os
+import numpy as np
+import pandas as pd
+from transformations import TransformationPipeline
+from global_config import g
+
+
+class CSVReplay():
+    """ Replay a transformation plan over a CSV file too large for memory
+
+    The file is read chunk_rows rows at a time and only one chunk is held
+    at once. A first pass finds the dtype of every column over the whole
+    file, so all chunks are read the same way, and the values each
+    categorical conversion sees, so its codes are the ones the whole
+    file would get. The last pass transforms every chunk and appends it
+    to the output file.
+
+    Categories given to the constructor (as returned by run()) are used
+    as they are, so files replayed with the same dictionary share codes,
+    values not in it getting -1.
+    """
+
+    def __init__(self, lst, chunk_rows=None, categories=None):
+
+        if chunk_rows is None:
+            chunk_rows = g.load_chunk_rows
+        if isinstance(lst, TransformationPipeline):
+            self.pipeline = lst
+        else:
+            self.pipeline = TransformationPipeline(
+                [trans for trans in lst if trans.get('IsReplicate') == 'Yes'])
+        self.chunk_rows = chunk_rows
+        self.categories = dict(categories) if categories else {}
+
+    def run(self, input_file, output_file, on_progress=None,
+            check_cancelled=None):
+        """ Write the transformed input_file to output_file
+
+        on_progress(done, total) is called after every chunk of either
+        pass, check_cancelled() before reading the next one. Returns the
+        categories used, by categorical step.
+        """
+
+        size = os.path.getsize(input_file)
+        passes = [0, 2]  # done, total
+
+        def pass_progress(done, total):
+            if on_progress is not None:
+                on_progress(passes[0] * size + done, passes[1] * size)
+
+        dtypes, found, changed = self.scan(input_file, pass_progress,
+                                           check_cancelled)
+        passes[0] += 1
+        if found and changed:
+            # a column only turned out to be text in a later chunk, the
+            # values seen before must be read again as text
+            passes[1] += 1
+            dtypes, found, changed = self.scan(input_file, pass_progress,
+                                               check_cancelled, dtypes)
+            passes[0] += 1
+
+        categories = dict(self.categories)
+        for position, values in found.items():
+            categories.setdefault(position, sort_categories(values))
+
+        header = True
+        with open(output_file, 'w', newline='') as out:
+            for chunk in self.read_chunks(input_file, pass_progress,
+                                          check_cancelled, dtypes):
+                self.pipeline.transform(chunk, categories=categories)
+                chunk.to_csv(out, header=header, index=False)
+                header = False
+        return categories
+
+    def scan(self, input_file, on_progress=None, check_cancelled=None,
+             dtypes=None):
+        """ Read the whole file once, collecting each categorical step's
+        values and, unless dtypes is given, the common dtype per column
+
+        Returns dtypes, the values per step and whether a column was
+        read with a dtype other than its final one.
+        """
+
+        written = {}  # categorical step position -> column it writes
+        for position, step in enumerate(self.pipeline.steps):
+            if step[0] == 'categorical':
+                written[position] = step[2]
+
+        found = {}
+
+        def collect(position, values):
+            if any(name == values.name for earlier, name in written.items()
+                   if earlier < position):
+                raise ValueError(
+                    'Column (%s) holds the codes of an earlier categorical '
+                    'conversion and cannot be converted chunk by chunk.'
+                    % values.name)
+            if position in self.categories:
+                return
+            uniques = pd.unique(values.dropna())
+            if position in found:
+                uniques = pd.unique(np.concatenate([found[position],
+                                                    uniques]))
+            found[position] = uniques
+
+        fixed = dtypes is not None
+        seen = []
+        for chunk in self.read_chunks(input_file, on_progress,
+                                      check_cancelled, dtypes):
+            if not fixed:
+                seen.append(dict(chunk.dtypes.items()))
+                dtypes = common_dtypes(dtypes, chunk.dtypes)
+            if written:
+                self.pipeline.transform(chunk, collect=collect)
+
+        changed = any(dtypes[name] == object and dtype != object
+                      for chunk_dtypes in seen
+                      for name, dtype in chunk_dtypes.items())
+        return dtypes, found, changed
+
+    def read_chunks(self, input_file, on_progress=None, check_cancelled=None,
+                    dtypes=None):
+
+        total = os.path.getsize(input_file)
+        with open(input_file, 'rb') as f:
+            for chunk in pd.read_csv(f, chunksize=self.chunk_rows,
+                                     dtype=dtypes):
+                if check_cancelled is not None:
+                    check_cancelled()
+                yield chunk
+                if on_progress is not None:
+                    on_progress(f.tell(), total)
+
+
+def common_dtypes(dtypes, chunk_dtypes):
+    """ Per column dtype able to hold the values of every chunk so far """
+
+    if dtypes is None:
+        return dict(chunk_dtypes.items())
+    for name, dtype in chunk_dtypes.items():
+        current = dtypes.get(name, dtype)
+        if current == dtype:
+            continue
+        if (isinstance(current, np.dtype) and isinstance(dtype, np.dtype) and
+                current.kind in 'iuf' and dtype.kind in 'iuf'):
+            # an int column with missing values in some chunks only
+            dtypes[name] = np.result_type(current, dtype)
+        else:
+            dtypes[name] = np.dtype(object)
+    return dtypes
+
+
+def sort_categories(values):
+    """ Categories in the order pd.Categorical gives them """
+
+    try:
+        return np.sort(values)
+    except TypeError:
+        # mixed types cannot be ordered, first seen first
+        return values
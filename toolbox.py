@@ -18,7 +18,8 @@
 """
 
 import sys
-import sqlite3
+import numpy as np
+from database import get_connection_manager
 from sklearn.preprocessing import MinMaxScaler
 from sklearn.preprocessing import StandardScaler
 
@@ -50,24 +51,12 @@ def scale(X_train, X_test, scaling="std"):
 
 def exec_qry(qry, parameters=()):
 
-    db_filename = 'warchest.db'
-
-    with sqlite3.connect(db_filename) as conn:
-        cursor = conn.cursor()
-        qry_result = cursor.execute(qry, parameters)
-        conn.commit()
-    return qry_result
+    return get_connection_manager().execute(qry, parameters)
 
 
 def exec_insert_qry(qry, parameters=()):
 
-    db_filename = 'warchest.db'
-
-    with sqlite3.connect(db_filename) as conn:
-        cursor = conn.cursor()
-        cursor.execute(qry, parameters)
-        conn.commit()
-    return cursor.lastrowid
+    return get_connection_manager().execute_insert(qry, parameters)
 
 
 def write_to_console(obj):
@@ -124,18 +113,14 @@ def check_platform():
 
 def is_float_series_integer(series):
 
-    for i, row in series.iteritems():
-        if series[i].is_integer() is False:
-            return False
-    return True
+    # NaN and inf are not integers, as with float.is_integer()
+    with np.errstate(invalid='ignore'):
+        return bool(np.all(np.mod(np.asarray(series), 1) == 0))
 
 
 def is_integer_series_natural(series):
 
-    for i, row in series.iteritems():
-        if (series[i] >= 0) is False:
-            return False
-    return True
+    return bool(np.all(np.asarray(series) >= 0))
 
 
 def sorted_by_second_item(obj):
@@ -148,8 +133,10 @@ def sorted_by_second_item(obj):
 
 def is_castable(series, type_to_cast):
 
-    min_value = series.min()
-    max_value = series.max()
+    return is_range_castable(series.min(), series.max(), type_to_cast)
+
+
+def is_range_castable(min_value, max_value, type_to_cast):
 
     #if np.dtype(series) == "float16":
     if type_to_cast == "int8":  # Byte (-128 to 127)
@@ -18,6 +18,7 @@
 """
 
 from toolbox import exec_qry, exec_insert_qry, is_even
+from metadatacache import metadata_cache
 import tkinter as tk
 from tkinter import ttk
 from tkinter import messagebox
@@ -144,6 +145,7 @@ class ClassifiersCRUD(tk.Toplevel):
             qry = 'UPDATE Algorithms SET IsActive=? WHERE AlgorithmID=?'
             parameters = ("Yes", algorithm_id)
             exec_qry(qry, parameters)
+        metadata_cache.invalidate('Algorithms')
 
         self.view_classifiers()
         items = self.classifier_tree.get_children()
@@ -853,6 +855,7 @@ class ClassifiersCRUD(tk.Toplevel):
                       "Yes",
                       self.algorithm_id)
         exec_qry(qry, parameters)
+        metadata_cache.invalidate('Algorithms')
         self.view_classifiers()
         self.exit_crud_window()
 
@@ -910,6 +913,7 @@ class ClassifiersCRUD(tk.Toplevel):
                       needs_scaling,
                       "Yes")
         self.algorithm_id = exec_insert_qry(qry, parameters)
+        metadata_cache.invalidate('Algorithms')
         self.view_classifiers()
         self.exit_crud_window()
 
@@ -958,6 +962,7 @@ class ClassifiersCRUD(tk.Toplevel):
             qry = 'DELETE FROM AlgorithmParams WHERE AlgorithmID=?'
             parameters = (algorithm_id,)
             exec_qry(qry, parameters)
+            metadata_cache.invalidate('Algorithms')
 
             self.view_classifiers()
 
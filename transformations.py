@@ -19,7 +19,9 @@
 
 from toolbox import exec_qry, exec_insert_qry
 from datetime import datetime
+import numpy as np
 import pandas as pd
+from database import join_batch
 from modeloptions import ModelOption
 
 
@@ -70,11 +72,41 @@ class Transformation():
         parameters = (session,)
         exec_qry(qry, parameters)
 
+    def get_transformations_by_id(self, ids):
+        """ The TransformationsLog rows of ids, every column, for
+        restore_transformations """
+
+        qry = 'SELECT TransformationLogID, SessionID, ColumnIndex, ' \
+            'ColumnName, TransformationID, DateCreated, ' \
+            'TransformationLogDesc, IsReplicate, Option1, Option2, ' \
+            'Option3 FROM TransformationsLog WHERE TransformationLogID ' \
+            'IN (' + ', '.join('?' * len(ids)) + ')'
+        cursor = exec_qry(qry, tuple(ids))
+        return cursor.fetchall()
+
+    def delete_transformations_by_id(self, ids):
+
+        qry = 'DELETE FROM TransformationsLog WHERE TransformationLogID ' \
+            'IN (' + ', '.join('?' * len(ids)) + ')'
+        exec_qry(qry, tuple(ids))
+
+    def restore_transformations(self, rows):
+        """ Insert rows of get_transformations_by_id again, with their
+        original IDs """
+
+        qry = 'INSERT INTO TransformationsLog (TransformationLogID, ' \
+            'SessionID, ColumnIndex, ColumnName, TransformationID, ' \
+            'DateCreated, TransformationLogDesc, IsReplicate, Option1, ' \
+            'Option2, Option3) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)'
+        for row in rows:
+            exec_qry(qry, tuple(row))
+
     def add_transformation(self,
                            session,
                            index,
                            name,
                            transformation,
+                           batch=None,
                            **kwargs):
 
         transformation_id = self._get_transformation_id(transformation)
@@ -127,6 +159,11 @@ class Transformation():
                                    datetime.now(), desc, 'Yes',
                                    trx_type, new_col_flag, old_col)
 
+        # buffered rows get their ID when the batch is flushed
+        if batch is not None:
+            batch.add(self.qry_ins, self.parameters)
+            return None
+
         return exec_insert_qry(self.qry_ins, self.parameters)
 
     def toggle_selected(self, flag, trans_id):
@@ -152,61 +189,176 @@ class Transformation():
 
     def replicate(self, lst, df):
 
-        print(lst)
-        for trans in lst:
+        TransformationPipeline(lst).apply(df)
 
-            index = trans.get('ColumnIndex')
-            name = trans.get('ColumnName')
-            transformation = trans.get('TransformationDesc')
-
-            if transformation == 'setColumnType':
-                dtype = trans.get('Option1')
-                col = df.columns[index]
-                df[col] = df[col].astype(dtype)
-
-            if transformation == 'createCategorical':
-                option1 = trans.get('Option1')
-                option2 = trans.get('Option2')
-                if option1 == 'convert':
-                    col = df.columns[index]
-                    df[name] = pd.Categorical(df[col]).codes
-                    if option2 == 'new_col':
-                        self.add_col_to_model_columns(1)
-
-    def update_model_option_available_to_model(self, var):
+    def update_model_option_available_to_model(self, var, batch=None):
 
         modelopt = ModelOption()
-        modelopt.update_model_option('available_to_model_dict', var)
+        modelopt.update_model_option('available_to_model_dict', var, batch)
 
-    def update_model_option_class_label_status(self, var):
+    def update_model_option_class_label_status(self, var, batch=None):
 
         modelopt = ModelOption()
-        modelopt.update_model_option('class_label_status_dict', var)
+        modelopt.update_model_option('class_label_status_dict', var, batch)
 
-    def update_model_option_nominal_ordinal(self, var):
+    def update_model_option_nominal_ordinal(self, var, batch=None):
 
         modelopt = ModelOption()
-        modelopt.update_model_option('nominal_ordinal_dict', var)
+        modelopt.update_model_option('nominal_ordinal_dict', var, batch)
 
     def get_model_option_x(self, option):
 
         modelopt = ModelOption()
         return {int(k): v for k, v in modelopt.get_model_option(option).items()}
 
-    def add_col_to_model_columns(self, number_of_cols):
+    def add_col_to_model_columns(self, number_of_cols, batch=None):
 
-        for i in range(number_of_cols):
+        if number_of_cols <= 0:
+            return
 
-            self.available_to_model = self. \
-                get_model_option_x('available_to_model_dict')
-            self.class_label_status = self. \
-                get_model_option_x('class_label_status_dict')
-            self.nominal_ordinal = self.get_model_option_x('nominal_ordinal_dict')
+        # read once, add every column, write the three options together
+        self.available_to_model = self. \
+            get_model_option_x('available_to_model_dict')
+        self.class_label_status = self. \
+            get_model_option_x('class_label_status_dict')
+        self.nominal_ordinal = self.get_model_option_x('nominal_ordinal_dict')
 
+        for i in range(number_of_cols):
             self.available_to_model[max(list(self.available_to_model)) + 1] = 'No'
             self.class_label_status[max(list(self.class_label_status)) + 1] = 'No'
             self.nominal_ordinal[max(list(self.nominal_ordinal)) + 1] = 'nominal'
 
-            self.update_model_option_available_to_model(self.available_to_model)
-            self.update_model_option_class_label_status(self.class_label_status)
-            self.update_model_option_nominal_ordinal(self.nominal_ordinal)
+        with join_batch(batch) as batch:
+            self.update_model_option_available_to_model(
+                self.available_to_model, batch)
+            self.update_model_option_class_label_status(
+                self.class_label_status, batch)
+            self.update_model_option_nominal_ordinal(self.nominal_ordinal,
+                                                     batch)
+
+
+class TransformationPipeline():
+    """ A list of TransformationsLog rows compiled into a plan
+
+    The plan is compiled once and can be applied to any number of
+    DataFrames. Casts between two categorical conversions commute, so
+    they are grouped per column and each column's casts are fused when
+    applied: a cast to the dtype the column already has is dropped, and
+    so is a widening cast of the same kind (int8 to int32, float32 to
+    float64) followed by another numeric cast, since it cannot change
+    the number that cast gets. A text or category cast shows the widened
+    value (float32 0.1 as '0.10000000149011612'), so it keeps it.
+    Every column is then cast once per remaining dtype and assigned back
+    in place, and the model columns added by the conversions are
+    registered in a single metadata write.
+
+    Steps are ('cast', index, [dtype, ...]) and
+    ('categorical', index, name, new_col).
+    """
+
+    def __init__(self, lst):
+
+        self.steps = self.compile(lst)
+        self.new_columns = sum(1 for step in self.steps
+                               if step[0] == 'categorical' and step[3])
+
+    def compile(self, lst):
+
+        steps = []
+        casts = {}  # column index -> dtypes, since the last conversion
+
+        def close_casts():
+            for index, dtypes in casts.items():
+                steps.append(('cast', index, dtypes))
+            casts.clear()
+
+        for trans in lst:
+
+            index = trans.get('ColumnIndex')
+            transformation = trans.get('TransformationDesc')
+
+            if transformation == 'setColumnType':
+                casts.setdefault(index, []).append(trans.get('Option1'))
+
+            if transformation == 'createCategorical':
+                if trans.get('Option1') == 'convert':
+                    close_casts()
+                    steps.append(('categorical', index,
+                                  trans.get('ColumnName'),
+                                  trans.get('Option2') == 'new_col'))
+
+        close_casts()
+        return steps
+
+    def apply(self, df, batch=None):
+        """ Run the plan on df, in place, and return it """
+
+        self.transform(df)
+        if self.new_columns:
+            Transformation().add_col_to_model_columns(self.new_columns,
+                                                      batch)
+        return df
+
+    def transform(self, df, categories=None, collect=None):
+        """ Run the plan's steps on df, in place, and return it
+
+        categories maps a categorical step's position in self.steps to
+        the categories its codes are taken from, instead of the values
+        found in df. collect(position, values) is called with the source
+        column of every categorical step before it is converted.
+        """
+
+        for position, step in enumerate(self.steps):
+
+            col = df.columns[step[1]]
+
+            if step[0] == 'cast':
+                values = df[col]
+                dtypes = fuse_casts(values.dtype, step[2])
+                for dtype in dtypes:
+                    values = values.astype(dtype)
+                if dtypes:
+                    df[col] = values
+
+            if step[0] == 'categorical':
+                values = df[col]
+                if collect is not None:
+                    collect(position, values)
+                if categories is not None and position in categories:
+                    codes = pd.Categorical(
+                        values, categories=categories[position]).codes
+                else:
+                    codes = pd.Categorical(values).codes
+                df[step[2]] = codes
+
+        return df
+
+
+def fuse_casts(dtype, dtypes):
+    """ The casts of dtypes, in order, that can change a column of dtype """
+
+    chain = []  # (from dtype, to dtype)
+    current = dtype
+    for to_dtype in dtypes:
+        to_dtype = pd.api.types.pandas_dtype(to_dtype)
+        if to_dtype == current:
+            continue
+        # the previous cast only widened, this numeric one overrides it
+        if chain and is_widening(*chain[-1]) and \
+                isinstance(to_dtype, np.dtype) and to_dtype.kind in 'iuf':
+            current = chain.pop()[0]
+            if to_dtype == current:
+                continue
+        chain.append((current, to_dtype))
+        current = to_dtype
+    return [to_dtype for from_dtype, to_dtype in chain]
+
+
+def is_widening(from_dtype, to_dtype):
+    """ Whether every value of from_dtype is kept exactly by to_dtype """
+
+    return (isinstance(from_dtype, np.dtype) and
+            isinstance(to_dtype, np.dtype) and
+            from_dtype.kind == to_dtype.kind and
+            from_dtype.kind in 'iuf' and
+            np.can_cast(from_dtype, to_dtype, 'safe'))
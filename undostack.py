@@ -0,0 +1,250 @@
+"""
+    Warchest: Data management and automation GUI for Machine Learning projects
+    Created September 2017
+    Copyright (C) Nelson R Gonzalez
+
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+from collections import deque
+import pandas as pd
+from global_config import g
+
+
+def _nbytes(obj):
+
+    return int(obj.memory_usage(index=False).sum()) \
+        if isinstance(obj, pd.DataFrame) else \
+        int(obj.memory_usage(index=False))
+
+
+class FrameDelta():
+    """ The whole table as it was
+
+    shared keeps a shallow copy, the column buffers of the table, for
+    changes that build a new table and leave the old buffers alone
+    (concat, drop); otherwise the table is copied.
+    """
+
+    def __init__(self, df, shared=False):
+
+        self.df = df.copy(deep=not shared)
+        self.nbytes = _nbytes(self.df)
+
+    def apply(self, df):
+        """ Put the table back, returns the new table, the delta undoing
+        this and the changed columns (None for all of them) """
+
+        inverse = FrameDelta.__new__(FrameDelta)
+        # the replaced table leaves the model, nothing else writes to it
+        inverse.df = df
+        inverse.nbytes = _nbytes(df)
+        return self.df, inverse, None
+
+
+class ColumnsDelta():
+    """ Columns of the table as they were: the column order and copies of
+    the columns a change replaces or drops
+
+    Columns added by the change are not in the order and are dropped on
+    apply; columns not saved are shared with the table.
+    """
+
+    def __init__(self, df, names):
+
+        self.columns = list(df.columns)
+        self.saved = {name: df[name].copy() for name in names
+                      if name in df.columns}
+        self.nbytes = sum(_nbytes(col) for col in self.saved.values())
+
+    def apply(self, df):
+
+        old = set(self.columns)
+        added = [name for name in df.columns if name not in old]
+        inverse = ColumnsDelta.__new__(ColumnsDelta)
+        inverse.columns = list(df.columns)
+        # dropped columns leave the table, only the replaced ones are copied
+        inverse.saved = {name: df[name] for name in added}
+        for name in self.saved:
+            if name in df.columns:
+                inverse.saved[name] = df[name].copy()
+        inverse.nbytes = sum(_nbytes(col) for col in inverse.saved.values())
+
+        if added:
+            df.drop(added, axis=1, inplace=True)
+        for name, col in self.saved.items():
+            df[name] = col
+        if list(df.columns) != self.columns:
+            df = df[self.columns]
+            return df, inverse, None
+        return df, inverse, list(set(added) | set(self.saved))
+
+
+class CellsDelta():
+    """ Cells of the table as they were, at row and column positions, with
+    the dtypes of their columns """
+
+    def __init__(self, df, rows, cols):
+
+        rows = sorted(set(int(row) for row in rows))
+        if rows and rows[-1] - rows[0] == len(rows) - 1:
+            rows = slice(rows[0], rows[-1] + 1)
+        self.rows = rows
+        self.cols = sorted(set(int(col) for col in cols))
+        self.values = [df.iloc[rows, col].copy() for col in self.cols]
+        self.dtypes = [df.dtypes.iloc[col] for col in self.cols]
+        self.nbytes = sum(_nbytes(col) for col in self.values)
+
+    def apply(self, df):
+
+        inverse = CellsDelta.__new__(CellsDelta)
+        inverse.rows = self.rows
+        inverse.cols = self.cols
+        inverse.values = [df.iloc[self.rows, col].copy() for col in self.cols]
+        inverse.dtypes = [df.dtypes.iloc[col] for col in self.cols]
+        inverse.nbytes = self.nbytes
+
+        names = []
+        for col, values, dtype in zip(self.cols, self.values, self.dtypes):
+            name = df.columns[col]
+            df.iloc[self.rows, col] = values.to_numpy()
+            if df.dtypes.iloc[col] != dtype:
+                # clearing cells turns an int column to float, say
+                df[name] = df[name].astype(dtype)
+            names.append(name)
+        return df, inverse, names
+
+
+class UndoStack():
+    """ Multi level undo and redo of the changes to a table
+
+    A change is recorded before it is made, as the least that puts the
+    table back: a shared or copied frame, the columns it replaces or
+    drops (record_columns), or the cells it overwrites (record_cells).
+    Undoing a change records its inverse for redo.
+
+    Changes past levels, or past budget bytes over both stacks, are
+    forgotten oldest first. Transformations logged by a change
+    (add_log) are taken out of the TransformationsLog when it is undone
+    and put back when it is redone.
+    """
+
+    def __init__(self, budget=None, levels=None, log=None):
+
+        if budget is None:
+            budget = g.undo_budget
+        if levels is None:
+            levels = g.undo_levels
+        self.budget = budget
+        self.levels = levels
+        self.log = log
+        # entries are [delta, log ids, log rows]
+        self.undos = deque()
+        self.redos = deque()
+
+    @property
+    def nbytes(self):
+
+        return sum(entry[0].nbytes for entry in self.undos) + \
+            sum(entry[0].nbytes for entry in self.redos)
+
+    def can_undo(self):
+
+        return len(self.undos) > 0
+
+    def can_redo(self):
+
+        return len(self.redos) > 0
+
+    def record_frame(self, df, shared=False):
+
+        self._push(FrameDelta(df, shared))
+
+    def record_columns(self, df, names):
+
+        if not df.columns.is_unique:
+            self._push(FrameDelta(df))
+            return
+        self._push(ColumnsDelta(df, names))
+
+    def record_cells(self, df, rows, cols):
+
+        if not df.columns.is_unique or len(rows) == 0 or len(cols) == 0:
+            self._push(FrameDelta(df))
+            return
+        self._push(CellsDelta(df, rows, cols))
+
+    def add_log(self, log_id):
+        """ Tie a TransformationsLog row to the last change recorded """
+
+        if log_id is None or not self.undos:
+            return
+        self.undos[-1][1].append(log_id)
+
+    def _push(self, delta):
+
+        self.redos.clear()
+        self.undos.append([delta, [], []])
+        self._trim()
+
+    def _trim(self):
+
+        while len(self.undos) > self.levels:
+            self.undos.popleft()
+        while self.undos and self.nbytes > self.budget:
+            self.undos.popleft()
+        # the redo furthest away goes first
+        while self.redos and self.nbytes > self.budget:
+            self.redos.popleft()
+
+    def undo(self, model):
+
+        if not self.undos:
+            return False
+        delta, log_ids, _ = self.undos.pop()
+        inverse = self._apply(model, delta)
+        log_rows = []
+        if log_ids and self.log is not None:
+            log_rows = self.log.get_transformations_by_id(log_ids)
+            self.log.delete_transformations_by_id(log_ids)
+        self.redos.append([inverse, [], log_rows])
+        self._trim()
+        return True
+
+    def redo(self, model):
+
+        if not self.redos:
+            return False
+        delta, _, log_rows = self.redos.pop()
+        inverse = self._apply(model, delta)
+        if log_rows and self.log is not None:
+            self.log.restore_transformations(log_rows)
+        self.undos.append([inverse, [row[0] for row in log_rows], []])
+        self._trim()
+        return True
+
+    def _apply(self, model, delta):
+
+        df = model.df
+        new, inverse, names = delta.apply(df)
+        if new is not df:
+            model.df = new
+        else:
+            model.dataChanged(names)
+        return inverse
+
+    def clear(self):
+
+        self.undos.clear()
+        self.redos.clear()
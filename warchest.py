@@ -18,14 +18,23 @@
 """
 
 from toolbox import write_to_console, is_even, exec_qry
+from database import BatchWriter
+from backgroundjobs import BackgroundJob, JobSlot
+from load_datasets import dataset_cache
+from metadatacache import metadata_cache
+from columnprofile import ProfileCache, get_feature_type
+from memoryusage import MemoryAccountant
+from streamreplay import CSVReplay
+from fileformats import FileFormatError, read_transformations, \
+    write_transformations, read_model_columns, write_model_columns
+from dtypeoptimizer import DtypeOptimizer, get_savings_report
 import numpy as np
-import pandas as pd
 import os.path
-import pickle
+import threading
 from datetime import datetime
 from sklearn.model_selection import train_test_split
 from preprocessing import EncodeClassLabel, Scale
-from insights import ColumnInsight
+from insights import ColumnInsight, TableInsight
 from ordinalmaps import OrdinalMapping
 from toolsdialogs import ClassifiersCRUD, ClassifiersModelDefaults
 from toolsdialogs import TrainAndTestSplitDefaults, ScalingDefaults
@@ -53,10 +62,44 @@ CELL_CLR_MODEL_NOMINAL = '#ADD8E6'  # LightBlue
 CELL_CLR_MODEL_ORDINAL = '#00BFFF'  # DeepSkyBlue
 
 
+def worker_local(name):
+    """ Attribute a widget job's steps assign on its worker thread
+
+    The value a worker assigns is only seen by the steps of its own job,
+    compute_widget_updates hands it to the Tk thread with the widget
+    updates, so a job superseded meanwhile never overwrites it. """
+
+    attr = '_' + name
+
+    def fget(self):
+        state = getattr(self.deferred, 'state', None)
+        if state is not None and name in state:
+            return state[name]
+        return getattr(self, attr)
+
+    def fset(self, value):
+        state = getattr(self.deferred, 'state', None)
+        if state is None:
+            setattr(self, attr, value)
+        else:
+            state[name] = value
+
+    return property(fget, fset)
+
+
 class Warchest():
 
+    # state the widget jobs compute, see compute_widget_updates
+    column_profile = worker_local('column_profile')
+    table_memory = worker_local('table_memory')
+    available_to_model = worker_local('available_to_model')
+    class_label_status = worker_local('class_label_status')
+    nominal_ordinal = worker_local('nominal_ordinal')
+    model_columns = worker_local('model_columns')
+
     def __init__(self, root):
         self.root = root
+        self.deferred = threading.local()
         self.root.resizable(width=False, height=False)
         self.root.protocol('WM_DELETE_WINDOW', self.exit_app)
         self.db_filename = 'warchest.db'
@@ -70,6 +113,11 @@ class Warchest():
         self.selected_column = 0
         self.selected_column_name = ''
         self.column_tab_dict = {}
+        self.column_profile = None
+        self.profile_cache = ProfileCache()
+        self.memory_accountant = MemoryAccountant()
+        self.table_memory = None
+        self.table_tab_version = None
         self.available_to_model = {}
         self.class_label_status = {}
         self.nominal_ordinal = {}
@@ -80,6 +128,13 @@ class Warchest():
 
         self.transformations_log_list = []
 
+        # background jobs, see backgroundjobs.py
+        self.widgets_job = JobSlot()
+        self.dataset_job = JobSlot()
+        self.insights_job = JobSlot()
+        self.optimize_job = JobSlot()
+        self.replay_job = JobSlot()
+
         # absolute path of application py file
         self.absolute_path = os.path.dirname(os.path.abspath(__file__))
         self.datasets_path = os.path.join(self.absolute_path, 'datasets')
@@ -165,6 +220,9 @@ class Warchest():
         self.transformations_menu.add_command(
                 label="Save Transformations",
                 command=self.on_save_transformations_menu_clicked)
+        self.transformations_menu.add_command(
+                label="Replay on CSV File",
+                command=self.on_replay_csv_menu_clicked)
         self.transformations_menu.add_separator()
         self.transformations_menu.add_command(
                 label="Clear All",
@@ -179,6 +237,9 @@ class Warchest():
         self.tools_menu.add_command(
                 label="Ordinal Mappings",
                 command=self.on_ordinal_mappings_menu_clicked)
+        self.tools_menu.add_command(
+                label="Optimize Memory",
+                command=self.on_optimize_memory_menu_clicked)
         self.menu_bar.add_cascade(label="Tools",
                                   menu=self.tools_menu)
 
@@ -1233,6 +1294,16 @@ class Warchest():
                                          padx=1, pady=1)
         self.add_tooltip_to_widget(self.ordinal_mappings_button)
 
+        # analyze_table_button
+        self.analyze_table_button = \
+            ttk.Button(self.table_tab,
+                       text="Analyze Table",
+                       name="analyze_table_button",
+                       command=self.on_analyze_table_button_clicked)
+        self.analyze_table_button.grid(row=0, column=1, sticky="nsew",
+                                       padx=1, pady=1)
+        #self.add_tooltip_to_widget(self.analyze_table_button)
+
         # table_tab_progressbar_label
         self.table_tab_progressbar_label = \
             ttk.Label(self.table_tab,
@@ -1842,17 +1913,50 @@ class Warchest():
 
     def on_analyze_column_button_clicked(self):
 
-        self.update_column_tab_widgets()  # update for selected column
+        # update for selected column, then analyze it
+        self.update_column_tab_widgets(callback=self.analyze_column)
+
+    def analyze_column(self):
 
-        insight = ColumnInsight(self.get_col_values(), self.column_tab_dict)
-        insight.reset_insights()
+        # reset and new insights are written in one transaction
+        with BatchWriter() as batch:
+            insight = ColumnInsight(self.get_col_values(),
+                                    self.column_tab_dict,
+                                    batch=batch)
+            insight.reset_insights()
 
-        is_missing = insight.missing_values()
-        if is_missing is False:
-            insight.memory_usage()
+            is_missing = insight.missing_values()
+            if is_missing is False:
+                insight.memory_usage()
 
         self.update_insights_tab_widgets(insight)  # update for selected column
 
+    def on_analyze_table_button_clicked(self):
+
+        insight = TableInsight(self.table.model.df)
+
+        def analyze_table(job):
+            insight.save(insight.analyze(job))
+
+        def on_done(result):
+            self.turn_progressbar_off(self.table_tab_progressbar,
+                                      self.table_tab_progressbar_label)
+            self.update_insights_tab_widgets(insight)
+            self.tabs.select(self.insights_tab)
+
+        def on_progress(done, total, message):
+            self.update_progressbar(self.table_tab_progressbar,
+                                    self.table_tab_progressbar_label,
+                                    done, total)
+
+        self.turn_progressbar_on(self.table_tab_progressbar,
+                                 self.table_tab_progressbar_label)
+        self.insights_job.start(
+            BackgroundJob(self.root, analyze_table,
+                          on_progress=on_progress,
+                          on_done=on_done,
+                          on_error=self.on_widgets_job_error))
+
     def on_toggle_model_availability_button_clicked(self):
 
         self.available_to_model = self. \
@@ -1873,7 +1977,7 @@ class Warchest():
 
         if self.class_label_status[self.selected_column] == 'No':
 
-            for i in range(len(self.table.model.df.columns)):
+            for i in range(len(self.table.model.frame.columns)):
                 self.class_label_status[i] = 'No'
             self.class_label_status[self.selected_column] = 'Yes'
 
@@ -1897,95 +2001,227 @@ class Warchest():
 
     def on_ordinal_mappings_button_clicked(self):
 
-        self.update_column_tab_widgets()  # update for selected column
+        # update for selected column, then open the mappings
+        self.update_column_tab_widgets(callback=self.open_ordinal_mapping)
+
+    def open_ordinal_mapping(self):
 
         OrdinalMapping(self.root,
                        self.get_col_values(),
                        self.get_feature_type(self.get_col_values()))
 
-    def update_column_tab_widgets(self):
+    def update_column_tab_widgets(self, callback=None):
+
+        # statistics are computed on a worker thread, widgets are only
+        # touched back on the Tk thread by apply_widget_updates
+        data_version = self.table.model.data_version
+        steps = self.get_column_tab_steps() + self.get_table_tab_steps()
+
+        def on_done(updates):
 
+            self.column_tab_dict = {}
+            self.apply_widget_updates(updates)
+            self.table_tab_version = data_version
+            self.turn_progressbar_off(self.table_tab_progressbar,
+                                      self.table_tab_progressbar_label)
+            self.turn_progressbar_off(self.column_tab_progressbar,
+                                      self.column_tab_progressbar_label)
+            if callback is not None:
+                callback()
+            self.requeue_table_tab_widgets()
+
+        def on_progress(done, total, message):
+
+            self.update_progressbar(self.table_tab_progressbar,
+                                    self.table_tab_progressbar_label,
+                                    done, total)
+            self.update_progressbar(self.column_tab_progressbar,
+                                    self.column_tab_progressbar_label,
+                                    done, total)
+
+        self.turn_progressbar_on(self.table_tab_progressbar,
+                                 self.table_tab_progressbar_label)
         self.turn_progressbar_on(self.column_tab_progressbar,
                                  self.column_tab_progressbar_label)
 
-        self.update_table_tab_widgets()
+        self.widgets_job.start(
+            BackgroundJob(self.root, self.compute_widget_updates,
+                          args=(steps,),
+                          on_progress=on_progress,
+                          on_done=on_done,
+                          on_error=self.on_widgets_job_error,
+                          on_cancel=self.on_widgets_job_cancel))
 
-        self.column_tab_dict = {}
+    def update_table_tab_widgets(self):
 
-        # General Information --------------------------------
-        self.update_selected_column_name_entry()
-        self.update_selected_column_entry()
-        self.update_feature_type_entry()
-        self.update_available_to_model_entry()
-        self.update_dtype_entry()
-        self.update_dense_sparse_entry()
-        self.update_non_null_count_entry()
-        self.update_duplicates_in_col_entry()
-        self.update_unique_values_in_col_entry()
-        self.update_missing_values_in_col_entry()
-
-        # Memory Usage ---------------------------------------
-        self.update_bytes_in_data_entry()
-        self.update_bytes_in_col_index_entry()
-        self.update_memusage_of_col_without_index_entry()
-        self.update_memusage_of_col_with_index_entry()
-        self.update_deep_memusage_of_col_with_index_entry()
-        self.update_getsizeof_col_entry()
-
-        # Statistics -----------------------------------------
-        self.update_mean_of_col_entry()
-        self.update_median_of_col_entry()
-        self.update_mode_of_col_text()
-        self.update_std_dev_of_col_entry()
-        self.update_mean_abs_dev_of_col_entry()
-        self.update_std_err_mean_of_col_entry()
-        self.update_skewness_of_col_entry()
-        self.update_kurtosis_of_col_entry()
-        self.update_variance_of_col_entry()
-        self.update_sum_of_col_entry()
-        self.update_min_of_col_entry()
-        self.update_min_index_of_col_entry()
-        self.update_max_of_col_entry()
-        self.update_max_index_of_col_entry()
-        self.update_ptp_of_col_entry()
-        self.update_five_pct_of_col_entry()
-        self.update_twenty_five_pct_of_col_entry()
-        self.update_fifty_pct_of_col_entry()
-        self.update_seventy_five_pct_of_col_entry()
-        self.update_ninety_five_pct_of_col_entry()
+        data_version = self.table.model.data_version
 
-        self.turn_progressbar_off(self.column_tab_progressbar,
-                                  self.column_tab_progressbar_label)
+        def on_done(updates):
 
-    def update_table_tab_widgets(self):
+            self.apply_widget_updates(updates)
+            self.table_tab_version = data_version
+            self.turn_progressbar_off(self.table_tab_progressbar,
+                                      self.table_tab_progressbar_label)
+            self.requeue_table_tab_widgets()
+
+        def on_progress(done, total, message):
+
+            self.update_progressbar(self.table_tab_progressbar,
+                                    self.table_tab_progressbar_label,
+                                    done, total)
+
+        # the running job refreshes the table tab when it is done, again
+        # if the data changed after it started (requeue_table_tab_widgets)
+        if self.widgets_job.is_running():
+            return
 
         self.turn_progressbar_on(self.table_tab_progressbar,
                                  self.table_tab_progressbar_label)
 
-        # General Information --------------------------------
-        self.update_number_of_columns_entry()
-        self.update_number_of_rows_entry()
-        self.update_missing_values_in_df_entry()
-
-        # Memory Usage ---------------------------------------
-        self.update_bytes_in_df_entry()
-        self.update_bytes_in_df_index_entry()
-        self.update_memusage_of_df_without_index_entry()
-        self.update_memusage_of_df_with_index_entry()
-        self.update_deep_memusage_of_df_with_index_entry()
-        self.update_getsizeof_df_entry()
-
-        # Model Information --------------------------------
-        self.update_class_col_entry()
-        self.update_not_in_model_cols_text()
-        self.update_numerical_features_text()
-        self.update_nominal_features_text()
-        self.update_ordinal_features_text()
-        self.update_datetime_features_text()
-        self.update_boolean_features_text()
+        self.widgets_job.start(
+            BackgroundJob(self.root, self.compute_widget_updates,
+                          args=(self.get_table_tab_steps(),),
+                          on_progress=on_progress,
+                          on_done=on_done,
+                          on_error=self.on_widgets_job_error,
+                          on_cancel=self.on_widgets_job_cancel))
+
+    def requeue_table_tab_widgets(self):
+
+        # the data changed while the last job ran, its figures are stale
+        if self.table_tab_version != self.table.model.data_version:
+            self.update_table_tab_widgets()
+
+    def get_column_tab_steps(self):
+
+        return [
+            self.update_column_profile,
+
+            # General Information --------------------------------
+            self.update_selected_column_name_entry,
+            self.update_selected_column_entry,
+            self.update_feature_type_entry,
+            self.update_available_to_model_entry,
+            self.update_dtype_entry,
+            self.update_dense_sparse_entry,
+            self.update_non_null_count_entry,
+            self.update_duplicates_in_col_entry,
+            self.update_unique_values_in_col_entry,
+            self.update_missing_values_in_col_entry,
+
+            # Memory Usage ---------------------------------------
+            self.update_bytes_in_data_entry,
+            self.update_bytes_in_col_index_entry,
+            self.update_memusage_of_col_without_index_entry,
+            self.update_memusage_of_col_with_index_entry,
+            self.update_deep_memusage_of_col_with_index_entry,
+            self.update_getsizeof_col_entry,
+
+            # Statistics -----------------------------------------
+            self.update_mean_of_col_entry,
+            self.update_median_of_col_entry,
+            self.update_mode_of_col_text,
+            self.update_std_dev_of_col_entry,
+            self.update_mean_abs_dev_of_col_entry,
+            self.update_std_err_mean_of_col_entry,
+            self.update_skewness_of_col_entry,
+            self.update_kurtosis_of_col_entry,
+            self.update_variance_of_col_entry,
+            self.update_sum_of_col_entry,
+            self.update_min_of_col_entry,
+            self.update_min_index_of_col_entry,
+            self.update_max_of_col_entry,
+            self.update_max_index_of_col_entry,
+            self.update_ptp_of_col_entry,
+            self.update_five_pct_of_col_entry,
+            self.update_twenty_five_pct_of_col_entry,
+            self.update_fifty_pct_of_col_entry,
+            self.update_seventy_five_pct_of_col_entry,
+            self.update_ninety_five_pct_of_col_entry]
+
+    def get_table_tab_steps(self):
+
+        # table wide figures only change with the data
+        if self.table_tab_version == self.table.model.data_version:
+            return self.get_table_model_steps()
+        return self.get_table_data_steps() + self.get_table_model_steps()
+
+    def get_table_data_steps(self):
+
+        return [
+            # General Information --------------------------------
+            self.update_number_of_columns_entry,
+            self.update_number_of_rows_entry,
+            self.update_missing_values_in_df_entry,
+
+            # Memory Usage ---------------------------------------
+            self.update_table_memory,
+            self.update_bytes_in_df_entry,
+            self.update_bytes_in_df_index_entry,
+            self.update_memusage_of_df_without_index_entry,
+            self.update_memusage_of_df_with_index_entry,
+            self.update_deep_memusage_of_df_with_index_entry,
+            self.update_getsizeof_df_entry]
+
+    def get_table_model_steps(self):
+
+        return [
+            # Model Information --------------------------------
+            self.update_class_col_entry,
+            self.update_not_in_model_cols_text,
+            self.update_numerical_features_text,
+            self.update_nominal_features_text,
+            self.update_ordinal_features_text,
+            self.update_datetime_features_text,
+            self.update_boolean_features_text]
+
+    def compute_widget_updates(self, job, steps):
+
+        # runs on the worker thread: widget writes made by the steps are
+        # recorded instead of applied (see update_disabled_widget), the
+        # state they assign (see worker_local) is set with them on the Tk
+        # thread
+        self.deferred.updates = []
+        self.deferred.state = {}
+        try:
+            for i, step in enumerate(steps):
+                job.check_cancelled()
+                step()
+                job.report(i + 1, len(steps), step.__name__)
+            state = [(setattr, (self, name, value), {})
+                     for name, value in self.deferred.state.items()]
+            return state + self.deferred.updates
+        finally:
+            self.deferred.updates = None
+            self.deferred.state = None
+
+    def apply_widget_updates(self, updates):
+
+        for method, args, kwargs in updates:
+            method(*args, **kwargs)
+
+    def defer_widget_update(self, method, *args, **kwargs):
+
+        # True when called from a worker thread, the update is then
+        # replayed on the Tk thread by apply_widget_updates
+        updates = getattr(self.deferred, 'updates', None)
+        if updates is None:
+            return False
+        updates.append((method, args, kwargs))
+        return True
+
+    def on_widgets_job_error(self, e):
 
         self.turn_progressbar_off(self.table_tab_progressbar,
                                   self.table_tab_progressbar_label)
+        self.turn_progressbar_off(self.column_tab_progressbar,
+                                  self.column_tab_progressbar_label)
+        messagebox.showerror("Error", str(e))
+
+    def on_widgets_job_cancel(self):
+
+        # a newer job owns the progressbars now
+        pass
 
     def update_insights_tab_widgets(self, cls):
 
@@ -2052,9 +2288,16 @@ class Warchest():
         self.update_disabled_widget(self.selected_column_entry, string)
         self.update_column_tab_dict(self.selected_column_entry, string)
 
+    def update_column_profile(self):
+
+        # every Column tab widget below renders this profile, only
+        # recomputed when the column data changed since last time
+        self.column_profile = self.profile_cache. \
+            get_profile(self.table.model, self.selected_column)
+
     def update_feature_type_entry(self):
 
-        string = self.get_feature_type(self.get_col_values())
+        string = self.column_profile.feature_type
         self.update_disabled_widget(self.feature_type_entry, string)
         self.update_column_tab_dict(self.feature_type_entry, string)
 
@@ -2067,126 +2310,115 @@ class Warchest():
 
         if self.model_columns[self.selected_column] == 'No':
             string = 'No'
-            self.available_to_model_entry. \
-                configure(readonlybackground=CELL_CLR_NORMAL)
+            self.configure_widget(self.available_to_model_entry,
+                                  readonlybackground=CELL_CLR_NORMAL)
         elif self.model_columns[self.selected_column] == 'Class (numerical)':
             string = 'Class (numerical)'
-            self.available_to_model_entry. \
-                configure(readonlybackground=CELL_CLR_CLS_LBL)
+            self.configure_widget(self.available_to_model_entry,
+                                  readonlybackground=CELL_CLR_CLS_LBL)
         elif self.model_columns[self.selected_column] == 'Yes (numerical)':
             string = 'Yes (numerical)'
-            self.available_to_model_entry. \
-                configure(readonlybackground=CELL_CLR_MODEL_NUMERICAL)
+            self.configure_widget(self.available_to_model_entry,
+                                  readonlybackground=CELL_CLR_MODEL_NUMERICAL)
         elif self.model_columns[self.selected_column] == 'Class (datetime)':
             string = 'Class (datetime)'
-            self.available_to_model_entry. \
-                configure(readonlybackground=CELL_CLR_CLS_LBL)
+            self.configure_widget(self.available_to_model_entry,
+                                  readonlybackground=CELL_CLR_CLS_LBL)
         elif self.model_columns[self.selected_column] == 'Yes (datetime)':
             string = 'Yes (datetime)'
-            self.available_to_model_entry. \
-                configure(readonlybackground=CELL_CLR_MODEL_DATETIME)
+            self.configure_widget(self.available_to_model_entry,
+                                  readonlybackground=CELL_CLR_MODEL_DATETIME)
         elif self.model_columns[self.selected_column] == 'Class (boolean)':
             string = 'Class (boolean)'
-            self.available_to_model_entry. \
-                configure(readonlybackground=CELL_CLR_CLS_LBL)
+            self.configure_widget(self.available_to_model_entry,
+                                  readonlybackground=CELL_CLR_CLS_LBL)
         elif self.model_columns[self.selected_column] == 'Yes (boolean)':
             string = 'Yes (boolean)'
-            self.available_to_model_entry. \
-                configure(readonlybackground=CELL_CLR_MODEL_BOOLEAN)
+            self.configure_widget(self.available_to_model_entry,
+                                  readonlybackground=CELL_CLR_MODEL_BOOLEAN)
         elif self.model_columns[self.selected_column] == 'Class (nominal)':
             string = 'Class (nominal)'
-            self.available_to_model_entry. \
-                configure(readonlybackground=CELL_CLR_CLS_LBL)
+            self.configure_widget(self.available_to_model_entry,
+                                  readonlybackground=CELL_CLR_CLS_LBL)
         elif self.model_columns[self.selected_column] == 'Yes (nominal)':
             string = 'Yes (nominal)'
-            self.available_to_model_entry. \
-                configure(readonlybackground=CELL_CLR_MODEL_NOMINAL)
+            self.configure_widget(self.available_to_model_entry,
+                                  readonlybackground=CELL_CLR_MODEL_NOMINAL)
         elif self.model_columns[self.selected_column] == 'Yes (ordinal)':
             string = 'Yes (ordinal)'
-            self.available_to_model_entry. \
-                configure(readonlybackground=CELL_CLR_MODEL_ORDINAL)
+            self.configure_widget(self.available_to_model_entry,
+                                  readonlybackground=CELL_CLR_MODEL_ORDINAL)
 
         self.update_disabled_widget(self.available_to_model_entry, string)
         self.update_column_tab_dict(self.available_to_model_entry, string)
 
     def update_dtype_entry(self):
 
-        if self.get_col_values().dtype.name == "category":
-            string = "category"
-        else:
-            string = np.dtype(self.get_col_values())
+        string = self.column_profile.dtype
         self.update_disabled_widget(self.dtype_entry, string)
         self.update_column_tab_dict(self.dtype_entry, string)
 
     def update_dense_sparse_entry(self):
 
-        string = self.get_col_values().ftype.split(":")[-1]
+        string = self.column_profile.dense_sparse
         self.update_disabled_widget(self.dense_sparse_entry, string)
         self.update_column_tab_dict(self.dense_sparse_entry, string)
 
     def update_non_null_count_entry(self):
 
-        string = "{0:.0f}".format(self.get_col_values().count())
+        string = "{0:.0f}".format(self.column_profile.count)
         self.update_disabled_widget(self.non_null_count_entry, string)
         self.update_column_tab_dict(self.non_null_count_entry, string)
 
     def update_duplicates_in_col_entry(self):
 
-        if len(self.get_col_values().index) == 0:  # if column is empty
+        profile = self.column_profile
+        if profile.length == 0:  # if column is empty
             string = "N/A"
         else:
-            pct = "{0:.2f}".format(100 * (self.get_col_values()[self.
-                                   get_col_values().notnull()].
-                                   duplicated(False).sum() /
-                                   len(self.get_col_values().index)))
-            string = str(self.get_col_values()[self.get_col_values().
-                         notnull()].duplicated(False).
-                         sum()) + " (" + str(pct) + "%)"
+            pct = "{0:.2f}".format(100 * (profile.duplicates / profile.length))
+            string = str(profile.duplicates) + " (" + str(pct) + "%)"
         self.update_disabled_widget(self.duplicates_in_col_entry, string)
         self.update_column_tab_dict(self.duplicates_in_col_entry, string)
 
     def update_unique_values_in_col_entry(self):
 
-        if len(self.get_col_values().index) == 0:  # if column is empty
+        profile = self.column_profile
+        if profile.length == 0:  # if column is empty
             string = "N/A"
         else:
-            pct = "{0:.2f}".format(100 * (self.get_col_values().nunique() /
-                                   len(self.get_col_values().index)))
-            string = str(self.get_col_values().
-                         nunique()) + " (" + str(pct) + "%)"
+            pct = "{0:.2f}".format(100 * (profile.unique / profile.length))
+            string = str(profile.unique) + " (" + str(pct) + "%)"
         self.update_disabled_widget(self.unique_values_in_col_entry, string)
         self.update_column_tab_dict(self.unique_values_in_col_entry, string)
 
     def update_missing_values_in_col_entry(self):
 
-        if len(self.get_col_values().index) == 0:  # if column is empty
+        profile = self.column_profile
+        if profile.length == 0:  # if column is empty
             string = "N/A"
         else:
-            pct = "{0:.2f}".format(100 * (self.get_col_values().
-                                   isnull().sum() /
-                                   len(self.get_col_values().index)))
-            string = str(self.get_col_values().
-                         isnull().sum()) + " (" + str(pct) + "%)"
+            pct = "{0:.2f}".format(100 * (profile.missing / profile.length))
+            string = str(profile.missing) + " (" + str(pct) + "%)"
         self.update_disabled_widget(self.missing_values_in_col_entry, string)
         self.update_column_tab_dict(self.missing_values_in_col_entry, string)
 
     # Memory Usage ---------------------------------------
     def update_bytes_in_data_entry(self):
 
-        string = str(self.get_col_values().nbytes)
+        string = str(self.column_profile.nbytes)
         self.update_disabled_widget(self.bytes_in_data_entry, string)
         self.update_column_tab_dict(self.bytes_in_data_entry, string)
 
     def update_bytes_in_col_index_entry(self):
 
-        string = str(self.get_col_values().index.nbytes)
+        string = str(self.column_profile.index_nbytes)
         self.update_disabled_widget(self.bytes_in_col_index_entry, string)
         self.update_column_tab_dict(self.bytes_in_col_index_entry, string)
 
     def update_memusage_of_col_without_index_entry(self):
 
-        string = str(self.get_col_values().
-                     memory_usage(index=False, deep=False))
+        string = str(self.column_profile.memusage)
         self.update_disabled_widget(self.memusage_of_col_without_index_entry,
                                     string)
         self.update_column_tab_dict(self.memusage_of_col_without_index_entry,
@@ -2194,8 +2426,7 @@ class Warchest():
 
     def update_memusage_of_col_with_index_entry(self):
 
-        string = str(self.get_col_values().
-                     memory_usage(index=True, deep=False))
+        string = str(self.column_profile.memusage_with_index)
         self.update_disabled_widget(self.memusage_of_col_with_index_entry,
                                     string)
         self.update_column_tab_dict(self.memusage_of_col_with_index_entry,
@@ -2203,7 +2434,7 @@ class Warchest():
 
     def update_deep_memusage_of_col_with_index_entry(self):
 
-        string = str(self.get_col_values().memory_usage(index=True, deep=True))
+        string = str(self.column_profile.deep_memusage_with_index)
         self.update_disabled_widget(self.deep_memusage_of_col_with_index_entry,
                                     string)
         self.update_column_tab_dict(self.deep_memusage_of_col_with_index_entry,
@@ -2211,17 +2442,15 @@ class Warchest():
 
     def update_getsizeof_col_entry(self):
 
-        import sys
-
-        string = str(sys.getsizeof(self.get_col_values()))
+        string = str(self.column_profile.getsizeof)
         self.update_disabled_widget(self.getsizeof_col_entry, string)
         self.update_column_tab_dict(self.getsizeof_col_entry, string)
 
     # Statistics -----------------------------------------
     def update_mean_of_col_entry(self):
 
-        if self.get_feature_type(self.get_col_values()) == "numerical":
-            string = "{0:.5f}".format(self.get_col_values().mean())
+        if self.column_profile.is_numerical():
+            string = "{0:.5f}".format(self.column_profile.mean)
         else:
             string = "N/A"
         self.update_disabled_widget(self.mean_of_col_entry, string)
@@ -2229,8 +2458,8 @@ class Warchest():
 
     def update_median_of_col_entry(self):
 
-        if self.get_feature_type(self.get_col_values()) == "numerical":
-            string = "{0:.5f}".format(self.get_col_values().median())
+        if self.column_profile.is_numerical():
+            string = "{0:.5f}".format(self.column_profile.median)
         else:
             string = "N/A"
         self.update_disabled_widget(self.median_of_col_entry, string)
@@ -2238,23 +2467,20 @@ class Warchest():
 
     def update_mode_of_col_text(self):
 
-        string = ""
-        if self.get_col_values().mode().count() > 1:
-
-            for i, row in self.get_col_values().mode().iteritems():
-                string = string + str(self.get_col_values().mode()[i]) + '\n'
+        mode = self.column_profile.mode
+        if len(mode) == 0:  # if column is empty
+            string = "N/A"
+        elif len(mode) > 1:
+            string = "".join(str(value) + '\n' for value in mode)
         else:
-            if self.get_col_values().mode().count() == 0:  # if column is empty
-                string = "N/A"
-            else:
-                string = str(self.get_col_values().mode()[0])
+            string = str(mode[0])
         self.update_disabled_widget(self.mode_of_col_text, string)
         self.update_column_tab_dict(self.mode_of_col_text, string)
 
     def update_std_dev_of_col_entry(self):
 
-        if self.get_feature_type(self.get_col_values()) == "numerical":
-            string = "{0:.5f}".format(self.get_col_values().std())
+        if self.column_profile.is_numerical():
+            string = "{0:.5f}".format(self.column_profile.std)
         else:
             string = "N/A"
         self.update_disabled_widget(self.std_dev_of_col_entry, string)
@@ -2262,8 +2488,8 @@ class Warchest():
 
     def update_mean_abs_dev_of_col_entry(self):
 
-        if self.get_feature_type(self.get_col_values()) == "numerical":
-            string = "{0:.5f}".format(self.get_col_values().mad())
+        if self.column_profile.is_numerical():
+            string = "{0:.5f}".format(self.column_profile.mad)
         else:
             string = "N/A"
         self.update_disabled_widget(self.mean_abs_dev_of_col_entry, string)
@@ -2271,8 +2497,8 @@ class Warchest():
 
     def update_std_err_mean_of_col_entry(self):
 
-        if self.get_feature_type(self.get_col_values()) == "numerical":
-            string = "{0:.5f}".format(self.get_col_values().sem())
+        if self.column_profile.is_numerical():
+            string = "{0:.5f}".format(self.column_profile.sem)
         else:
             string = "N/A"
         self.update_disabled_widget(self.std_err_mean_of_col_entry, string)
@@ -2280,8 +2506,8 @@ class Warchest():
 
     def update_skewness_of_col_entry(self):
 
-        if self.get_feature_type(self.get_col_values()) == "numerical":
-            string = "{0:.5f}".format(self.get_col_values().skew())
+        if self.column_profile.is_numerical():
+            string = "{0:.5f}".format(self.column_profile.skew)
         else:
             string = "N/A"
         self.update_disabled_widget(self.skewness_of_col_entry, string)
@@ -2289,8 +2515,8 @@ class Warchest():
 
     def update_kurtosis_of_col_entry(self):
 
-        if self.get_feature_type(self.get_col_values()) == "numerical":
-            string = "{0:.5f}".format(self.get_col_values().kurt())
+        if self.column_profile.is_numerical():
+            string = "{0:.5f}".format(self.column_profile.kurt)
         else:
             string = "N/A"
         self.update_disabled_widget(self.kurtosis_of_col_entry, string)
@@ -2298,8 +2524,8 @@ class Warchest():
 
     def update_variance_of_col_entry(self):
 
-        if self.get_feature_type(self.get_col_values()) == "numerical":
-            string = "{0:.5f}".format(self.get_col_values().var())
+        if self.column_profile.is_numerical():
+            string = "{0:.5f}".format(self.column_profile.var)
         else:
             string = "N/A"
         self.update_disabled_widget(self.variance_of_col_entry, string)
@@ -2307,8 +2533,8 @@ class Warchest():
 
     def update_sum_of_col_entry(self):
 
-        if self.get_feature_type(self.get_col_values()) == "numerical":
-            string = "{0:.5f}".format(self.get_col_values().sum())
+        if self.column_profile.is_numerical():
+            string = "{0:.5f}".format(self.column_profile.sum)
         else:
             string = "N/A"
         self.update_disabled_widget(self.sum_of_col_entry, string)
@@ -2316,8 +2542,8 @@ class Warchest():
 
     def update_min_of_col_entry(self):
 
-        if self.get_feature_type(self.get_col_values()) == "numerical":
-            string = "{0:.1f}".format(self.get_col_values().min())
+        if self.column_profile.is_numerical():
+            string = "{0:.1f}".format(self.column_profile.min)
         else:
             string = "N/A"
         self.update_disabled_widget(self.min_of_col_entry, string)
@@ -2325,8 +2551,8 @@ class Warchest():
 
     def update_min_index_of_col_entry(self):
 
-        if self.get_feature_type(self.get_col_values()) == "numerical":
-            string = "{0:.0f}".format(self.get_col_values().argmin())
+        if self.column_profile.is_numerical():
+            string = "{0:.0f}".format(self.column_profile.argmin)
         else:
             string = "N/A"
         self.update_disabled_widget(self.min_index_of_col_entry, string)
@@ -2334,8 +2560,8 @@ class Warchest():
 
     def update_max_of_col_entry(self):
 
-        if self.get_feature_type(self.get_col_values()) == "numerical":
-            string = "{0:.1f}".format(self.get_col_values().max())
+        if self.column_profile.is_numerical():
+            string = "{0:.1f}".format(self.column_profile.max)
         else:
             string = "N/A"
         self.update_disabled_widget(self.max_of_col_entry, string)
@@ -2343,8 +2569,8 @@ class Warchest():
 
     def update_max_index_of_col_entry(self):
 
-        if self.get_feature_type(self.get_col_values()) == "numerical":
-            string = "{0:.0f}".format(self.get_col_values().argmax())
+        if self.column_profile.is_numerical():
+            string = "{0:.0f}".format(self.column_profile.argmax)
         else:
             string = "N/A"
         self.update_disabled_widget(self.max_index_of_col_entry, string)
@@ -2352,8 +2578,8 @@ class Warchest():
 
     def update_ptp_of_col_entry(self):
 
-        if self.get_feature_type(self.get_col_values()) == "numerical":
-            string = "{0:.1f}".format(self.get_col_values().ptp())
+        if self.column_profile.is_numerical():
+            string = "{0:.1f}".format(self.column_profile.ptp)
         else:
             string = "N/A"
         self.update_disabled_widget(self.ptp_of_col_entry, string)
@@ -2361,8 +2587,8 @@ class Warchest():
 
     def update_five_pct_of_col_entry(self):
 
-        if self.get_feature_type(self.get_col_values()) == "numerical":
-            string = "{0:.1f}".format(self.get_col_values().quantile(.05))
+        if self.column_profile.is_numerical():
+            string = "{0:.1f}".format(self.column_profile.quantile(.05))
         else:
             string = "N/A"
         self.update_disabled_widget(self.five_pct_of_col_entry, string)
@@ -2370,8 +2596,8 @@ class Warchest():
 
     def update_twenty_five_pct_of_col_entry(self):
 
-        if self.get_feature_type(self.get_col_values()) == "numerical":
-            string = "{0:.1f}".format(self.get_col_values().quantile(.25))
+        if self.column_profile.is_numerical():
+            string = "{0:.1f}".format(self.column_profile.quantile(.25))
         else:
             string = "N/A"
         self.update_disabled_widget(self.twenty_five_pct_of_col_entry, string)
@@ -2379,8 +2605,8 @@ class Warchest():
 
     def update_fifty_pct_of_col_entry(self):
 
-        if self.get_feature_type(self.get_col_values()) == "numerical":
-            string = "{0:.1f}".format(self.get_col_values().quantile(.5))
+        if self.column_profile.is_numerical():
+            string = "{0:.1f}".format(self.column_profile.quantile(.5))
         else:
             string = "N/A"
         self.update_disabled_widget(self.fifty_pct_of_col_entry, string)
@@ -2388,8 +2614,8 @@ class Warchest():
 
     def update_seventy_five_pct_of_col_entry(self):
 
-        if self.get_feature_type(self.get_col_values()) == "numerical":
-            string = "{0:.1f}".format(self.get_col_values().quantile(.75))
+        if self.column_profile.is_numerical():
+            string = "{0:.1f}".format(self.column_profile.quantile(.75))
         else:
             string = "N/A"
         self.update_disabled_widget(self.seventy_five_pct_of_col_entry, string)
@@ -2397,8 +2623,8 @@ class Warchest():
 
     def update_ninety_five_pct_of_col_entry(self):
 
-        if self.get_feature_type(self.get_col_values()) == "numerical":
-            string = "{0:.1f}".format(self.get_col_values().quantile(.95))
+        if self.column_profile.is_numerical():
+            string = "{0:.1f}".format(self.column_profile.quantile(.95))
         else:
             string = "N/A"
         self.update_disabled_widget(self.ninety_five_pct_of_col_entry, string)
@@ -2411,88 +2637,74 @@ class Warchest():
     # General Information --------------------------------
     def update_number_of_columns_entry(self):
 
-        string = len(self.table.model.df.columns)
+        string = len(self.table.model.frame.columns)
         self.update_disabled_widget(self.number_of_columns_entry, string)
 
     def update_number_of_rows_entry(self):
 
-        string = len(self.table.model.df.index)
+        string = len(self.table.model.frame.index)
         self.update_disabled_widget(self.number_of_rows_entry, string)
 
     def update_missing_values_in_df_entry(self):
 
-        if len(self.table.model.df.index) == 0:
+        df = self.table.model.frame
+        if len(df.index) == 0:
             string = "N/A"
         else:
-            pct = "{0:.2f}".format(100 * (self.table.model.df.
-                                   isnull().sum().sum()) /
-                                   (len(self.table.model.df.index) *
-                                    len(self.table.model.df.columns)))
-            string = str(self.table.model.df.
-                         isnull().sum().sum()) + " (" + str(pct) + "%)"
+            # a column at a time, a lazy table is not loaded for it
+            missing = sum(int(df.iloc[:, i].isnull().sum())
+                          for i in range(len(df.columns)))
+            pct = "{0:.2f}".format(100 * missing /
+                                   (len(df.index) * len(df.columns)))
+            string = str(missing) + " (" + str(pct) + "%)"
         self.update_disabled_widget(self.missing_values_in_df_entry, string)
 
     # Memory Usage ---------------------------------------
-    def update_bytes_in_df_entry(self):
+    def update_table_memory(self):
+
+        # every Table tab memory widget below renders this
+        self.table_memory = self.memory_accountant. \
+            get_usage(self.table.model)
 
-        total = 0
-        for index, column in enumerate(self.table.model.df.columns):
-            total += self.get_col_values_by_col(index).nbytes
+    def format_deep_memusage(self, total):
 
-        string = str(total)
+        # sampled object column sizes are estimates
+        if self.table_memory.estimated:
+            return "~" + str(total)
+        return str(total)
+
+    def update_bytes_in_df_entry(self):
+
+        string = str(self.table_memory.nbytes)
         self.update_disabled_widget(self.bytes_in_df_entry, string)
 
     def update_bytes_in_df_index_entry(self):
 
-        total = 0
-        for index, column in enumerate(self.table.model.df.columns):
-            total += self.get_col_values_by_col(index).index.nbytes
-
-        string = str(total)
+        string = str(self.table_memory.index_nbytes)
         self.update_disabled_widget(self.bytes_in_df_index_entry, string)
 
     def update_memusage_of_df_without_index_entry(self):
 
-        total = 0
-        for index, column in enumerate(self.table.model.df.columns):
-            total += self.get_col_values_by_col(index). \
-                memory_usage(index=False, deep=False)
-
-        string = str(total)
+        string = str(self.table_memory.memusage)
         self.update_disabled_widget(self.memusage_of_df_without_index_entry,
                                     string)
 
     def update_memusage_of_df_with_index_entry(self):
 
-        total = 0
-        for index, column in enumerate(self.table.model.df.columns):
-            total += self.get_col_values_by_col(index). \
-                memory_usage(index=True, deep=False)
-
-        string = str(total)
+        string = str(self.table_memory.memusage_with_index)
         self.update_disabled_widget(self.memusage_of_df_with_index_entry,
                                     string)
 
     def update_deep_memusage_of_df_with_index_entry(self):
 
-        total = 0
-        for index, column in enumerate(self.table.model.df.columns):
-            total += self.get_col_values_by_col(index). \
-                memory_usage(index=True, deep=True)
-
-        string = str(total)
+        string = self.format_deep_memusage(self.table_memory.
+                                           deep_memusage_with_index)
         self.update_disabled_widget(self.deep_memusage_of_df_with_index_entry,
                                     string)
 
     def update_getsizeof_df_entry(self):
 
-        import sys
-
-        total = 0
-        for index, column in enumerate(self.table.model.df.columns):
-            total += sys.getsizeof(self.get_col_values_by_col(index))
-
-        string = str(total)
+        string = self.format_deep_memusage(self.table_memory.getsizeof)
         self.update_disabled_widget(self.getsizeof_df_entry, string)
 
     # Model Information --------------------------------
@@ -2560,10 +2772,20 @@ class Warchest():
         for row in cursor:
             return row[0]
 
-    def load_dataset(self, obj):
+    def load_dataset(self, job, obj):
 
         write_to_console('\nLoading %s Dataset...' % (obj))
-        df = pd.read_csv("./datasets/" + str(obj))
+        file_name = "./datasets/" + str(obj)
+        # large datasets already in the cache are shown a page at a time,
+        # the table loads every row the first time an edit needs them
+        frame = dataset_cache.open_paged(file_name)
+        if frame is not None and len(frame) >= g.lazy_min_rows:
+            write_to_console('\nShowing %d rows from the dataset cache.' %
+                             len(frame))
+            return frame
+        df = dataset_cache.read_csv(file_name,
+                                    on_progress=job.report,
+                                    check_cancelled=job.check_cancelled)
         write_to_console('\nLoading complete.')
         return df
 
@@ -2576,8 +2798,50 @@ class Warchest():
         if self.selected_dataset == '':
             messagebox.showwarning("Warning", "No dataset selected.")
             return
-        else:
-            self.loaded_df = self.load_dataset(self.selected_dataset)
+
+        # the csv is read on a worker thread, the table is built once
+        # it is in memory
+        self.loading_label = ttk.Label(self.top_area, text="Loading...")
+        self.loading_label.pack(anchor="w", padx=5, pady=5)
+        self.loading_progressbar = ttk.Progressbar(self.top_area,
+                                                   mode='determinate',
+                                                   length=300)
+        self.loading_progressbar.pack(anchor="w", padx=5)
+
+        self.dataset_job.start(
+            BackgroundJob(self.root, self.load_dataset,
+                          args=(self.selected_dataset,),
+                          on_progress=self.on_load_dataset_progress,
+                          on_done=self.on_load_dataset_done,
+                          on_error=self.on_load_dataset_error,
+                          on_cancel=self.clean_loading_items))
+
+    def on_load_dataset_progress(self, done, total, message):
+
+        self.loading_progressbar.config(maximum=total, value=done)
+        self.loading_label.config(text="Loading %s... %d%%" %
+                                  (self.selected_dataset,
+                                   100 * done // max(total, 1)))
+
+    def on_load_dataset_error(self, e):
+
+        self.clean_loading_items()
+        messagebox.showerror("Error", str(e))
+
+    def clean_loading_items(self):
+
+        if hasattr(self, 'loading_label'):
+            self.loading_label.destroy()
+            self.loading_progressbar.destroy()
+            del self.loading_label
+            del self.loading_progressbar
+
+    def on_load_dataset_done(self, df):
+
+        self.clean_loading_items()
+        self.loaded_df = df
+        self.profile_cache.clear()
+        self.memory_accountant.clear()
 
         # Load eda Dataset
         self.table = pt = Table(self.dataframe_area,
@@ -2617,100 +2881,42 @@ class Warchest():
     def init_available_to_model_dict(self):
 
         self.available_to_model.clear()
-        for i in range(len(self.table.model.df.columns)):
+        for i in range(len(self.table.model.frame.columns)):
             self.available_to_model[i] = 'No'
         self.update_model_option_available_to_model(self.available_to_model)
 
     def init_class_label_status_dict(self):
 
         self.class_label_status.clear()
-        for i in range(len(self.table.model.df.columns)):
+        for i in range(len(self.table.model.frame.columns)):
             self.class_label_status[i] = 'No'
         self.update_model_option_class_label_status(self.class_label_status)
 
     def init_nominal_ordinal_dict(self):
 
         self.nominal_ordinal.clear()
-        for i in range(len(self.table.model.df.columns)):
+        for i in range(len(self.table.model.frame.columns)):
             self.nominal_ordinal[i] = 'nominal'
         self.update_model_option_nominal_ordinal(self.nominal_ordinal)
 
     def init_model_columns_dict(self):
 
         self.model_columns.clear()
-        for i in range(len(self.table.model.df.columns)):
+        for i in range(len(self.table.model.frame.columns)):
             self.model_columns[i] = 'No'
         self.update_model_option_model_columns(self.model_columns)
 
     def get_feature_type(self, col_values):
 
-        if col_values.dtype.name == "category":
-            return "categorical/factor"
-            #column_type = "category"
-        elif np.dtype(col_values) == "object":
-            return "nominal or ordinal"
-            #column_type = "string"
-        elif np.dtype(col_values) == "bool":
-            return "boolean"
-            #column_type = "boolean"
-        elif np.dtype(col_values) == "float16":
-            return "numerical"
-            #column_type = "float"
-        elif np.dtype(col_values) == "float32":
-            return "numerical"
-            #column_type = "float"
-        elif np.dtype(col_values) == "float64":
-            return "numerical"
-            #column_type = "float"
-        elif np.dtype(col_values) == "int8":
-            return "numerical"
-            #column_type = "int"
-        elif np.dtype(col_values) == "int16":
-            return "numerical"
-            #column_type = "int"
-        elif np.dtype(col_values) == "int32":
-            return "numerical"
-            #column_type = "int"
-        elif np.dtype(col_values) == "int64":
-            return "numerical"
-            #column_type = "int"
-        elif np.dtype(col_values) == "uint8":
-            return "numerical"
-            #column_type = "int"
-        elif np.dtype(col_values) == "uint16":
-            return "numerical"
-            #column_type = "int"
-        elif np.dtype(col_values) == "uint32":
-            return "numerical"
-            #column_type = "int"
-        elif np.dtype(col_values) == "uint64":
-            return "numerical"
-            #column_type = "int"
-        elif np.dtype(col_values) == "complex64":
-            return "complex (numerical)"
-            #column_type = "complex"
-        elif np.dtype(col_values) == "complex128":
-            return "complex (numerical)"
-            #column_type = "complex"
-        elif np.dtype(col_values) == "datetime64[ns]":
-            return "datetime"
-            #column_type = "datetime"
-        else:
-            try:
-                return "unknown"
-                print(col_values.dtype.name)
-                print(np.dtype(col_values))
-            except:
-                pass
-                # column_type = "unknown"
+        return get_feature_type(col_values)
 
     def get_values_from_selected_column(self):
 
-        return self.table.model.df.iloc[:, self.selected_column]
+        return self.table.model.frame.iloc[:, self.selected_column]
 
     def get_values_from_any_column(self, index):
 
-        return self.table.model.df.iloc[:, index]
+        return self.table.model.frame.iloc[:, index]
 
     def get_col_values(self):
 
@@ -2722,7 +2928,7 @@ class Warchest():
 
     def get_col_name_by_index(self, index):
 
-        return self.table.model.df.columns[index]
+        return self.table.model.frame.columns[index]
 
     def add_tooltip_to_widget(self, widget):
 
@@ -2735,6 +2941,13 @@ class Warchest():
 
     def read_tooltip_from_db(self, table_name=None, item_name=None, language=1):
 
+        # Tooltips is read once and served from memory afterwards
+        if table_name == 'Tooltips':
+            tooltip_text = metadata_cache.get_tooltip(item_name, language)
+            if tooltip_text is None:
+                return []
+            return [(tooltip_text,)]
+
         where_column1 = 'WidgetName'
         sel_column_1 = 'TooltipText'
         lang_column1 = 'LanguageID'
@@ -3026,6 +3239,62 @@ class Warchest():
 
         self.save_transformations()
 
+    def on_replay_csv_menu_clicked(self):
+
+        if self.replay_job.is_running():
+            messagebox.showwarning("Warning", "A replay is already running.")
+            return
+
+        trans_file = filedialog.askopenfilename(
+            filetypes=[('Warchest Transformations File', '*.wct')],
+            title='Load transformations...',
+            initialdir=self.trans_path)
+        if not trans_file:
+            return
+        input_file = filedialog.askopenfilename(
+            filetypes=[('CSV File', '*.csv')],
+            title='Replay on...')
+        if not input_file:
+            return
+        output_file = filedialog.asksaveasfilename(
+            filetypes=[('CSV File', '*.csv')],
+            title='Save result as...',
+            defaultextension='.csv')
+        if not output_file:
+            return
+
+        try:
+            replay = CSVReplay(read_transformations(trans_file))
+        except FileFormatError as e:
+            messagebox.showerror("Error",
+                                 "Warchest Transformations File corrupted"
+                                 "\n" + str(e))
+            return
+
+        def run_replay(job):
+            replay.run(input_file, output_file,
+                       on_progress=job.report,
+                       check_cancelled=job.check_cancelled)
+
+        def on_done(result):
+            self.turn_progressbar_off(self.table_tab_progressbar,
+                                      self.table_tab_progressbar_label)
+            messagebox.showinfo("Replay on CSV File",
+                                "Transformed file saved to " + output_file)
+
+        def on_progress(done, total, message):
+            self.update_progressbar(self.table_tab_progressbar,
+                                    self.table_tab_progressbar_label,
+                                    done, total)
+
+        self.turn_progressbar_on(self.table_tab_progressbar,
+                                 self.table_tab_progressbar_label)
+        self.replay_job.start(
+            BackgroundJob(self.root, run_replay,
+                          on_progress=on_progress,
+                          on_done=on_done,
+                          on_error=self.on_widgets_job_error))
+
     def on_clear_all_transformations_menu_clicked(self):
 
         if self.dataset_does_not_exist():
@@ -3071,11 +3340,62 @@ class Warchest():
         if self.dataset_does_not_exist():
             return
 
-        self.update_column_tab_widgets()  # update for selected column
+        # update for selected column, then open the mappings
+        self.update_column_tab_widgets(callback=self.open_ordinal_mapping)
 
-        OrdinalMapping(self.root,
-                       self.get_col_values(),
-                       self.get_feature_type(self.get_col_values()))
+    def on_optimize_memory_menu_clicked(self):
+
+        if self.dataset_does_not_exist():
+            return
+
+        optimizer = DtypeOptimizer()
+        df = self.table.model.df
+        data_version = self.table.model.data_version
+
+        def plan(job):
+            return optimizer.plan(df, job)
+
+        def on_done(downcasts):
+            self.turn_progressbar_off(self.table_tab_progressbar,
+                                      self.table_tab_progressbar_label)
+            if not downcasts:
+                messagebox.showinfo("Optimize Memory",
+                                    "Every column already has its "
+                                    "smallest safe data type.")
+                return
+            if not messagebox.askyesno("Optimize Memory",
+                                       get_savings_report(downcasts) +
+                                       "\n\nApply these casts?"):
+                return
+            # the table may have changed while the plan was computed
+            if self.table.model.data_version != data_version:
+                messagebox.showwarning("Optimize Memory",
+                                       "The table changed, try again.")
+                return
+            self.table.storeCurrent(cols=[d.name for d in downcasts])
+            new_df = optimizer.apply(df, downcasts)
+            # undone with the casts
+            for log_id in optimizer.log(downcasts, self.session_id):
+                self.table.undostack.add_log(log_id)
+            self.table.model.df = new_df
+            self.table.redraw()
+            self.update_column_tab_widgets()
+            self.update_transformations_log_tab_widgets()
+            messagebox.showinfo("Optimize Memory",
+                                get_savings_report(downcasts, new_df))
+
+        def on_progress(done, total, message):
+            self.update_progressbar(self.table_tab_progressbar,
+                                    self.table_tab_progressbar_label,
+                                    done, total)
+
+        self.turn_progressbar_on(self.table_tab_progressbar,
+                                 self.table_tab_progressbar_label)
+        self.optimize_job.start(
+            BackgroundJob(self.root, plan,
+                          on_progress=on_progress,
+                          on_done=on_done,
+                          on_error=self.on_widgets_job_error))
 
     def on_classifiers_menu_clicked(self):
 
@@ -3103,14 +3423,19 @@ class Warchest():
     def turn_progressbar_on(self, progressbar, progressbar_label):
 
         progressbar.grid()
-        progressbar.start()
+        progressbar.config(mode='determinate', value=0)
 
         progressbar_label.grid()
         progressbar_label.config(text="Working...")
 
+    def update_progressbar(self, progressbar, progressbar_label, done, total):
+
+        if total:
+            progressbar.config(maximum=total, value=done)
+            progressbar_label.config(text="Working... %d/%d" % (done, total))
+
     def turn_progressbar_off(self, progressbar, progressbar_label):
 
-        progressbar.stop()
         progressbar.grid_remove()
 
         progressbar_label.config(text="")
@@ -3118,6 +3443,10 @@ class Warchest():
 
     def update_disabled_widget(self, widget, string):
 
+        if self.defer_widget_update(self.update_disabled_widget,
+                                    widget, string):
+            return
+
         if isinstance(widget, tk.Entry):
             widget.configure(state='normal')
             widget.delete(0, tk.END)
@@ -3129,6 +3458,13 @@ class Warchest():
             widget.insert(tk.END, string)
             widget.configure(state='disabled')
 
+    def configure_widget(self, widget, **kwargs):
+
+        if self.defer_widget_update(self.configure_widget, widget, **kwargs):
+            return
+
+        widget.configure(**kwargs)
+
     def color_disabled_widget(self, widget, clr):
 
         if isinstance(widget, tk.Entry):
@@ -3142,6 +3478,10 @@ class Warchest():
 
     def update_column_tab_dict(self, widget, value):
 
+        if self.defer_widget_update(self.update_column_tab_dict,
+                                    widget, value):
+            return
+
         widget_name = str(widget).split(".")[-1]
         if "entry" in widget_name:
             widget_label = widget_name.replace("entry", "label")
@@ -3226,6 +3566,7 @@ class Warchest():
                    if element['TransformationLogID'] == trans_id]
 
             trans.replicate(lst, self.table.model.df)
+            self.table.model.dataChanged()
             self.table.redraw()
 
         elif (self.transformations_log_tree.
@@ -3244,6 +3585,7 @@ class Warchest():
         trans = Transformation()
 
         trans.replicate(lst, self.table.model.df)
+        self.table.model.dataChanged()
         self.table.redraw()
         return
 
@@ -3262,15 +3604,15 @@ class Warchest():
 
         if (file_name is None) or (file_name == ''):
             return
-        file_obj = open(file_name, "rb")
-
         try:
-            self.transformations_log_list = pickle.load(file_obj)
-        except EOFError:
+            self.transformations_log_list = read_transformations(file_name)
+        except FileFormatError as e:
             messagebox.showerror("Error",
-                                 "Warchest Transformations File corrupted")
-        file_obj.close()
+                                 "Warchest Transformations File corrupted"
+                                 "\n" + str(e))
+            return
 
+        batch = BatchWriter()
         for transformation in self.transformations_log_list:
 
             index = transformation.get('ColumnIndex')
@@ -3285,6 +3627,7 @@ class Warchest():
                                          index=index,
                                          name=name,
                                          transformation=transform,
+                                         batch=batch,
                                          option1=option1)
 
             if transform == 'createCategorical':
@@ -3292,9 +3635,11 @@ class Warchest():
                                          index=index,
                                          name=name,
                                          transformation=transform,
+                                         batch=batch,
                                          option1=option1,
                                          option2=option2,
                                          option3=option3)
+        batch.flush()
 
         self.update_transformations_log_tab_widgets()
 
@@ -3318,7 +3663,12 @@ class Warchest():
 
         if (file_name is None) or (file_name == ''):
             return
-        pickle.dump(self.transformations_log_list, open(file_name, "wb"))
+        try:
+            write_transformations(file_name, self.transformations_log_list)
+        except FileFormatError as e:
+            messagebox.showerror("Error",
+                                 "Warchest Transformations File not saved"
+                                 "\n" + str(e))
 
     def clear_all_transformations(self):
 
@@ -3337,37 +3687,22 @@ class Warchest():
 
         if (file_name is None) or (file_name == ''):
             return
-        file_obj = open(file_name, "rb")
-
         try:
-            temp1, temp2, temp3, temp4 = pickle.load(file_obj)
-            if len(temp1) != len(self.table.model.df.columns):
-                messagebox.showerror("Error",
-                                     "Number of columns in Warchest Model Columns File and current dataset do not match")
-                file_obj.close()
-                return
-            else:
-                file_obj.close()
-        except EOFError:
+            self.available_to_model, self.class_label_status, \
+                self.nominal_ordinal, self.model_columns = \
+                read_model_columns(file_name,
+                                   len(self.table.model.frame.columns))
+        except FileFormatError as e:
             messagebox.showerror("Error",
-                                 "Warchest Model Columns File corrupted")
-            file_obj.close()
+                                 "Warchest Model Columns File corrupted"
+                                 "\n" + str(e))
             return
 
-        file_obj = open(file_name, "rb")
-        try:
-            self.available_to_model, self.class_label_status, self.nominal_ordinal, self.model_columns = pickle.load(file_obj)
-            print(self.model_columns)
-            print(type(self.model_columns))
-            self.update_model_option_available_to_model(self.available_to_model)
-            self.update_model_option_class_label_status(self.class_label_status)
-            self.update_model_option_nominal_ordinal(self.nominal_ordinal)
-            self.update_model_option_model_columns(self.model_columns)
-            self.update_column_tab_widgets()
-        except EOFError:
-            messagebox.showerror("Error",
-                                 "Warchest Model Columns File corrupted")
-        file_obj.close()
+        self.update_model_option_available_to_model(self.available_to_model)
+        self.update_model_option_class_label_status(self.class_label_status)
+        self.update_model_option_nominal_ordinal(self.nominal_ordinal)
+        self.update_model_option_model_columns(self.model_columns)
+        self.update_column_tab_widgets()
 
     def save_model_columns(self):
 
@@ -3385,10 +3720,16 @@ class Warchest():
 
         if (file_name is None) or (file_name == ''):
             return
-        pickle.dump((self.available_to_model,
-                     self.class_label_status,
-                     self.nominal_ordinal,
-                     self.model_columns), open(file_name, "wb"))
+        try:
+            write_model_columns(file_name,
+                                self.available_to_model,
+                                self.class_label_status,
+                                self.nominal_ordinal,
+                                self.model_columns)
+        except FileFormatError as e:
+            messagebox.showerror("Error",
+                                 "Warchest Model Columns File not saved"
+                                 "\n" + str(e))
 
     def update_model_option_available_to_model(self, var):
 
@@ -3426,7 +3767,7 @@ class Warchest():
         self.model_columns = self. \
             get_model_option_x('model_columns_dict')
 
-        for index, column in enumerate(self.table.model.df.columns):
+        for index, column in enumerate(self.table.model.frame.columns):
 
             f_type = self.get_feature_type(self.get_col_values_by_col(index))
 
@@ -3519,7 +3860,7 @@ class Warchest():
 
     def apply_column_color(self, index, clr):
 
-        self.table.columncolors[self.table.model.df.columns[index]] = clr
+        self.table.columncolors[self.table.model.frame.columns[index]] = clr
         self.table.redraw()
 
     def describe_column(self):
@@ -3529,9 +3870,7 @@ class Warchest():
     def init_model_overrides(self):
 
         model_task = ModelTask()
-        model_task.update_model_override_algorithms()
-        model_task.update_model_override_algorithm_params()
-        model_task.update_model_overrides()
+        model_task.update_all_model_overrides()
 
     def exit_app(self):
 
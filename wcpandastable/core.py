@@ -48,11 +48,18 @@ from . import images, util
 from .dialogs import *
 
 # [NG] imports
-import sqlite3
 import json
+from database import get_connection_manager
+from backgroundjobs import BackgroundJob
+from backgroundjobs import JobSlot
 from transformations import Transformation
 from sessions import Session
 from modeloptions import ModelOption
+from cellformat import CellFormatter, CharWidths
+from canvaspool import ItemPool
+from undostack import UndoStack
+from queryengine import QueryEngine
+from formulas import FormulaEngine
 
 
 class Table(Canvas):
@@ -102,6 +109,15 @@ class Table(Canvas):
         self.child = None
         self.queryrow = 4
         self.childrow = 5
+        # [NG] long running table operations run on a worker thread
+        self.table_job = JobSlot()
+        # [NG] text of the visible cells, formatted a block at a time
+        self.cellformatter = CellFormatter()
+        self.charwidths = None
+        self.charwidthsfont = None
+        # [NG] grid lines and cell text are reused from redraw to redraw
+        self.linepool = ItemPool(self, 'line')
+        self.textpool = ItemPool(self, 'text', fill='black')
         self.loadPrefs()
         # [NG] self.currentdir changed from os.path.expanduser('~') to absolute_path
         self.currentdir = absolute_path
@@ -129,10 +145,12 @@ class Table(Canvas):
         self.setFontSize()
         self.plotted = False
         self.importpath = None
-        self.prevdf = None
+        self.undostack = UndoStack(log=Transformation())  # [NG] multi level undo
+        self.queryengine = QueryEngine()  # [NG] cached, indexed row filters
+        self.formulaengine = FormulaEngine()  # [NG] formula columns
 
         # [NG] added self.currentcol_name
-        self.currentcol_name = self.model.df.columns[self.currentcol]
+        self.currentcol_name = self.model.frame.columns[self.currentcol]  # [NG] frame
         return
 
     def all_children(self, wid):
@@ -146,11 +164,8 @@ class Table(Canvas):
 
     # [NG] added execute_db_query method
     def execute_db_query(self, query, parameters=()):
-        with sqlite3.connect(self.db_filename) as conn:
-            cursor = conn.cursor()
-            query_result = cursor.execute(query, parameters)
-            conn.commit()
-        return query_result
+        return get_connection_manager(self.db_filename).execute(query,
+                                                                parameters)
 
     # [NG] added write_integer_to_db method
     def write_integer_to_db(self, table_name=None,
@@ -330,6 +345,8 @@ class Table(Canvas):
         self.bind("<Delete>", self.clearData)
         self.bind("<Control-v>", self.paste)
         self.bind("<Control-a>", self.selectAll)
+        self.bind("<Control-z>", self.undo)  # [NG] added
+        self.bind("<Control-y>", self.redo)  # [NG] added
 
         self.bind("<Right>", self.handle_arrow_keys)
         self.bind("<Left>", self.handle_arrow_keys)
@@ -453,8 +470,8 @@ class Table(Canvas):
         """Redraw the visible portion of the canvas"""
 
         model = self.model
-        self.rows = len(self.model.df.index)
-        self.cols = len(self.model.df.columns)
+        self.rows = len(self.model.frame.index)  # [NG] frame
+        self.cols = len(self.model.frame.columns)  # [NG] frame
         if self.cols == 0 or self.rows == 0:
             self.delete('entry')
             self.delete('rowrect','colrect')
@@ -477,7 +494,7 @@ class Table(Canvas):
         if self.filtered == True:
             self.delete('colrect')
 
-        self.rowrange = list(range(0,self.rows))
+        self.rowrange = range(0,self.rows)  # [NG] not a list of every row
         self.configure(scrollregion=(0,0, self.tablewidth+self.x_start,
                         self.rowheight*self.rows+10))
 
@@ -491,32 +508,24 @@ class Table(Canvas):
         align = self.align
         self.delete('fillrect')
         bgcolor = self.cellbackgr
-        df = self.model.df
-
-        #st=time.time()
-        def set_precision(x, p):
-            if not pd.isnull(x):
-                if x<1:
-                    x = '{:.{}g}'.format(x, p)
-                else:
-                    x = '{:.{}f}'.format(x, p)
-            return x
-
+        # [NG] cells are formatted and cut to the column width a block of
+        # [NG] rows at a time, see cellformat.py, instead of cell by cell
+        charwidths = self.getCharWidths()
         prec = self.floatprecision
-        rows = self.visiblerows
+        pad = 5
+        self.textpool.begin('text', keys=set((row, col)
+                                             for row in self.visiblerows
+                                             for col in self.visiblecols))
         for col in self.visiblecols:
-            coldata = df.iloc[rows,col]
-            #print (col, coldata.dtype)
-            if prec != 0:
-                if coldata.dtype == 'float64':
-                    coldata = coldata.apply(lambda x: set_precision(x, prec), 1)
-                    #print (coldata)
-            coldata = coldata.astype(object).fillna('')
-            offset = rows[0]
-            for row in self.visiblerows:
-                text = coldata.iloc[row-offset]
-                self.drawText(row, col, text, align)
-            colname = df.columns[col]
+            w = self.col_positions[col+1] - self.col_positions[col]
+            texts = self.cellformatter.get_texts(self.model, col,
+                                                 startvisiblerow,
+                                                 endvisiblerow, prec,
+                                                 w-pad, charwidths)
+            for row, text in zip(self.visiblerows, texts):
+                self.drawText(row, col, text, align, fitted=True,
+                              pool=self.textpool)
+        self.textpool.end()
 
         self.colorColumns()
         self.tablecolheader.redraw()
@@ -556,7 +565,7 @@ class Table(Canvas):
             return
         if cols == None:
             cols = self.multiplecollist
-        colnames = self.model.df.columns[cols]
+        colnames = self.model.frame.columns[cols]  # [NG] frame
         for c in colnames:
             self.columncolors[c] = clr
         self.redraw()
@@ -569,7 +578,7 @@ class Table(Canvas):
             cols = self.visiblecols
         self.delete('colorrect')
         for c in cols:
-            colname = self.model.df.columns[c]
+            colname = self.model.frame.columns[c]  # [NG] frame
             if colname in self.columncolors:
                 clr = self.columncolors[colname]
                 self.drawSelectedCol(c, delete=0, color=clr, tag='colorrect')
@@ -620,7 +629,7 @@ class Table(Canvas):
     def setColPositions(self):
         """Determine current column grid positions"""
 
-        df = self.model.df
+        df = self.model.frame  # [NG] frame
         self.col_positions=[]
         w = self.cellwidth
         x_pos = self.x_start
@@ -653,6 +662,7 @@ class Table(Canvas):
             except Exception as e:
                 print('could not sort')
                 print(e)
+        self.model.dataChanged()  # [NG] added, row order changed
         self.redraw()
         return
 
@@ -708,6 +718,7 @@ class Table(Canvas):
 
         df = self.model.df
         df.columns = df.columns.get_level_values(0)
+        self.model.dataChanged()  # [NG] added, every column renamed
         #self.model.df
         self.redraw()
         if hasattr(self, 'pf'):
@@ -772,7 +783,7 @@ class Table(Canvas):
                                              parent=self.parentframe)
         if not num:
             return
-        self.storeCurrent()
+        self.storeCurrent(shared=True)
         keys = self.model.autoAddRows(num)
         self.redraw()
         return
@@ -800,7 +811,7 @@ class Table(Canvas):
                                         "Name already exists!",
                                         parent=self.parentframe)
             else:
-                self.storeCurrent()
+                self.storeCurrent(cols=[])
                 self.model.addColumn(newname, dtype)
                 self.parentframe.configure(width=self.width)
                 self.redraw()
@@ -815,7 +826,7 @@ class Table(Canvas):
                                       "Delete selected rows?",
                                       parent=self.parentframe)
             if n == True:
-                self.storeCurrent()
+                self.storeCurrent(shared=True)
                 rows = self.multiplerowlist
                 self.model.deleteRows(rows)
                 self.setSelectedRow(0)
@@ -826,7 +837,7 @@ class Table(Canvas):
                                       "Delete this row?",
                                       parent=self.parentframe)
             if n:
-                self.storeCurrent()
+                self.storeCurrent(shared=True)
                 row = self.getSelectedRow()
                 self.model.deleteRow(row)
                 self.setSelectedRow(row-1)
@@ -842,8 +853,8 @@ class Table(Canvas):
                                    parent=self.parentframe)
         if not n:
             return
-        self.storeCurrent()
         cols = self.multiplecollist
+        self.storeCurrent(cols=list(self.model.df.columns[cols]))
         self.model.deleteColumns(cols)
         self.setSelectedCol(0)
         self.redraw()
@@ -860,20 +871,37 @@ class Table(Canvas):
             self.pf.updateData()
         return
 
-    def storeCurrent(self):
+    def storeCurrent(self, cols=None, rows=None, shared=False):
         """Store current version of the table before a major change is made"""
 
-        self.prevdf = self.model.df.copy()
+        # [NG] record only what the change touches: the cells of rows and
+        # cols, the columns named in cols, or the table, shared when the
+        # change builds a new one
+        df = self.model.df
+        if rows is not None and cols is not None:
+            self.undostack.record_cells(df, rows, cols)
+        elif cols is not None:
+            self.undostack.record_columns(df, cols)
+        else:
+            self.undostack.record_frame(df, shared)
         return
 
-    def undo(self):
+    def undo(self, event=None):
         """Undo last major table change"""
 
-        if self.prevdf is None:
+        if not self.undostack.undo(self.model):  # [NG] multi level undo
+            return
+        self.redraw()
+        self.tableChanged()
+        return
+
+    def redo(self, event=None):
+        """[NG] Redo the last change undone"""
+
+        if not self.undostack.redo(self.model):
             return
-        self.model.df = self.prevdf
         self.redraw()
-        self.prevdf = None
+        self.tableChanged()
         return
 
     def deleteCells(self, rows, cols, answer=None):
@@ -885,7 +913,7 @@ class Table(Canvas):
                                     parent=self.parentframe)
         if not answer:
             return
-        self.storeCurrent()
+        self.storeCurrent(cols=cols, rows=rows)
         self.model.deleteCells(rows, cols)
         self.redraw()
         return
@@ -908,7 +936,7 @@ class Table(Canvas):
                                    parent=self.parentframe)
         if not n:
             return
-        self.storeCurrent()
+        self.storeCurrent(shared=True)
         model = TableModel(pd.DataFrame())
         self.updateModel(model)
         self.redraw()
@@ -962,6 +990,7 @@ class Table(Canvas):
             data = pd.Series(np.arange(low,high,step))
         col = df.columns[self.currentcol]
         df[col] = data
+        self.model.dataChanged([col])  # [NG] added
         self.redraw()
         return
 
@@ -994,7 +1023,7 @@ class Table(Canvas):
                                 parent = self.parentframe)
         if d.result == None:
             return
-        self.storeCurrent() # [NG] Added
+        self.storeCurrent(cols=[col]) # [NG] Added
         t = d.results[0]
         # [NG] added a check to see if column can be casted safely
         # [NG] without changing underlying data
@@ -1007,14 +1036,16 @@ class Table(Canvas):
             if self.is_castable(df[col], t) is True:
                 try:
                     self.model.df[col] = df[col].astype(t)
+                    self.model.dataChanged([col])  # [NG] added
                     self.redraw()
                     # [NG] add transformation to log
                     trans = Transformation()
-                    trans.add_transformation(session=self.get_session(),
-                                             index=self.currentcol,
-                                             name=col,
-                                             transformation=sys._getframe().f_code.co_name,
-                                             option1=t)
+                    log_id = trans.add_transformation(session=self.get_session(),
+                                                      index=self.currentcol,
+                                                      name=col,
+                                                      transformation=sys._getframe().f_code.co_name,
+                                                      option1=t)
+                    self.undostack.add_log(log_id)  # [NG] undone with the change
                 except:
                     print('failed')
             else:
@@ -1022,14 +1053,16 @@ class Table(Canvas):
         else:
             try:
                 self.model.df[col] = df[col].astype(t)
+                self.model.dataChanged([col])  # [NG] added
                 self.redraw()
                 # [NG] add transformation to log
                 trans = Transformation()
-                trans.add_transformation(session=self.get_session(),
-                                         index=self.currentcol,
-                                         name=col,
-                                         transformation=sys._getframe().f_code.co_name,
-                                         option1=t)
+                log_id = trans.add_transformation(session=self.get_session(),
+                                                  index=self.currentcol,
+                                                  name=col,
+                                                  transformation=sys._getframe().f_code.co_name,
+                                                  option1=t)
+                self.undostack.add_log(log_id)  # [NG] undone with the change
             except:
                 print('failed')
         return
@@ -1059,7 +1092,6 @@ class Table(Canvas):
                                 parent = self.parentframe)
         if d.result == None:
             return
-        self.storeCurrent()
         method = d.results[0]
         symbol = d.results[1]
         limit = int(d.results[2])
@@ -1069,33 +1101,78 @@ class Table(Canvas):
         dropdups = d.results[6]
         dropdupcols = d.results[7]
         rounddecimals = int(d.results[8])
+
+        # [NG] cleaning runs on a worker thread, the table is only updated
+        # back on the Tk thread once the cleaned frame is ready
+        steps = []
         if method == '':
             pass
         elif method == 'fill scalar':
-            df = df.fillna(symbol)
+            steps.append(lambda df: df.fillna(symbol))
         elif method == 'interpolate':
-            df = df.interpolate()
+            steps.append(lambda df: df.interpolate())
         elif method == 'mean':  # [NG] added more fill options: mean
-            df = df.fillna(df.mean())
+            steps.append(lambda df: df.fillna(df.mean()))
         elif method == 'median':  # [NG] added more fill options: median
-            df = df.fillna(df.median())
+            steps.append(lambda df: df.fillna(df.median()))
         elif method == 'mode':  # [NG] added more fill options: mode
             #df = df.fillna(df.mode())
-            df = df.apply(lambda x:x.fillna(x.value_counts().index[0]))
+            steps.append(lambda df: df.apply(lambda x:x.fillna(x.value_counts().index[0])))
         else:
-            df = df.fillna(method=method, limit=limit)
+            steps.append(lambda df: df.fillna(method=method, limit=limit))
         if dropcols == 1:
-            df = df.dropna(axis=1,how=how)
+            steps.append(lambda df: df.dropna(axis=1,how=how))
         if droprows == 1:
-            df = df.dropna(axis=0,how=how)
+            steps.append(lambda df: df.dropna(axis=0,how=how))
         if dropdups == 1:
-            df = df.drop_duplicates()
+            steps.append(lambda df: df.drop_duplicates())
         if dropdupcols == 1:
-            df = df.loc[:,~df.columns.duplicated()]
+            steps.append(lambda df: df.loc[:,~df.columns.duplicated()])
         if rounddecimals != 0:
-            df = df.round(rounddecimals)
-        self.model.df = df
-        self.redraw()
+            steps.append(lambda df: df.round(rounddecimals))
+
+        def clean(job, df):
+            for i, step in enumerate(steps):
+                job.check_cancelled()
+                df = step(df)
+                job.report(i+1, len(steps), 'Cleaning data')
+            return df
+
+        # [NG] the undo entry is recorded when the cleaned frame replaces
+        # the table, which must not have changed while the job ran
+        data_version = self.model.data_version
+
+        def on_done(cleaned):
+            self.setStatusProgress('')
+            if self.model.data_version != data_version:
+                messagebox.showwarning("Clean Data",
+                                       "The table changed while it was being "
+                                       "cleaned, clean it again.",
+                                       parent=self.parentframe)
+                return
+            self.storeCurrent(shared=True)  # [NG] cleaning builds a new frame
+            self.model.df = cleaned
+            self.redraw()
+
+        def on_progress(done, total, message):
+            self.setStatusProgress('%s... %d/%d' %(message, done, total))
+
+        def on_error(e):
+            self.setStatusProgress('')
+            messagebox.showerror("Error", str(e), parent=self.parentframe)
+
+        self.setStatusProgress('Cleaning data...')
+        self.table_job.start(BackgroundJob(self, clean, args=(df,),
+                                           on_progress=on_progress,
+                                           on_done=on_done,
+                                           on_error=on_error))
+        return
+
+    def setStatusProgress(self, text):
+        """[NG] Show progress of a background job in the status bar"""
+
+        if hasattr(self, 'statusbar'):
+            self.statusbar.progressvar.set(text)
         return
 
     def createCategorical(self):
@@ -1128,7 +1205,10 @@ class Table(Canvas):
                                 parent = self.parentframe)
         if d.result == None:
             return
-        self.storeCurrent()
+        # [NG] only the column and the columns it may be written to change
+        targets = [col, d.results[1], d.results[7], d.results[9],
+                   col+'_binned']
+        self.storeCurrent(cols=[c for c in targets if c in df.columns])
         convert = d.results[0]
         name = d.results[1]
         dummies = d.results[2]
@@ -1156,11 +1236,12 @@ class Table(Canvas):
             self.model.df = pd.concat([df, new], 1)
             # [NG] add transformation to log
             trans = Transformation()
-            trans.add_transformation(session=self.get_session(),
-                                     index=self.currentcol,
-                                     name=col,
-                                     transformation=sys._getframe().f_code.co_name,
-                                     options="dummies")
+            log_id = trans.add_transformation(session=self.get_session(),
+                                              index=self.currentcol,
+                                              name=col,
+                                              transformation=sys._getframe().f_code.co_name,
+                                              options="dummies")
+            self.undostack.add_log(log_id)  # [NG] undone with the change
         elif convert == 1:
             df[name] = pd.Categorical(df[col]).codes
 
@@ -1169,33 +1250,36 @@ class Table(Canvas):
                 self.add_col_to_model_columns(1)
 
                 trans = Transformation()
-                trans.add_transformation(session=self.get_session(),
-                                         index=self.currentcol,
-                                         name=name,
-                                         transformation=sys._getframe().f_code.co_name,
-                                         option1="convert",
-                                         option2="new_col",
-                                         option3=col)
+                log_id = trans.add_transformation(session=self.get_session(),
+                                                  index=self.currentcol,
+                                                  name=name,
+                                                  transformation=sys._getframe().f_code.co_name,
+                                                  option1="convert",
+                                                  option2="new_col",
+                                                  option3=col)
+                self.undostack.add_log(log_id)  # [NG] undone with the change
             else:
                 trans = Transformation()
-                trans.add_transformation(session=self.get_session(),
-                                         index=self.currentcol,
-                                         name=name,
-                                         transformation=sys._getframe().f_code.co_name,
-                                         option1="convert",
-                                         option2='',
-                                         option3='')
+                log_id = trans.add_transformation(session=self.get_session(),
+                                                  index=self.currentcol,
+                                                  name=name,
+                                                  transformation=sys._getframe().f_code.co_name,
+                                                  option1="convert",
+                                                  option2='',
+                                                  option3='')
+                self.undostack.add_log(log_id)  # [NG] undone with the change
         elif encode == 1:  # [NG] added
             class_mapping = {label: idx for idx, label
                              in enumerate(np.unique(df[col]))}
             df[name_encode] = df[col].map(class_mapping)
             # [NG] add transformation to log
             trans = Transformation()
-            trans.add_transformation(session=self.get_session(),
-                                     index=self.currentcol,
-                                     name=name_encode,
-                                     transformation=sys._getframe().f_code.co_name,
-                                     options="encode")
+            log_id = trans.add_transformation(session=self.get_session(),
+                                              index=self.currentcol,
+                                              name=name_encode,
+                                              transformation=sys._getframe().f_code.co_name,
+                                              options="encode")
+            self.undostack.add_log(log_id)  # [NG] undone with the change
         elif ordinal == 1:  # [NG] added
             col_isactive = 'IsActive'
             query = 'SELECT OrdinalMapping FROM OrdinalMaps WHERE IsActive=?'.\
@@ -1207,11 +1291,12 @@ class Table(Canvas):
             df[name_ordinal] = df[col].map(json.loads(ordinal_mapping))
             # [NG] add transformation to log
             trans = Transformation()
-            trans.add_transformation(session=self.get_session(),
-                                     index=self.currentcol,
-                                     name=name_ordinal,
-                                     transformation=sys._getframe().f_code.co_name,
-                                     options="ordinal")
+            log_id = trans.add_transformation(session=self.get_session(),
+                                              index=self.currentcol,
+                                              name=name_ordinal,
+                                              transformation=sys._getframe().f_code.co_name,
+                                              options="ordinal")
+            self.undostack.add_log(log_id)  # [NG] undone with the change
         elif bins != '':
             bins = [int(i) for i in bins.split(',')]
             if len(bins)==1:
@@ -1224,13 +1309,15 @@ class Table(Canvas):
             df[name] = pd.cut(df[col], bins, labels=binlabels)
             # [NG] add transformation to log
             trans = Transformation()
-            trans.add_transformation(session=self.get_session(),
-                                     index=self.currentcol,
-                                     name=col,
-                                     transformation=sys._getframe().f_code.co_name,
-                                     options="bins")
+            log_id = trans.add_transformation(session=self.get_session(),
+                                              index=self.currentcol,
+                                              name=col,
+                                              transformation=sys._getframe().f_code.co_name,
+                                              options="bins")
+            self.undostack.add_log(log_id)  # [NG] undone with the change
         else:
             df[name] = df[col].astype('category')
+        self.model.dataChanged()  # [NG] added
         if name != col:
             self.placeColumn(name, col)
         else:
@@ -1263,7 +1350,6 @@ class Table(Canvas):
                                 parent = self.parentframe)
         if d.result == None:
             return
-        self.storeCurrent()
         funcname = d.results[0]
         newcol = d.results[1]
         inplace = d.results[2]
@@ -1274,11 +1360,15 @@ class Table(Canvas):
             newcol = funcname + '(%s)' %(','.join(cols))
         if funcname in ['subtract','divide','mod','remainder','convolve']:
             newcol = cols[0]+' '+ funcname +' '+cols[1]
+        # [NG] the new column is added, or replaces one
+        self.storeCurrent(cols=[c for c in cols + [newcol] if c in df.columns])
+        if funcname in ['subtract','divide','mod','remainder','convolve']:
             df[newcol] = df[cols[0]].combine(df[cols[1]], func=func)
         else:
             if inplace == True:
                 newcol = cols[0]
             df[newcol] = df[cols].apply(func, 1)
+        self.model.dataChanged([newcol])  # [NG] added
         if inplace == False:
             self.placeColumn(newcol,cols[-1])
         else:
@@ -1456,7 +1546,9 @@ class Table(Canvas):
                                 parent = self.parentframe)
         if d.result == None:
             return
-        self.storeCurrent()
+        # [NG] the column, or the new column it is written to, changes
+        self.storeCurrent(cols=[c for c in (col, col+'_'+d.results[0])
+                                if c in df.columns])
         func = d.results[0]
         sep = d.results[1]
         start = d.results[2]
@@ -1493,6 +1585,7 @@ class Table(Canvas):
         if newcol == 1:
             col = col+'_'+func
         df[col] = x
+        self.model.dataChanged([col])  # [NG] added
         self.redraw()
         return
 
@@ -1524,7 +1617,9 @@ class Table(Canvas):
 
         if d.result == None:
             return
-        self.storeCurrent()
+        # [NG] the column written to is one of these when it exists
+        targets = [colname, d.results[0], d.results[2]]
+        self.storeCurrent(cols=[c for c in targets if c in df.columns])
         newname = d.results[0]
         if newname != '':
             colname = newname
@@ -1544,6 +1639,7 @@ class Table(Canvas):
             except Exception as e:
                 messagebox.showwarning("Convert error", e,
                                         parent=self.parentframe)
+        self.model.dataChanged([colname])  # [NG] added
         if inplace == False or len(cols)>1:
             #print (cols[-1])
             self.placeColumn(colname, cols[-1])
@@ -1555,8 +1651,7 @@ class Table(Canvas):
     def showAll(self):
         """Re-show unfiltered"""
 
-        if hasattr(self, 'dataframe'):
-            self.model.df = self.dataframe
+        self.model.clearRowFilter()  # [NG] the model keeps the whole table
         self.filtered = False
         self.redraw()
         return
@@ -1609,12 +1704,8 @@ class Table(Canvas):
     def _eval(self, df, ex):
         """Evaluate an expression using numexpr"""
 
-        #uses assignments to globals() - check this is ok
-        import numexpr as ne
-        for c in df:
-            globals()[c] = df[c].as_matrix()
-        a = ne.evaluate(ex)
-        return a
+        # [NG] on the arrays of the columns it reads, see formulas.py
+        return self.formulaengine.evaluate(df, ex=ex)
 
     def evalFunction(self, evt=None):
         """Apply a string based function to create new columns"""
@@ -1636,6 +1727,7 @@ class Table(Canvas):
         #evaluate
         try:
             df[n] = self._eval(df, ex)
+            self.model.dataChanged([n])  # [NG] added
             self.functionentry.configure(style="White.TCombobox")
         except Exception as e:
             print ('function parse error')
@@ -1643,48 +1735,45 @@ class Table(Canvas):
             self.functionentry.configure(style="Red.TCombobox")
             return
         #keep track of which cols are functions?
-        self.formulae[n] = ex
+        # [NG] not a column computed from itself, that was a one off change
+        try:
+            self.formulaengine.set_formula(n, ex)
+        except ValueError:
+            self.formulaengine.remove(n)
 
         if self.placecolvar.get() == 1:
             cols = df.columns
             self.placeColumn(n,cols[0])
         if self.recalculatevar.get() == 1:
-            self.recalculateFunctions(omit=n)
+            self.recalculateFunctions(changed=[n])  # [NG] dependents of n
         else:
             self.redraw()
         if hasattr(self, 'pf') and self.updateplotvar.get()==1:
             self.plotSelected()
         #update functions list in dropdown
-        funclist = ['='.join(i) for i in self.formulae.items()]
+        funclist = ['='.join(i) for i in self.formulaengine.formulae.items()]
         self.functionentry['values'] = funclist
         return
 
-    def recalculateFunctions(self, omit=None):
+    def recalculateFunctions(self, omit=None, changed=None):
         """Re evaluate any columns that were derived from functions
         and dependent on other columns (except self derived?)"""
 
+        # [NG] only the formulas reading the changed columns, all of them
+        # if changed is None, each after the formulas it reads
         df = self.model.df
-        for n in self.formulae:
-            if n==omit: continue
-            ex = self.formulae[n]
-            #need to check if self calculation here...
-            try:
-                df[n] = self._eval(df, ex)
-            except:
-                print('could not calculate %s' %ex)
+        computed, failed = self.formulaengine.recalculate(df, changed, omit)
+        for n in failed:
+            print('could not calculate %s' %self.formulaengine.formulae[n])
+        if computed:
+            self.model.dataChanged(computed)
         self.redraw()
         return
 
     def updateFunctions(self):
         """Remove functions if a column has been deleted"""
 
-        if not hasattr(self, 'formulae'):
-            return
-        df = self.model.df
-        cols = list(df.columns)
-        for n in list(self.formulae.keys()):
-            if n not in cols:
-                del(self.formulae[n])
+        self.formulaengine.prune(list(self.model.frame.columns))  # [NG]
         return
 
     def functionsBar(self, evt=None):
@@ -1737,7 +1826,7 @@ class Table(Canvas):
                                     parent=self.parentframe)
             if n == None:
                 return
-            self.formulae = {}
+            self.formulaengine.clear()  # [NG]
             self.functionentry['values'] = []
             return
         def addcolname(evt):
@@ -1752,14 +1841,12 @@ class Table(Canvas):
 
         if hasattr(self, 'evalframe') and self.evalframe != None:
             return
-        if not hasattr(self, 'formulae'):
-            self.formulae = {}
         ef = self.evalframe = Frame(self.parentframe)
         ef.grid(row=self.queryrow,column=0,columnspan=3,sticky='news')
         bf = Frame(ef)
         bf.pack(side=TOP, fill=BOTH)
         self.evalvar = StringVar()
-        funclist = ['='.join(i) for i in self.formulae.items()]
+        funclist = ['='.join(i) for i in self.formulaengine.formulae.items()]
         self.functionentry = e = Combobox(bf, values=funclist,
                                     textvariable=self.evalvar,width=34,
                                     font="Courier 13 bold",
@@ -1785,7 +1872,7 @@ class Table(Canvas):
         self.recalculatevar = IntVar()
         Checkbutton(bf, text="Update plot", variable=self.updateplotvar).pack(side=LEFT)
         Checkbutton(bf, text="Place new columns", variable=self.placecolvar).pack(side=LEFT)
-        Checkbutton(bf, text="Recalculate all", variable=self.recalculatevar).pack(side=LEFT)
+        Checkbutton(bf, text="Recalculate dependents", variable=self.recalculatevar).pack(side=LEFT)
         return
 
     def resizeColumn(self, col, width):
@@ -2022,7 +2109,7 @@ class Table(Canvas):
 #                              item_name='selected_column_name',
 #                              item_value=self.model.df.columns[self.currentcol])
         self.parent_callback(self.currentcol,
-                             self.model.df.columns[self.currentcol],
+                             self.model.frame.columns[self.currentcol],  # [NG] frame
                              'describe_column')
         return
 
@@ -2218,7 +2305,7 @@ class Table(Canvas):
     def pasteTable(self, event=None):
         """Paste a new table from the clipboard"""
 
-        self.storeCurrent()
+        self.storeCurrent(shared=True)
         try:
             df = pd.read_clipboard(sep=',',error_bad_lines=False)
         except Exception as e:
@@ -2445,6 +2532,7 @@ class Table(Canvas):
             df.columns = df.columns.str.lower()
         elif upper == 1:
             df.columns = df.columns.str.upper()
+        self.model.dataChanged()  # [NG] added, columns renamed
         self.redraw()
         self.tableChanged()
         return
@@ -2593,6 +2681,7 @@ class Table(Canvas):
         defaultactions = {
                         "Copy" : lambda: self.copy(rows, cols),
                         "Undo" : lambda: self.undo(),
+                        "Redo" : lambda: self.redo(),
                         #"Paste" : lambda: self.paste(rows, cols),
                         "Fill Down" : lambda: self.fillDown(rows, cols),
                         #"Fill Right" : lambda: self.fillAcross(cols, rows),
@@ -2620,7 +2709,7 @@ class Table(Canvas):
                         "Clean Data" : self.cleanData,
                         "Clear Formatting" : self.clearFormatting}
 
-        main = ["Copy", "Undo", "Fill Down", #"Fill Right",
+        main = ["Copy", "Undo", "Redo", "Fill Down", #"Fill Right",
                 "Clear Data"]#, "Delete Column(s)"]
         general = ["Select All", "Filter Rows",
                    "Show as Text", "Table Info", "Preferences"]
@@ -2661,7 +2750,9 @@ class Table(Canvas):
                         continue
                     if action == 'Fill Right' and (cols == None or len(cols) <= 1):
                         continue
-                    if action == 'Undo' and self.prevdf is None:
+                    if action == 'Undo' and not self.undostack.can_undo():
+                        continue
+                    if action == 'Redo' and not self.undostack.can_redo():
                         continue
                     else:
                         popupmenu.add_command(label=action, command=defaultactions[action])
@@ -2689,19 +2780,20 @@ class Table(Canvas):
     def fillDown(self, rowlist, collist):
         """Fill down a column, or multiple columns"""
 
-        self.storeCurrent()
+        self.storeCurrent(cols=collist, rows=rowlist)
         df = self.model.df
         val = df.iloc[rowlist[0],collist[0]]
         #remove first element as we don't want to overwrite it
         rowlist.remove(rowlist[0])
         df.iloc[rowlist,collist] = val
+        self.model.dataChanged(list(df.columns[collist]))  # [NG] added
         self.redraw()
         return
 
     def fillAcross(self, collist, rowlist):
         """Fill across a row, or multiple rows"""
 
-        self.storeCurrent()
+        self.storeCurrent(cols=collist, rows=rowlist)
         model = self.model
         frstcol = collist[0]
         collist.remove(frstcol)
@@ -2813,8 +2905,8 @@ class Table(Canvas):
     #--- Drawing stuff ---
 
     def drawGrid(self, startrow, endrow):
-        """Draw the table grid lines"""
-        self.delete('gridline','text')
+        """Draw the table grid lines, [NG] of the visible columns only,
+        moving the lines of the last redraw"""
         rows=len(self.rowrange)
         cols=self.cols
         w = self.cellwidth
@@ -2823,16 +2915,26 @@ class Table(Canvas):
         y_start=self.y_start
         x_pos=x_start
 
+        if self.visiblecols:
+            visible = range(self.visiblecols[0], self.visiblecols[-1]+2)
+        else:
+            visible = range(cols+1)
+        self.linepool.begin('gridline',
+                            keys=set([('col', col) for col in visible] +
+                                     [('row', row) for row in range(startrow, endrow+1)]))
         if self.vertlines==1:
-            for col in range(cols+1):
+            for col in visible:
                 x=self.col_positions[col]
-                self.create_line(x,y_start,x,y_start+rows*h, tag='gridline',
-                                     fill=self.grid_color, width=self.linewidth)
+                self.linepool.draw((x,y_start,x,y_start+rows*h), tags=('gridline',),
+                                     fill=self.grid_color, width=self.linewidth,
+                                     key=('col', col))
         if self.horizlines==1:
             for row in range(startrow, endrow+1):
                 y_pos=y_start+row*h
-                self.create_line(x_start,y_pos,self.tablewidth,y_pos, tag='gridline',
-                                    fill=self.grid_color, width=self.linewidth)
+                self.linepool.draw((x_start,y_pos,self.tablewidth,y_pos), tags=('gridline',),
+                                    fill=self.grid_color, width=self.linewidth,
+                                    key=('row', row))
+        self.linepool.end()
         return
 
     def drawRowHeader(self):
@@ -2905,8 +3007,14 @@ class Table(Canvas):
         """Callback for cell entry"""
 
         value = self.cellentryvar.get()
+        self.storeCurrent(cols=[col], rows=[row])  # [NG] edits can be undone
         self.model.setValueAt(value,row,col)
         self.drawText(row, col, value, align=self.align)
+        # [NG] formula columns reading the edited column follow it
+        if hasattr(self, 'recalculatevar') and self.recalculatevar.get() == 1:
+            colname = self.model.getColumnName(col)
+            if self.formulaengine.get_downstream([colname]):
+                self.recalculateFunctions(changed=[colname])
         self.delete('entry')
         self.gotonextCell()
         return
@@ -2955,10 +3063,22 @@ class Table(Canvas):
             return 1
         return 1
 
-    def drawText(self, row, col, celltxt, align=None):
-        """Draw the text inside a cell area"""
+    def getCharWidths(self):
+        """[NG] Character widths of the table font, measured once"""
 
-        self.delete('celltext'+str(col)+'_'+str(row))
+        if self.charwidths is None or self.charwidthsfont != self.thefont:
+            self.charwidths = CharWidths(font.Font(font=self.thefont).measure)
+            self.charwidthsfont = self.thefont
+            self.cellformatter.clear()
+        return self.charwidths
+
+    def drawText(self, row, col, celltxt, align=None, fitted=False,
+                 pool=None):
+        """Draw the text inside a cell area, fitted text is already cut
+        to the cell width, a pool reuses its text items [NG]"""
+
+        if pool is None:  # [NG] added
+            self.delete('celltext'+str(col)+'_'+str(row))
         h = self.rowheight
         x1,y1,x2,y2 = self.getCellCoords(row,col)
         w=x2-x1
@@ -2985,10 +3105,16 @@ class Table(Canvas):
         elif align == 'e':
             x1 = x1+w/2-pad
 
-        tw,newlength = util.getTextLength(celltxt, w-pad, font=self.thefont)
+        if not fitted:  # [NG] added
+            tw,newlength = util.getTextLength(celltxt, w-pad, font=self.thefont)
+            celltxt = celltxt[0:int(newlength)]
         width=0
-        celltxt = celltxt[0:int(newlength)]
         y=y1+h/2
+        if pool is not None:  # [NG] added
+            pool.draw((x1+w/2,y), text=celltxt, font=self.thefont,
+                      anchor=align, tags=('text','celltext'+str(col)+'_'+str(row)),
+                      key=(row, col))
+            return
         rect = self.create_text(x1+w/2,y,
                                   text=celltxt,
                                   fill=fgcolor,
@@ -3022,7 +3148,7 @@ class Table(Canvas):
             color = self.colselectedcolor
         if delete == 1:
             self.delete(tag)
-        if len(self.model.df.columns) == 0:
+        if len(self.model.frame.columns) == 0:  # [NG] frame
             return
         if col == None:
             col = self.currentcol
@@ -3043,7 +3169,7 @@ class Table(Canvas):
         self.delete('rowrect')
         cols = self.visiblecols
         for col in cols:
-            colname = self.model.df.columns[col]
+            colname = self.model.frame.columns[col]  # [NG] frame
             #if col is colored we darken it
             if colname in self.columncolors:
                 clr = self.columncolors[colname]
@@ -3655,21 +3781,25 @@ class statusBar(Frame):
         l.pack(fill=X, side=LEFT)
         Label(self,text='rows x',font=sfont,foreground=clr).pack(side=LEFT)
         self.colsvar = StringVar()
-        self.colsvar.set(len(self.parentapp.model.df))
+        self.colsvar.set(len(self.parentapp.model.frame))  # [NG] frame
         l=Label(self,textvariable=self.colsvar,font=sfont,foreground=clr)
         l.pack(fill=X, side=LEFT)
         Label(self,text='columns',font=sfont,foreground=clr).pack(side=LEFT)
         self.filenamevar = StringVar()
         l=Label(self,textvariable=self.filenamevar,font=sfont)
         l.pack(fill=X, side=RIGHT)
+        # [NG] added progress of background jobs
+        self.progressvar = StringVar()
+        l=Label(self,textvariable=self.progressvar,font=sfont)
+        l.pack(fill=X, side=RIGHT)
         return
 
     def update(self):
         """Update status bar"""
 
         model = self.parentapp.model
-        self.rowsvar.set(len(model.df))
-        self.colsvar.set(len(model.df.columns))
+        self.rowsvar.set(len(model.frame))  # [NG] frame
+        self.colsvar.set(len(model.frame.columns))  # [NG] frame
         if self.parentapp.filename != None:
             self.filenamevar.set(self.parentapp.filename)
         return
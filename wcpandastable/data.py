@@ -27,12 +27,19 @@ from types import *
 import operator
 import os, string, types, copy
 import pickle
+import itertools
 import numpy as np
 import pandas as pd
 from . import util
 
 # [NG] imports
 from modeloptions import ModelOption
+from pagedframe import PagedFrame
+from columnwidths import ColumnWidthEstimator
+
+# [NG] data versions, unique across all models so a version number never
+# refers to two different frames, see TableModel.dataChanged
+_data_versions = itertools.count(1)
 
 
 class TableModel(object):
@@ -42,6 +49,12 @@ class TableModel(object):
 
     def __init__(self, dataframe=None, rows=20, columns=5):
         """Constructor"""
+        self.table_version = 0  # [NG] added
+        self.data_version = 0  # [NG] added
+        self.column_versions = {}  # [NG] added
+        self._frame = None  # [NG] added, see frame
+        self._unfiltered = None  # [NG] added, see setRowFilter
+        self.widthestimator = ColumnWidthEstimator()  # [NG] added
         self.initialiseFields()
         self.setup(dataframe, rows, columns)
         print('\npandastable data reviewed')
@@ -51,15 +64,105 @@ class TableModel(object):
         self.nominal_ordinal = {}  # [NG] added
         return
 
+    # [NG] every assignment of a new frame counts as a change to all columns
+    @property
+    def df(self):
+        if self._frame is not None:
+            self.materialize()
+        return self._df
+
+    @df.setter
+    def df(self, df):
+        self._df = df
+        self._frame = None
+        self.dataChanged()
+
+    @property
+    def frame(self):
+        """[NG] The frame shown, a PagedFrame while the table is lazy.
+        Drawing the table and reading single columns (iloc[:, i]) go
+        through it and never load the whole table, anything else uses df,
+        which loads it first."""
+
+        if self._frame is not None:
+            return self._frame
+        return self._df
+
+    def isLazy(self):
+        """[NG] True while the rows are read from a PagedFrame"""
+
+        return self._frame is not None
+
+    def materialize(self):
+        """[NG] Load every row of a lazy table, the data itself does not
+        change so the data versions are kept"""
+
+        if self._frame is not None:
+            self._df = self._frame.materialize()
+            self._frame = None
+            self.reclist = self._df.index
+        return
+
+    def setRowFilter(self, rows):
+        """[NG] Show only the rows at positions rows of the whole table,
+        kept as it is, with its data versions, until clearRowFilter"""
+
+        if self._unfiltered is None:
+            self._unfiltered = (self.df, self.table_version,
+                                dict(self.column_versions))
+        self.df = self._unfiltered[0].take(rows)
+        return
+
+    def clearRowFilter(self):
+        """[NG] Show the whole table again; the caches keyed on its data
+        versions are still good as it did not change"""
+
+        if self._unfiltered is None:
+            return
+        self._df, self.table_version, self.column_versions = self._unfiltered
+        self._frame = None
+        self._unfiltered = None
+        self.data_version = next(_data_versions)
+        self.reclist = self._df.index
+        return
+
+    def isFiltered(self):
+        """[NG] True while setRowFilter hides rows"""
+
+        return self._unfiltered is not None
+
+    def dataChanged(self, colnames=None):
+        """[NG] Record a change to the data, to all columns unless colnames
+        is given. Cached column profiles are keyed on these versions."""
+
+        version = next(_data_versions)
+        if colnames is None:
+            self.table_version = version
+            self.column_versions = {}
+        else:
+            for colname in colnames:
+                self.column_versions[colname] = version
+        self.data_version = version
+        return
+
+    def getColumnVersion(self, colname):
+        """[NG] Version of the data in a column"""
+
+        return max(self.table_version, self.column_versions.get(colname, 0))
+
     def setup(self, dataframe, rows=20, columns=5):
         """Create table model"""
-        if not dataframe is None:
+        if isinstance(dataframe, PagedFrame):  # [NG] added, lazy table
+            self._df = None
+            self._frame = dataframe
+            self.dataChanged()
+        elif not dataframe is None:
             self.df = dataframe
         else:
             colnames = list(string.ascii_lowercase[:columns])
             self.df = pd.DataFrame(index=range(rows),columns=colnames)
             #self.df = self.getSampleData()
-        self.reclist = self.df.index # not needed now?
+        self.reclist = self.frame.index # not needed now?
         return
 
     @classmethod
@@ -132,20 +235,13 @@ class TableModel(object):
         return
 
     def getlongestEntry(self, colindex):
-        """Get the longest string in the column for determining width"""
+        """Get the longest string in the column for determining width,
+        [NG] estimated from a sample of the rows, see columnwidths.py"""
 
-        df = self.df
-        col = df.columns[colindex]
         try:
-            if df.dtypes[col] == 'float64':
-                c = df[col].round(3)
-            else:
-                c = df[col]
+            longest = self.widthestimator.get_longest(self, colindex)
         except:
             return 1
-        longest = c.astype('object').astype('str').str.len().max()
-        if np.isnan(longest):
-            return 1
         return longest
 
     def getRecordAtRow(self, rowIndex):
@@ -197,6 +293,7 @@ class TableModel(object):
 
         df = self.df
         df.drop(df.index[rowindex],inplace=True)
+        self.dataChanged()  # [NG] added
         return
 
     def deleteRows(self, rowlist=None):
@@ -204,6 +301,7 @@ class TableModel(object):
 
         df = self.df
         df.drop(df.index[rowlist],inplace=True)
+        self.dataChanged()  # [NG] added
         return
 
     def addColumn(self, colname=None, dtype=None, data=None):
@@ -224,6 +322,7 @@ class TableModel(object):
         if data is None:
             data = pd.Series(dtype=dtype)
         self.df[colname] = data
+        self.dataChanged([colname])  # [NG] added
 
         # [NG] added 3 lines below
         self.available_to_model[max(list(self.available_to_model)) + 1] = 'No'
@@ -244,6 +343,7 @@ class TableModel(object):
         df = self.df
         colname = df.columns[colindex]
         df.drop([colname], axis=1, inplace=True)
+        self.dataChanged([colname])  # [NG] added
         return
 
     def deleteColumns(self, cols=None):
@@ -252,10 +352,12 @@ class TableModel(object):
         df = self.df
         colnames = df.columns[cols]
         df.drop(colnames, axis=1, inplace=True)
+        self.dataChanged(colnames)  # [NG] added
         return
 
     def deleteCells(self, rows, cols):
         self.df.iloc[rows,cols] = np.nan
+        self.dataChanged(self.df.columns[cols])  # [NG] added
         return
 
     def resetIndex(self):
@@ -267,6 +369,7 @@ class TableModel(object):
         else:
             drop = True
         df.reset_index(drop=drop,inplace=True)
+        self.dataChanged()  # [NG] added
         return
 
     def setindex(self, colindex):
@@ -278,6 +381,7 @@ class TableModel(object):
         if indnames[0] != None:
             df.reset_index(inplace=True)
         df.set_index(colnames, inplace=True)
+        self.dataChanged()  # [NG] added
         return
 
     def copyIndex(self):
@@ -287,6 +391,7 @@ class TableModel(object):
         name = df.index.name
         if name == None: name='index'
         df[name] = df.index#.astype('object')
+        self.dataChanged([name])  # [NG] added
         return
 
     def groupby(self, cols):
@@ -299,16 +404,16 @@ class TableModel(object):
 
     def getColumnType(self, columnIndex):
         """Get the column type"""
-        coltype = self.df.dtypes[columnIndex]
+        coltype = self.frame.dtypes.iloc[columnIndex]  # [NG] frame
         return coltype
 
     def getColumnCount(self):
          """Returns the number of columns in the data model"""
-         return len(self.df.columns)
+         return len(self.frame.columns)  # [NG] frame
 
     def getColumnName(self, columnIndex):
          """Returns the name of the given column by columnIndex"""
-         return str(self.df.columns[columnIndex])
+         return str(self.frame.columns[columnIndex])  # [NG] frame
 
     def getColumnData(self, columnIndex=None, columnName=None,
                         filters=None):
@@ -350,8 +455,7 @@ class TableModel(object):
          """Returns the cell value at location specified
              by columnIndex and rowIndex."""
 
-         df = self.df
-         value = self.df.iloc[rowindex,colindex]
+         value = self.frame.iloc[rowindex,colindex]  # [NG] frame
          if type(value) is float and np.isnan(value):
              return ''
          return value
@@ -372,6 +476,8 @@ class TableModel(object):
                 value = pd.to_datetime(value)
         except Exception as e:
             print (e)
+        colname = self.df.columns[colindex]  # [NG] added
+        oldversion = self.getColumnVersion(colname)  # [NG] added
         self.df.iloc[rowindex,colindex] = value
 
         # [NG] this code below forces the entire column to its original
@@ -386,6 +492,10 @@ class TableModel(object):
 
             self.df.iloc[:, colindex] = pd.to_numeric(df.iloc[:, colindex])
 
+        self.dataChanged([colname])  # [NG] added
+        # [NG] an edit only grows the column's width estimate
+        self.widthestimator.update(colindex, colname, oldversion,
+                                   self.getColumnVersion(colname), value)
         return
 
     def transpose(self):
@@ -417,7 +527,7 @@ class TableModel(object):
         return
 
     def __repr__(self):
-        return 'Table Model with %s rows' %len(self.df)
+        return 'Table Model with %s rows' %len(self.frame)
 
     # [NG] added
     def update_model_option_available_to_model(self, var):
@@ -47,6 +47,10 @@ import pandas as pd
 from .data import TableModel
 from . import util, images
 
+# [NG] imports
+from backgroundjobs import BackgroundJob
+from csvingest import CSVIngest, read_preview
+
 def getParentGeometry(parent):
     x = parent.winfo_rootx()
     y = parent.winfo_rooty()
@@ -371,7 +375,7 @@ class ImportDialog(Frame):
         grps = {'formats':['delimiter','decimal','comment'],
                 'data':['header','skiprows','index_col','skipinitialspace',
                         'skip_blank_lines','parse_dates','encoding','names'],
-                'other':['rowsperfile']}
+                'other':['rowsperfile','usecols','compact']}  # [NG] added usecols, compact
         grps = OrderedDict(sorted(grps.items()))
         opts = self.opts = {'delimiter':{'type':'combobox','default':',',
                         'items':delimiters, 'tooltip':'seperator'},
@@ -395,8 +399,13 @@ class ImportDialog(Frame):
                                 'tooltip':'file encoding'},
                      #'prefix':{'type':'entry','default':None,'label':'prefix',
                      #           'tooltip':''}
-                     'rowsperfile':{'type':'entry','default':'','label':'rows per file',
-                                'tooltip':'rows to read'},
+                     # [NG] rows per chunk of the chunked import
+                     'rowsperfile':{'type':'entry','default':'','label':'rows per chunk',
+                                'tooltip':'rows parsed per chunk'},
+                     'usecols':{'type':'entry','default':'','label':'columns',
+                                'tooltip':'comma separated columns to read'},
+                     'compact':{'type':'checkbutton','default':1,'label':'compact dtypes',
+                                'tooltip':'read repeated text as category'},
                      'names':{'type':'entry','default':'','label':'column names',
                                 'tooltip':'col labels'},
                      }
@@ -422,17 +431,21 @@ class ImportDialog(Frame):
         b.pack(side=TOP,fill=X,pady=2)
         b = Button(bf, text="Cancel", command=self.quit)
         b.pack(side=TOP,fill=X,pady=2)
+        # [NG] bytes read by the import
+        self.importjob = None
+        self.progressbar = Progressbar(bf, orient='horizontal', mode='determinate')
+        self.progressbar.pack(side=TOP,fill=X,pady=2)
         self.main.wait_window()
         return
 
     def showText(self):
         """show text contents"""
 
-        with open(self.filename, 'r') as stream:
-            try:
-                text = stream.read()
-            except:
-                text = 'failed to preview, check encoding and then update preview'
+        # [NG] only the first KB of the file
+        try:
+            text = read_preview(self.filename, self.kwds.get('encoding'))
+        except:
+            text = 'failed to preview, check encoding and then update preview'
         self.textpreview.delete('1.0', END)
         self.textpreview.insert('1.0', text)
         return
@@ -441,7 +454,7 @@ class ImportDialog(Frame):
         """Reload previews"""
 
         kwds = {}
-        other = ['rowsperfile']
+        other = ['rowsperfile','compact']  # [NG] added compact
         for i in self.opts:
             if i in other:
                 continue
@@ -459,6 +472,10 @@ class ImportDialog(Frame):
                 except:
                     pass
             kwds[i] = val
+        # [NG] usecols as a list of names or positions
+        if kwds.get('usecols') is not None:
+            kwds['usecols'] = [int(c) if c.strip().isdigit() else c.strip()
+                               for c in str(kwds['usecols']).split(',')]
         self.kwds = kwds
 
         self.showText()
@@ -483,15 +500,40 @@ class ImportDialog(Frame):
     def doImport(self):
         """Do the import"""
 
-        '''pw = Toplevel(self.main)
-        pb = Progressbar(pw, orient='horizontal', mode='indeterminate')
-        pb.pack(expand=True, fill=BOTH, side=TOP)
-        pb.start(500)'''
-        self.df = pd.read_csv(self.filename, **self.kwds)
-        self.quit()
+        # [NG] chunked, parallel import on a worker thread
+        if self.importjob is not None and not self.importjob.finished:
+            return
+        try:
+            rows = int(self.tkvars['rowsperfile'].get())
+        except ValueError:
+            rows = None
+        ingest = CSVIngest(self.filename, self.kwds, rows_per_chunk=rows,
+                           compact=bool(self.tkvars['compact'].get()))
+
+        def read(job):
+            return ingest.read(on_progress=job.report,
+                               check_cancelled=job.check_cancelled)
+
+        def on_progress(done, total, message):
+            self.progressbar.config(maximum=total, value=done)
+
+        def on_done(df):
+            self.df = df
+            self.quit()
+
+        def on_error(e):
+            self.progressbar.config(value=0)
+            messagebox.showerror('Import', str(e), parent=self.main)
+
+        self.importjob = BackgroundJob(self.main, read,
+                                       on_progress=on_progress,
+                                       on_done=on_done,
+                                       on_error=on_error).start()
         return
 
     def quit(self):
+        if self.importjob is not None:
+            self.importjob.cancel()  # [NG] stop a running import
         self.main.destroy()
         return
 
@@ -959,35 +1001,28 @@ class QueryDialog(Frame):
         table = self.table
         s = self.queryvar.get()
 
+        # [NG] the query runs on the whole table through the table's
+        # QueryEngine, which keeps the masks of earlier runs, and gives
+        # row positions instead of a filtered copy
         if table.filtered == True:
-            table.model.df = table.dataframe
-        df = table.model.df
-        mask = None
-
-        #string query first
-        if s!='':
-            mask = df.eval(s)
-        #add any filters from widgets
-        if len(self.filters)>0:
-            mask = self.applyFilter(df, mask)
-        if mask is None:
+            table.model.clearRowFilter()
+        filters = [f.getFilter() for f in self.filters]
+        rows = table.queryengine.query(table.model, s, filters)
+        if rows is None:
             table.showAll()
             self.queryresultvar.set('')
             return
-        #apply the final mask
-        filtdf = df[mask]
-        self.queryresultvar.set('%s rows found' %len(filtdf))
+        self.queryresultvar.set('%s rows found' %len(rows))
 
         if self.applyqueryvar.get() == 1:
-            #replace current dataframe but keep a copy!
-            table.dataframe = table.model.df.copy()
+            #show the matching rows, the whole table is kept by the model
             table.delete('rowrect')
             table.multiplerowlist = []
-            table.model.df = filtdf
+            table.model.setRowFilter(rows)
             table.filtered = True
         else:
-            idx = filtdf.index
-            rows = table.multiplerowlist = table.getRowsFromIndex(idx)
+            table.filtered = False
+            rows = table.multiplerowlist = rows.tolist()
             if len(rows)>0:
                 table.currentrow = rows[0]
 
@@ -997,57 +1032,12 @@ class QueryDialog(Frame):
     def addFilter(self):
         """Add a filter using widgets"""
 
-        df = self.table.model.df
+        df = self.table.model.frame  # [NG] columns only, no need to load
         fb = FilterBar(self, self.fbar, list(df.columns))
         fb.pack(side=TOP, fill=BOTH, padx=2, pady=2)
         self.filters.append(fb)
         return
 
-    def applyFilter(self, df, mask=None):
-        """Apply the widget based filters, returns a boolean mask"""
-
-        if mask is None:
-            mask = df.index==df.index
-
-        for f in self.filters:
-            col, val, op, b = f.getFilter()
-            try:
-                val = float(val)
-            except:
-                pass
-            #print (col, val, op, b)
-            if op == 'contains':
-                m = df[col].str.contains(val)
-            elif op == 'equals':
-                m = df[col]==val
-            elif op == 'not equals':
-                m = df[col]!=val
-            elif op == '>':
-                m = df[col]>val
-            elif op == '<':
-                m = df[col]<val
-            elif op == 'excludes':
-                m = -df[col].str.contains(val)
-            elif op == 'starts with':
-                m = df[col].str.startswith(val)
-            elif op == 'has length':
-                m = df[col].str.len()>val
-            elif op == 'is number':
-                m = df[col].astype('object').str.isnumeric()
-            elif op == 'is lowercase':
-                m = df[col].astype('object').str.islower()
-            elif op == 'is uppercase':
-                m = df[col].astype('object').str.isupper()
-            else:
-                continue
-            if b == 'AND':
-                mask = mask & m
-            elif b == 'OR':
-                mask = mask | m
-            elif b == 'NOT':
-                mask = mask ^ m
-        return mask
-
 class FilterBar(Frame):
     """Class providing filter widgets"""
 
@@ -36,6 +36,9 @@ import pandas as pd
 from . import util
 from .dialogs import *
 
+# [NG] imports
+from canvaspool import ItemPool
+
 class ColumnHeader(Canvas):
     """Class that takes it's size and rendering from a parent table
         and column names from the table model."""
@@ -47,13 +50,16 @@ class ColumnHeader(Canvas):
         if table != None:
             self.table = table
             self.model = self.table.model
-            if util.check_multiindex(self.model.df.columns) == 1:
+            if util.check_multiindex(self.model.frame.columns) == 1:  # [NG] frame
                 self.height = 40
             else:
                 self.height = 20
             self.config(width=self.table.width, height=self.height)
-            self.columnlabels = self.model.df.columns
+            self.columnlabels = self.model.frame.columns  # [NG] frame
             self.draggedcol = None
+            # [NG] header lines and text are reused from redraw to redraw
+            self.linepool = ItemPool(self, 'line')
+            self.textpool = ItemPool(self, 'text', fill='black')
             self.bind('<Button-1>',self.handle_left_click)
             self.bind("<ButtonRelease-1>", self.handle_left_release)
             self.bind('<B1-Motion>', self.handle_mouse_drag)
@@ -80,13 +86,14 @@ class ColumnHeader(Canvas):
     def redraw(self):
         """Redraw column header"""
 
-        df = self.model.df
+        df = self.model.frame  # [NG] frame
         cols = self.model.getColumnCount()
         self.tablewidth=self.table.tablewidth
         self.configure(scrollregion=(0,0,
                                      self.table.tablewidth+self.table.x_start,
                                      self.height))
-        self.delete('gridline','text')
+        self.linepool.begin('gridline')  # [NG] pooled lines and text
+        self.textpool.begin('text')
         self.delete('rect')
         self.delete('dragrect')
         self.atdivider = None
@@ -98,6 +105,8 @@ class ColumnHeader(Canvas):
         y = h/2
         x_start = self.table.x_start
         if cols == 0:
+            self.linepool.end()
+            self.textpool.end()
             return
 
         for col in self.table.visiblecols:
@@ -117,7 +126,7 @@ class ColumnHeader(Canvas):
             elif align == 'center':
                 xt = x-w/2
 
-            if util.check_multiindex(self.model.df.columns) == 1:
+            if util.check_multiindex(self.model.frame.columns) == 1:  # [NG] frame
                 if isinstance(colname, tuple):
                     lens = [util.getTextLength(c, w-pad, font=font)[1] for c in colname]
                     colname = [str(c)[:l] for c,l in zip(colname,lens)]
@@ -133,18 +142,19 @@ class ColumnHeader(Canvas):
                 colname = colname[0:int(length)]
 
             # [NG] fill changed from 'white' to '#D4D4D4' (212,212,212)
-            line = self.create_line(x, 0, x, h, tag=('gridline', 'vertline'),
+            line = self.linepool.draw((x, 0, x, h), tags=('gridline', 'vertline'),
                                  fill='#D4D4D4', width=1)
             # [NG] fill changed from 'white' to 'black' (0,0,0)
-            self.create_text(xt,y,
+            self.textpool.draw((xt,y),
                                 text=colname,
-                                fill='black',
                                 font=self.thefont,
-                                tag='text', anchor=align)
+                                tags=('text',), anchor=align)
         x = self.table.col_positions[col+1]
         # [NG] fill changed from 'white' to '#D4D4D4' (212,212,212)
-        self.create_line(x,0, x,h, tag='gridline',
+        self.linepool.draw((x,0, x,h), tags=('gridline',),
                         fill='#D4D4D4', width=2)
+        self.linepool.end()
+        self.textpool.end()
         return
 
     def handle_left_click(self,event):
@@ -183,7 +193,7 @@ class ColumnHeader(Canvas):
         self.table.write_text_to_db(table_name='TopAreaItems',
                                     item_name='selected_column_name',
                                     item_value=self.model.
-                                    df.columns[self.table.currentcol])
+                                    frame.columns[self.table.currentcol])
         return
 
     def handle_left_release(self,event):
@@ -271,7 +281,7 @@ class ColumnHeader(Canvas):
     def handle_mouse_move(self, event):
         """Handle mouse moved in header, if near divider draw resize symbol"""
 
-        if len(self.model.df.columns) == 0:
+        if len(self.model.frame.columns) == 0:  # [NG] frame
             return
         self.delete('resizesymbol')
         w=self.table.cellwidth
@@ -344,7 +354,7 @@ class ColumnHeader(Canvas):
     def popupMenu(self, event):
         """Add left and right click behaviour for column header"""
 
-        df = self.table.model.df
+        df = self.table.model.frame  # [NG] frame
         if len(df.columns)==0:
             return
         ismulti = util.check_multiindex(df.columns)
@@ -398,6 +408,9 @@ class ColumnHeader(Canvas):
             else:
 
                 df.rename(columns={df.columns[col]: new}, inplace=True)
+                # [NG] caches keyed on column names and versions must not
+                # [NG] find the old column under its name
+                self.model.dataChanged([name, new])
                 self.redraw()
         return
 
@@ -466,6 +479,9 @@ class RowHeader(Canvas):
             self.config(height = self.table.height)
             self.startrow = self.endrow = None
             self.model = self.table.model
+            # [NG] row rectangles and text are reused from redraw to redraw
+            self.rectpool = ItemPool(self, 'rectangle')
+            self.textpool = ItemPool(self, 'text', fill='black')
             self.bind('<Button-1>',self.handle_left_click)
             self.bind("<ButtonRelease-1>", self.handle_left_release)
             self.bind("<Control-Button-1>", self.handle_left_ctrl_click)
@@ -479,18 +495,24 @@ class RowHeader(Canvas):
 
         self.height = self.table.rowheight * self.table.rows+10
         self.configure(scrollregion=(0,0, self.width, self.height))
-        self.delete('rowheader','text')
         self.delete('rect')
 
         xstart = 1
         pad = 5
         maxw = self.maxwidth
         v = self.table.visiblerows
+        # [NG] pooled rectangles and text, kept per row while in view
+        keys = set((i, r) for i in range(len(self.model.frame.index.names))
+                   for r in v)
+        self.rectpool.begin('rowheader', keys=keys)
+        self.textpool.begin('text', keys=keys)
         if len(v) == 0:
+            self.rectpool.end()
+            self.textpool.end()
             return
         scale = self.table.getScale()
         h = self.table.rowheight
-        index = self.model.df.index
+        index = self.model.frame.index  # [NG] frame
         names = index.names
 
         if self.showindex == True:
@@ -537,13 +559,15 @@ class RowHeader(Canvas):
                 text = row
                 x1,y1,x2,y2 = self.table.getCellCoords(r,0)
                 # [NG] outline changed from 'white' to '#D4D4D4' (212,212,212)
-                self.create_rectangle(x,y1,w-1,y2, fill=self.color,
+                self.rectpool.draw((x,y1,w-1,y2), fill=self.color,
                                         outline='#D4D4D4', width=1,
-                                        tag='rowheader')
-                self.create_text(x+pad,y1+h/2, text=text,
-                                  fill='black', font=self.table.thefont,
-                                  tag='text', anchor=align)
+                                        tags=('rowheader',), key=(i-1, r))
+                self.textpool.draw((x+pad,y1+h/2), text=text,
+                                  font=self.table.thefont,
+                                  tags=('text',), anchor=align, key=(i-1, r))
                 r+=1
+        self.rectpool.end()
+        self.textpool.end()
         return
 
     def setWidth(self, w):
@@ -740,7 +764,7 @@ class IndexHeader(Canvas):
         pad = 5
         scale = self.table.getScale()
         h = self.table.rowheight
-        index = self.model.df.index
+        index = self.model.frame.index  # [NG] frame
         names = index.names
         if names[0] == None:
             widths = [self.width]
@@ -42,6 +42,11 @@ import operator
 from .dialogs import *
 from . import util, images
 
+# [NG] imports
+from global_config import g
+from decimation import DecimatedHexbin, DecimatedLines, decimate_indices
+from decimation import get_axes_pixels
+
 colormaps = sorted(m for m in plt.cm.datad if not m.endswith("_r"))
 
 class PlotViewer(Frame):
@@ -72,6 +77,7 @@ class PlotViewer(Frame):
         self.layoutopts = PlotLayoutOptions(parent=self)
 
         self.gridaxes = {}
+        self.decimators = []  # [NG] decimated lines and scatters, by axes
         #reset style if it been set globally
         self.style = None
         self.setupGUI()
@@ -268,6 +274,11 @@ class PlotViewer(Frame):
             self.gridaxes[name] = self.ax
             #update the axes widget
             self.layoutopts.updateAxesList()
+        # [NG] forget the decimated plots of removed axes
+        for d in self.decimators:
+            if d.ax not in self.fig.axes:
+                d.disconnect()
+        self.decimators = [d for d in self.decimators if d.ax in self.fig.axes]
         return
 
     def removeSubplot(self):
@@ -660,10 +671,57 @@ class PlotViewer(Frame):
             if kind == 'barh':
                 kwargs['xerr']=yerr
                 yerr=None
+            # [NG] long lines are drawn from the points that show at the
+            # [NG] width of the axes, see decimation.py
+            full = None
+            if kind == 'line' and yerr is None and \
+                    len(data) > g.plot_decimate_min_points:
+                data, full = self.decimateLines(data, ax)
             axs = data.plot(ax=ax, layout=layout, yerr=yerr, style=styles, cmap=cmap,
                              **kwargs)
+            if full is not None and not kwargs.get('subplots'):
+                self.trackLines(ax, full)
         return axs
 
+    def decimateLines(self, data, ax):
+        """[NG] The rows of data needed to draw its columns as lines the
+        width of ax, and data sorted by x; data as it is if its index is
+        not numbers or dates, pandas plots those in row order"""
+
+        kind = data.index.dtype.kind
+        if kind not in 'iufM':
+            return data, None
+        data = data.sort_index()
+        if kind == 'M':
+            x = data.index.asi8.astype(np.float64)
+        else:
+            x = data.index.to_numpy(dtype=np.float64)
+        pixels = get_axes_pixels(ax)[0]
+        rows = [decimate_indices(x, data[c].to_numpy(dtype=np.float64), pixels)
+                for c in data.columns
+                if data[c].dtype.kind in 'iufb']
+        if len(rows) == 0:
+            return data, None
+        rows = np.unique(np.concatenate(rows))
+        return data.iloc[rows], data
+
+    def trackLines(self, ax, data):
+        """[NG] Decimate the lines of data on ax again when zoomed or
+        panned, for numeric x only"""
+
+        if data.index.dtype.kind not in 'iuf':
+            return
+        cols = [c for c in data.columns if data[c].dtype.kind in 'iufb']
+        lines = ax.get_lines()[-len(cols):]
+        if len(lines) != len(cols):
+            return
+        x = data.index.to_numpy(dtype=np.float64)
+        d = DecimatedLines(ax)
+        for line, c in zip(lines, cols):
+            d.add(line, x, data[c].to_numpy(dtype=np.float64))
+        self.decimators.append(d)
+        return
+
     def scatter(self, df, ax, alpha=0.8, marker='o', color=None, **kwds):
         """A custom scatter plot rather than the pandas one. By default this
         plots the first column selected versus the others"""
@@ -725,9 +783,30 @@ class PlotViewer(Frame):
             if kwds['subplots'] == 1:
                 ax = self.fig.add_subplot(nrows,ncols,i)
             ms = kwds['ms'] * 12
-            sc = ax.scatter(x, y, marker=marker, alpha=alpha, linewidth=lw, c=c,
-                       s=ms, edgecolors=ec, facecolor=clr, cmap=colormap,
-                       norm=norm, label=cols[i], picker=True)
+            # [NG] too many points are binned, or sampled when several
+            # [NG] series share the axes, see decimation.py
+            xs, ys, cs = x, y, c
+            if len(x) > g.plot_hexbin_min_points and \
+                    (plots == 2 or kwds['subplots'] == 1):
+                hb = DecimatedHexbin(ax, x, y,
+                                     c=c if isinstance(c, pd.Series) else None,
+                                     cmap=colormap or kwds['colormap'],
+                                     alpha=alpha, norm=norm,
+                                     xscale='log' if kwds['logx'] == 1 else 'linear',
+                                     yscale='log' if kwds['logy'] == 1 else 'linear')
+                self.decimators.append(hb)
+                xs = None
+            elif len(x) > g.plot_scatter_max_points:
+                rng = np.random.default_rng(0)
+                sample = np.sort(rng.choice(len(x), g.plot_scatter_max_points,
+                                            replace=False))
+                xs, ys = x.iloc[sample], y.iloc[sample]
+                if isinstance(c, pd.Series):
+                    cs = c.iloc[sample]
+            if xs is not None:
+                sc = ax.scatter(xs, ys, marker=marker, alpha=alpha, linewidth=lw, c=cs,
+                           s=ms, edgecolors=ec, facecolor=clr, cmap=colormap,
+                           norm=norm, label=cols[i], picker=True)
 
             #create proxy artist for markers so we can return these handles if needed
             mkr = Line2D([0], [0], marker=marker, alpha=alpha, ms=ms/20+5, markerfacecolor=c,
@@ -0,0 +1,97 @@
+"""
+    Warchest: Data management and automation GUI for Machine Learning projects
+    Created September 2017
+    Copyright (C) Nelson R Gonzalez
+
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+import os
+import shutil
+import tempfile
+import unittest
+import numpy as np
+import pandas as pd
+from csvingest import CSVIngest
+from global_config import g
+
+
+def get_frame(rows=300):
+
+    mixed = [str(i) for i in range(rows)]
+    mixed[rows - 50] = 'x'
+    return pd.DataFrame({'a': mixed,
+                         'b': np.arange(rows),
+                         'c': np.array(['ant', 'bee', 'cat'])[
+                             np.arange(rows) % 3],
+                         'd': np.linspace(0, 1, rows)})
+
+
+class CSVIngestTests(unittest.TestCase):
+    """Chunked reads give the frame a single read_csv gives, with the
+       text dtype of the pandas in use"""
+
+    infer_string = False
+
+    def setUp(self):
+
+        self.sample_rows = g.import_sample_rows
+        g.import_sample_rows = 20
+        self.dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.dir, 'data.csv')
+        get_frame().to_csv(self.path, index=False)
+        self.context = pd.option_context('future.infer_string',
+                                         self.infer_string)
+        self.context.__enter__()
+
+    def tearDown(self):
+
+        self.context.__exit__(None, None, None)
+        g.import_sample_rows = self.sample_rows
+        shutil.rmtree(self.dir)
+
+    def read(self, split):
+
+        ingest = CSVIngest(self.path, rows_per_chunk=40, workers=1)
+        if not split:
+            ingest.can_split = lambda sample_bytes: False
+        return ingest, ingest.read()
+
+    def testMixedColumnAcrossChunks(self):
+        """Text in one chunk only makes the column text in all of them"""
+
+        expected = pd.read_csv(self.path)
+        for split in (True, False):
+            ingest, df = self.read(split)
+            self.assertEqual(ingest.hints, {'c': 'category'})
+            pd.testing.assert_frame_equal(
+                df, expected.astype({'c': 'category'}))
+            self.assertEqual(df['a'].dtype, expected['a'].dtype)
+
+    def testUncompacted(self):
+
+        ingest = CSVIngest(self.path, rows_per_chunk=40, workers=1,
+                           compact=False)
+        pd.testing.assert_frame_equal(ingest.read(),
+                                      pd.read_csv(self.path))
+
+
+class InferStringTests(CSVIngestTests):
+    """The same reads with the str dtype of pandas 3"""
+
+    infer_string = True
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,159 @@
+"""
+    Warchest: Data management and automation GUI for Machine Learning projects
+    Created September 2017
+    Copyright (C) Nelson R Gonzalez
+
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+import datetime
+import json
+import os
+import pickle
+import shutil
+import tempfile
+import unittest
+import fileformats
+from fileformats import (FileFormatError, migrate_file, read_model_columns,
+                         read_transformations, write_model_columns,
+                         write_transformations)
+
+
+def get_transformation(index=0, **fields):
+
+    row = {'TransformationLogID': index + 1, 'SessionID': 1,
+           'SessionDesc': 'session', 'ColumnIndex': index,
+           'ColumnName': 'a', 'TransformationID': 1,
+           'TransformationDesc': 'setColumnType',
+           'DateCreated': '2017-09-01 00:00:00',
+           'TransformationLogDesc': 'Cast column (a) to float32.',
+           'IsReplicate': 'Yes', 'Option1': 'float32', 'Option2': None,
+           'Option3': None}
+    row.update(fields)
+    return row
+
+
+def get_model_columns():
+
+    return ({0: 'Yes', 1: 'No'}, {0: 'No', 1: 'Yes'},
+            {0: 'nominal', 1: 'ordinal'},
+            {0: 'Yes (numerical)', 1: 'No'})
+
+
+class FileFormatsTests(unittest.TestCase):
+    """Transformations and model columns files: round trips, schema
+       checks and migration of pickled files"""
+
+    def setUp(self):
+
+        self.dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+
+        shutil.rmtree(self.dir)
+
+    def path(self, name):
+
+        return os.path.join(self.dir, name)
+
+    def write_lines(self, name, lines):
+
+        with open(self.path(name), 'w', encoding='utf-8') as f:
+            f.write('\n'.join(lines) + '\n')
+        return self.path(name)
+
+    def testTransformationsRoundTrip(self):
+
+        rows = [get_transformation(0), get_transformation(1, ColumnName=7)]
+        write_transformations(self.path('t.wct'), rows)
+        read = read_transformations(self.path('t.wct'))
+        self.assertEqual(read[0], rows[0])
+        # columns of tables read without a header are numbers
+        self.assertEqual(read[1]['ColumnName'], '7')
+
+    def testModelColumnsRoundTrip(self):
+
+        write_model_columns(self.path('m.wcc'), *get_model_columns())
+        self.assertEqual(read_model_columns(self.path('m.wcc'), 2),
+                         get_model_columns())
+        with self.assertRaises(FileFormatError):
+            read_model_columns(self.path('m.wcc'), 3)
+
+    def testSchemaChecks(self):
+
+        bad = [get_transformation(Option1=1),
+               get_transformation(ColumnIndex=True),
+               get_transformation(Extra='x'),
+               {key: value for key, value in get_transformation().items()
+                if key != 'ColumnName'}]
+        for row in bad:
+            with self.assertRaises(FileFormatError):
+                write_transformations(self.path('t.wct'), [row])
+        self.assertFalse(os.path.exists(self.path('t.wct')))
+
+    def testHeaderAndRecordChecks(self):
+
+        header = '{"format": "%s", "version": %s, "count": %s}'
+        record = json.dumps(get_transformation())
+        files = {
+            'format': [header % ('other', 1, 1), record],
+            'version': [header % (fileformats.TRANSFORMATIONS_FORMAT,
+                                  fileformats.VERSION + 1, 1), record],
+            'count': [header % (fileformats.TRANSFORMATIONS_FORMAT, 1, -1)],
+            'truncated': [header % (fileformats.TRANSFORMATIONS_FORMAT,
+                                    1, 2), record],
+            'trailing': [header % (fileformats.TRANSFORMATIONS_FORMAT, 1, 1),
+                         record, record],
+            'json': [header % (fileformats.TRANSFORMATIONS_FORMAT, 1, 1),
+                     '{"ColumnIndex": '],
+        }
+        for name, lines in files.items():
+            with self.assertRaises(FileFormatError, msg=name):
+                read_transformations(self.write_lines(name + '.wct', lines))
+
+    def testMigrateLegacyFiles(self):
+
+        rows = [get_transformation(0), get_transformation(1)]
+        with open(self.path('t.wct'), 'wb') as f:
+            pickle.dump(rows, f)
+        with open(self.path('m.wcc'), 'wb') as f:
+            pickle.dump(get_model_columns(), f)
+
+        migrated = fileformats.migrate([self.dir])
+        self.assertEqual(sorted(migrated),
+                         [self.path('m.wcc'), self.path('t.wct')])
+        self.assertEqual(read_transformations(self.path('t.wct')), rows)
+        self.assertEqual(read_model_columns(self.path('m.wcc')),
+                         get_model_columns())
+        self.assertTrue(os.path.exists(self.path('t.wct.bak')))
+        # already migrated
+        self.assertFalse(migrate_file(self.path('t.wct')))
+
+    def testMigrateRejectsClasses(self):
+        """A pickle that references a class is never loaded"""
+
+        rows = [get_transformation(DateCreated=datetime.datetime(2017, 9,
+                                                                 1))]
+        with open(self.path('t.wct'), 'wb') as f:
+            pickle.dump(rows, f)
+        with self.assertRaises(FileFormatError):
+            migrate_file(self.path('t.wct'))
+        # left as it was
+        with open(self.path('t.wct'), 'rb') as f:
+            self.assertEqual(pickle.load(f), rows)
+        self.assertFalse(os.path.exists(self.path('t.wct.bak')))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,133 @@
+"""
+    Warchest: Data management and automation GUI for Machine Learning projects
+    Created September 2017
+    Copyright (C) Nelson R Gonzalez
+
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+import unittest
+import numpy as np
+import pandas as pd
+import formulas
+from formulas import FormulaEngine, get_names
+
+# the engine numexpr was found with, None if it is not installed
+NUMEXPR = formulas.ne
+
+
+def get_frame(rows=50):
+
+    return pd.DataFrame({'a': np.arange(rows, dtype='float64'),
+                         'b': np.linspace(-1, 1, rows)})
+
+
+class FormulaEngineTests(unittest.TestCase):
+    """Formula columns, evaluated with numexpr where it is installed"""
+
+    ne = NUMEXPR
+
+    def setUp(self):
+
+        formulas.ne = self.ne
+
+    def tearDown(self):
+
+        formulas.ne = NUMEXPR
+
+    def testGetNames(self):
+
+        self.assertEqual(get_names('sqrt(a) + b * 2'), ({'a', 'b'}, False))
+        self.assertEqual(get_names('a / sum(a)'), ({'a'}, True))
+
+    def testDependencyOrder(self):
+        """Formulas come after the formulas they read, whatever order
+           they were set in"""
+
+        engine = FormulaEngine()
+        engine.set_formula('e', 'd + a')
+        engine.set_formula('d', 'c * 2')
+        engine.set_formula('c', 'a + b')
+        engine.set_formula('f', 'b - 1')
+        self.assertEqual(engine.get_downstream(['a']), ['c', 'd', 'e'])
+        self.assertEqual(engine.get_downstream(['c']), ['d', 'e'])
+        self.assertEqual(engine.get_downstream(['f']), [])
+        order = engine.get_downstream()
+        self.assertEqual(sorted(order), ['c', 'd', 'e', 'f'])
+        self.assertLess(order.index('c'), order.index('d'))
+        self.assertLess(order.index('d'), order.index('e'))
+
+    def testCycleRejected(self):
+
+        engine = FormulaEngine()
+        engine.set_formula('c', 'a + 1')
+        engine.set_formula('d', 'c + 1')
+        with self.assertRaises(ValueError):
+            engine.set_formula('c', 'd * 2')
+        with self.assertRaises(ValueError):
+            engine.set_formula('a', 'a + 1')
+        self.assertEqual(engine.formulae['c'], 'a + 1')
+        self.assertNotIn('a', engine.formulae)
+        self.assertEqual(engine.get_downstream(['a']), ['c', 'd'])
+
+    def testRecalculate(self):
+
+        df = get_frame()
+        engine = FormulaEngine()
+        engine.set_formula('c', 'a + b')
+        engine.set_formula('d', 'c * 2')
+        engine.set_formula('e', 'missing + 1')
+        computed, failed = engine.recalculate(df)
+        self.assertEqual(computed, ['c', 'd'])
+        self.assertEqual(failed, ['e'])
+        np.testing.assert_allclose(df['d'], (df['a'] + df['b']) * 2)
+
+        df['a'] = -df['a']
+        computed, failed = engine.recalculate(df, ['a'], omit='d')
+        self.assertEqual(computed, ['c'])
+        np.testing.assert_allclose(df['c'], df['a'] + df['b'])
+
+    def testChunkedMatchesWhole(self):
+        """Chunks of rows give the result of the whole frame"""
+
+        df = get_frame(53)
+        ex = 'sqrt(a) + b ** 2 - abs(b)'
+        whole = FormulaEngine(chunk_rows=10 ** 9).evaluate(df, ex=ex)
+        chunked = FormulaEngine(chunk_rows=7).evaluate(df, ex=ex)
+        np.testing.assert_array_equal(chunked, whole)
+        np.testing.assert_allclose(
+            whole, np.sqrt(df['a']) + df['b'] ** 2 - np.abs(df['b']))
+
+        compared = FormulaEngine(chunk_rows=7).evaluate(df, ex='a > 10')
+        np.testing.assert_array_equal(compared, df['a'].to_numpy() > 10)
+
+    @unittest.skipIf(NUMEXPR is None, 'numexpr is not installed')
+    def testReductionEvaluatedWhole(self):
+        """A reduction over chunks would reduce each chunk on its own"""
+
+        if self.ne is None:
+            self.skipTest('numexpr reductions only')
+        df = get_frame(53)
+        result = FormulaEngine(chunk_rows=7).evaluate(df, ex='sum(a)')
+        self.assertEqual(float(result), df['a'].sum())
+
+
+class PandasFallbackTests(FormulaEngineTests):
+    """The same formulas evaluated by pandas, as without numexpr"""
+
+    ne = None
+
+
+if __name__ == '__main__':
+    unittest.main()
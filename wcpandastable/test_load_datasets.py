@@ -0,0 +1,138 @@
+"""
+    Warchest: Data management and automation GUI for Machine Learning projects
+    Created September 2017
+    Copyright (C) Nelson R Gonzalez
+
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+import os
+import shutil
+import tempfile
+import unittest
+import numpy as np
+import pandas as pd
+from load_datasets import DatasetCache
+
+
+def get_frame(rows=100, seed=0):
+
+    rng = np.random.RandomState(seed)
+    names = np.array(['ant', 'bee', 'cat', None], dtype=object)
+    return pd.DataFrame({'a': rng.randint(0, 1000, rows),
+                         'b': rng.normal(size=rows),
+                         'c': names[rng.randint(0, 4, rows)],
+                         'd': rng.randint(0, 2, rows) == 1})
+
+
+class DatasetCacheTests(unittest.TestCase):
+    """Cached reads give what read_csv gives, and stale or old entries
+       are dropped"""
+
+    def setUp(self):
+
+        self.dir = tempfile.mkdtemp()
+        self.cache = DatasetCache(os.path.join(self.dir, 'cache'),
+                                  budget=1 << 30, min_size=0)
+
+    def tearDown(self):
+
+        shutil.rmtree(self.dir)
+
+    def write(self, name, df):
+
+        path = os.path.join(self.dir, name)
+        df.to_csv(path, index=False)
+        return path
+
+    def get_entry_size(self, entry_dir):
+
+        return sum(entry.stat().st_size for entry in os.scandir(entry_dir))
+
+    def testRoundTrip(self):
+
+        path = self.write('data.csv', get_frame())
+        expected = pd.read_csv(path)
+        pd.testing.assert_frame_equal(self.cache.read_csv(path), expected)
+        entry_dir = self.cache.get_entry_dir(path, {})
+        self.assertIsNotNone(self.cache._read_meta(entry_dir))
+        # the second read loads the entry
+        pd.testing.assert_frame_equal(self.cache.read_csv(path), expected)
+        pd.testing.assert_frame_equal(
+            self.cache.read_csv(path, usecols=['a', 'c']),
+            pd.read_csv(path, usecols=['a', 'c']))
+
+    def testOpenPaged(self):
+        """A PagedFrame over the entry reads back the cached frame"""
+
+        path = self.write('data.csv', get_frame())
+        self.assertIsNone(self.cache.open_paged(path))
+        expected = self.cache.read_csv(path)
+        frame = self.cache.open_paged(path)
+        frame.page_rows = 7
+        pd.testing.assert_frame_equal(frame.materialize(), expected)
+        pd.testing.assert_frame_equal(frame.materialize([2, 0]),
+                                      expected[['c', 'a']])
+        pd.testing.assert_frame_equal(frame.iloc[10:20, 1:3],
+                                      expected.iloc[10:20, 1:3])
+
+    def testChangedFileInvalidates(self):
+
+        path = self.write('data.csv', get_frame())
+        self.cache.read_csv(path)
+        self.write('data.csv', get_frame(120, seed=1))
+        pd.testing.assert_frame_equal(self.cache.read_csv(path),
+                                      pd.read_csv(path))
+
+    def testSameSizeChecksHash(self):
+        """A new mtime with the same size keeps the entry only when the
+           content is the same"""
+
+        path = self.write('data.csv', pd.DataFrame({'a': [1, 2, 3]}))
+        self.cache.read_csv(path)
+        stat = os.stat(path)
+        os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+        pd.testing.assert_frame_equal(self.cache.read_csv(path),
+                                      pd.DataFrame({'a': [1, 2, 3]}))
+
+        self.write('data.csv', pd.DataFrame({'a': [4, 5, 6]}))
+        os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 2 * 10 ** 9))
+        self.assertEqual(os.path.getsize(path), stat.st_size)
+        pd.testing.assert_frame_equal(self.cache.read_csv(path),
+                                      pd.DataFrame({'a': [4, 5, 6]}))
+
+    def testEviction(self):
+        """The least recently read entries go once over budget"""
+
+        paths = [self.write('%s.csv' % name, get_frame(seed=seed))
+                 for seed, name in enumerate('abc')]
+        entries = [self.cache.get_entry_dir(path, {}) for path in paths]
+        self.cache.read_csv(paths[0])
+        self.cache.read_csv(paths[1])
+        os.utime(entries[0], (1, 1))
+        os.utime(entries[1], (2, 2))
+        # a read from the cache makes a the most recently used
+        self.cache.read_csv(paths[0])
+        self.assertGreater(os.stat(entries[0]).st_mtime, 2)
+
+        size = self.get_entry_size(entries[0])
+        self.cache.budget = int(size * 2.5)
+        self.cache.read_csv(paths[2])
+        self.assertTrue(os.path.isdir(entries[0]))
+        self.assertFalse(os.path.isdir(entries[1]))
+        self.assertTrue(os.path.isdir(entries[2]))
+
+
+if __name__ == '__main__':
+    unittest.main()
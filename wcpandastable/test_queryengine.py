@@ -0,0 +1,158 @@
+"""
+    Warchest: Data management and automation GUI for Machine Learning projects
+    Created September 2017
+    Copyright (C) Nelson R Gonzalez
+
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+import unittest
+import numpy as np
+import pandas as pd
+from queryengine import QueryEngine
+from global_config import g
+from .data import TableModel
+
+
+def set_value(model, value, row, col):
+
+    model.df.iloc[row, col] = value
+    model.dataChanged([model.df.columns[col]])
+
+
+def get_model(rows=2000):
+
+    rng = np.random.RandomState(0)
+    names = np.array(['ant', 'bee', 'cat', 'dog', None], dtype=object)
+    df = pd.DataFrame({
+        'a': rng.randint(0, 1000, rows),
+        'b': rng.normal(size=rows),
+        'c': names[rng.randint(0, 5, rows)],
+        'd': pd.Categorical(names[rng.randint(0, 4, rows)])})
+    df.loc[::7, 'b'] = np.nan
+    return TableModel(df)
+
+
+class QueryEngineTests(unittest.TestCase):
+    """Query bar filters, with and without indexes and cached masks"""
+
+    filters = [
+        [('a', 500, '>', 'AND')],
+        [('a', 995, '>', 'AND')],
+        [('b', -2.5, '<', 'AND')],
+        [('b', 0.5, '>', 'AND'), ('a', 10, '<', 'OR')],
+        [('c', 'cat', 'equals', 'AND')],
+        [('c', 'cat', 'not equals', 'AND')],
+        [('c', 'eel', 'equals', 'AND')],
+        [('d', 'dog', 'equals', 'AND'), ('a', 100, '>', 'NOT')],
+        [('c', 'a', 'starts with', 'AND')],
+    ]
+
+    def setUp(self):
+
+        # use the sorted index however many rows match
+        self.max_ratio = g.query_index_max_ratio
+        g.query_index_max_ratio = 0
+
+    def tearDown(self):
+
+        g.query_index_max_ratio = self.max_ratio
+
+    def reference(self, df, filters):
+
+        mask = np.ones(len(df), dtype=bool)
+        for col, val, op, b in filters:
+            values = df[col]
+            if op == 'equals':
+                m = values == val
+            elif op == 'not equals':
+                m = values != val
+            elif op == '>':
+                m = values > val
+            elif op == '<':
+                m = values < val
+            elif op == 'starts with':
+                m = values.str.startswith(val, na=False)
+            m = np.asarray(m.fillna(False), dtype=bool)
+            if b == 'AND':
+                mask &= m
+            elif b == 'OR':
+                mask |= m
+            elif b == 'NOT':
+                mask ^= m
+        return np.flatnonzero(mask)
+
+    def testIndexedMatchesScan(self):
+        """Indexed and unindexed filters find the same rows as pandas"""
+
+        model = get_model()
+        indexed = QueryEngine(index_min_rows=0)
+        scanned = QueryEngine(index_min_rows=len(model.df) + 1)
+        for filters in self.filters:
+            expected = self.reference(model.df, filters)
+            np.testing.assert_array_equal(indexed.query(model, '', filters),
+                                          expected)
+            np.testing.assert_array_equal(scanned.query(model, '', filters),
+                                          expected)
+
+    def testExpression(self):
+
+        model = get_model()
+        engine = QueryEngine()
+        expected = np.flatnonzero((model.df.a > 100) & (model.df.b < 0))
+        np.testing.assert_array_equal(engine.query(model, 'a > 100 & b < 0'),
+                                      expected)
+        self.assertIsNone(engine.query(model))
+
+    def testEditMissesCache(self):
+        """A cached mask is not used once its column changed"""
+
+        model = get_model()
+        engine = QueryEngine(index_min_rows=0)
+        filters = [('a', 500, '>', 'AND')]
+        before = engine.query(model, '', filters)
+        row = int(np.flatnonzero(model.df.a <= 500)[0])
+        set_value(model, 999, row, 0)
+        after = engine.query(model, '', filters)
+        self.assertIn(row, after)
+        self.assertEqual(len(after), len(before) + 1)
+        np.testing.assert_array_equal(after,
+                                      self.reference(model.df, filters))
+
+        expr = engine.query(model, 'a > 500')
+        set_value(model, 0, row, 0)
+        self.assertNotIn(row, engine.query(model, 'a > 500'))
+        self.assertIn(row, expr)
+
+    def testRenameMissesCache(self):
+        """Renaming a to x then b to a, a no longer finds the old a"""
+
+        model = get_model()
+        engine = QueryEngine(index_min_rows=0)
+        df = model.df
+        filters = [('a', 500, '>', 'AND')]
+        self.assertGreater(len(engine.query(model, '', filters)), 0)
+        engine.query(model, 'a > 500')
+        # as headers.renameColumn does
+        for old, new in (('a', 'x'), ('b', 'a')):
+            df.rename(columns={old: new}, inplace=True)
+            model.dataChanged([old, new])
+        np.testing.assert_array_equal(engine.query(model, '', filters),
+                                      np.empty(0, dtype=np.intp))
+        np.testing.assert_array_equal(engine.query(model, 'a > 500'),
+                                      np.empty(0, dtype=np.intp))
+
+
+if __name__ == '__main__':
+    unittest.main()
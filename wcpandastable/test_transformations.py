@@ -0,0 +1,75 @@
+"""
+    Warchest: Data management and automation GUI for Machine Learning projects
+    Created September 2017
+    Copyright (C) Nelson R Gonzalez
+
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+import unittest
+import numpy as np
+import pandas as pd
+from transformations import TransformationPipeline, fuse_casts
+
+
+def casts(index, dtypes):
+
+    return [{'ColumnIndex': index, 'TransformationDesc': 'setColumnType',
+             'Option1': dtype} for dtype in dtypes]
+
+
+class FuseCastsTests(unittest.TestCase):
+    """Casts fused by TransformationPipeline must give the values the
+       casts give one after another"""
+
+    def replay(self, values, dtypes):
+
+        df = pd.DataFrame({'a': values})
+        fused = TransformationPipeline(casts(0, dtypes)).transform(df.copy())
+        expected = df['a']
+        for dtype in dtypes:
+            expected = expected.astype(dtype)
+        return fused['a'], expected
+
+    def testWideningBeforeNumeric(self):
+        """A widening cast a numeric cast overrides is dropped"""
+
+        self.assertEqual(fuse_casts(np.dtype('int8'), ['int32', 'int64']),
+                         [np.dtype('int64')])
+        self.assertEqual(fuse_casts(np.dtype('float32'),
+                                    ['float64', 'float32']), [])
+        fused, expected = self.replay(
+            np.array([0.1, 2.5], dtype='float32'), ['float64', 'int64'])
+        pd.testing.assert_series_equal(fused, expected)
+
+    def testWideningBeforeStr(self):
+        """float32 to float64 to str keeps the float64 digits"""
+
+        self.assertEqual(len(fuse_casts(np.dtype('float32'),
+                                        ['float64', 'str'])), 2)
+        fused, expected = self.replay(
+            np.array([0.1, 2.5], dtype='float32'), ['float64', 'str'])
+        pd.testing.assert_series_equal(fused, expected)
+        self.assertEqual(fused[0], str(np.float64(np.float32(0.1))))
+
+    def testWideningBeforeObjectAndCategory(self):
+
+        for last in ('object', 'category'):
+            fused, expected = self.replay(
+                np.array([0.1, 2.5], dtype='float32'), ['float64', last])
+            pd.testing.assert_series_equal(fused, expected)
+
+
+if __name__ == '__main__':
+    unittest.main()
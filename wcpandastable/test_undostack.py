@@ -0,0 +1,181 @@
+"""
+    Warchest: Data management and automation GUI for Machine Learning projects
+    Created September 2017
+    Copyright (C) Nelson R Gonzalez
+
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+import unittest
+import numpy as np
+import pandas as pd
+from undostack import UndoStack
+from .data import TableModel
+
+
+class MemoryLog():
+    """TransformationsLog rows in a dict, with the methods of
+       transformations.Transformation the undo stack calls"""
+
+    def __init__(self):
+
+        self.rows = {}
+
+    def add(self, desc):
+
+        log_id = max(self.rows, default=0) + 1
+        self.rows[log_id] = (log_id, 1, 0, 'a', 1, 'date', desc, 'Yes',
+                             None, None, None)
+        return log_id
+
+    def get_transformations_by_id(self, ids):
+
+        return [self.rows[i] for i in ids if i in self.rows]
+
+    def delete_transformations_by_id(self, ids):
+
+        for i in ids:
+            self.rows.pop(i, None)
+
+    def restore_transformations(self, rows):
+
+        for row in rows:
+            self.rows[row[0]] = row
+
+
+def get_model():
+
+    return TableModel(pd.DataFrame({'a': np.arange(10, dtype='int64'),
+                                    'b': np.linspace(0, 1, 10),
+                                    'c': list('abcdefghij')}))
+
+
+class UndoStackTests(unittest.TestCase):
+    """Undo, redo and undo again give back each version of the table"""
+
+    def assertRoundTrip(self, stack, model, before, after):
+
+        pd.testing.assert_frame_equal(model.df, after)
+        for frame in (before, after, before):
+            if frame is before:
+                self.assertTrue(stack.undo(model))
+            else:
+                self.assertTrue(stack.redo(model))
+            pd.testing.assert_frame_equal(model.df, frame)
+
+    def testCellsChangingDtype(self):
+        """Clearing int cells makes the column float, undo makes it int"""
+
+        model = get_model()
+        stack = UndoStack()
+        before = model.df.copy()
+        stack.record_cells(model.df, [2, 3], [0])
+        df = model.df
+        df['a'] = df['a'].astype('float64')
+        df.iloc[[2, 3], 0] = np.nan
+        model.dataChanged(['a'])
+        self.assertRoundTrip(stack, model, before, df.copy())
+        self.assertEqual(model.df['a'].dtype, np.dtype('int64'))
+
+    def testCellsScattered(self):
+
+        model = get_model()
+        stack = UndoStack()
+        before = model.df.copy()
+        stack.record_cells(model.df, [1, 5, 8], [1, 2])
+        model.df.iloc[[1, 5, 8], 1] = -1.0
+        model.df.iloc[[1, 5, 8], 2] = 'z'
+        model.dataChanged(['b', 'c'])
+        self.assertRoundTrip(stack, model, before, model.df.copy())
+
+    def testAddedColumn(self):
+        """A column added by a change is dropped on undo"""
+
+        model = get_model()
+        stack = UndoStack()
+        before = model.df.copy()
+        stack.record_columns(model.df, [])
+        model.df['d'] = model.df['a'] * 2
+        model.dataChanged(['d'])
+        self.assertRoundTrip(stack, model, before, model.df.copy())
+        self.assertNotIn('d', model.df.columns)
+
+    def testDroppedColumn(self):
+        """A dropped column comes back at its position"""
+
+        model = get_model()
+        stack = UndoStack()
+        before = model.df.copy()
+        stack.record_columns(model.df, ['b'])
+        model.df = model.df.drop(['b'], axis=1)
+        self.assertRoundTrip(stack, model, before, model.df.copy())
+        self.assertEqual(list(model.df.columns), ['a', 'b', 'c'])
+
+    def testReplacedColumn(self):
+
+        model = get_model()
+        stack = UndoStack()
+        before = model.df.copy()
+        stack.record_columns(model.df, ['c'])
+        model.df['c'] = model.df['c'].str.upper()
+        model.dataChanged(['c'])
+        self.assertRoundTrip(stack, model, before, model.df.copy())
+
+    def testSharedRowDelete(self):
+        """Rows deleted into a new frame, the old one kept shallow"""
+
+        model = get_model()
+        stack = UndoStack()
+        before = model.df.copy()
+        stack.record_frame(model.df, shared=True)
+        model.df = model.df.drop([0, 4, 9])
+        self.assertRoundTrip(stack, model, before, model.df.copy())
+
+    def testLogRoundTrip(self):
+        """Logged transformations leave with undo and come back with redo"""
+
+        model = get_model()
+        log = MemoryLog()
+        stack = UndoStack(log=log)
+        kept = log.add('before')
+        stack.record_columns(model.df, ['a'])
+        model.df['a'] = model.df['a'].astype('float32')
+        model.dataChanged(['a'])
+        logged = log.add('cast')
+        stack.add_log(logged)
+        row = log.rows[logged]
+
+        stack.undo(model)
+        self.assertEqual(list(log.rows), [kept])
+        stack.redo(model)
+        self.assertEqual(log.rows[logged], row)
+        stack.undo(model)
+        self.assertEqual(list(log.rows), [kept])
+
+    def testLevels(self):
+
+        model = get_model()
+        stack = UndoStack(levels=2)
+        for value in range(3):
+            stack.record_cells(model.df, [0], [0])
+            model.df.iloc[0, 0] = 100 + value
+            model.dataChanged(['a'])
+        self.assertTrue(stack.undo(model))
+        self.assertTrue(stack.undo(model))
+        self.assertFalse(stack.undo(model))
+        self.assertEqual(model.df.iloc[0, 0], 100)
+
+
+if __name__ == '__main__':
+    unittest.main()